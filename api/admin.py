@@ -1,6 +1,6 @@
 from django.contrib import admin
 from .models import (
-    Class, Section, Subject, Student, Schedule,
+    Class, Section, Subject, Student, Schedule, PeriodTime,
     Attendance, Assignment, AssignmentSubmission,
     Grade, Note
 )
@@ -34,6 +34,11 @@ class ScheduleAdmin(admin.ModelAdmin):
     list_filter = ('day', 'period', 'class_name', 'section', 'subject')
     search_fields = ('class_name__name', 'section__name', 'subject__name')
 
+@admin.register(PeriodTime)
+class PeriodTimeAdmin(admin.ModelAdmin):
+    list_display = ('get_period_display', 'start_time', 'end_time')
+    ordering = ('start_time',)
+
 @admin.register(Attendance)
 class AttendanceAdmin(admin.ModelAdmin):
     list_display = ('student', 'schedule', 'date', 'status')
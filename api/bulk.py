@@ -0,0 +1,163 @@
+"""
+كتابة مجمّعة (upsert) لسجلات الدرجات والحضور
+
+يُتحقق من حقول الدفعة كلها دون قاعدة البيانات، وتُحمَّل المفاتيح الأجنبية باستعلام in_bulk واحد لكل نموذج،
+ثم تُكتب كل الصفوف بـ bulk_create(update_conflicts=True) على المفتاح الفريد للنموذج،
+فيبقى عدد الاستعلامات ثابتاً مهما كان حجم الدفعة.
+الكتابة المجمّعة لا تُطلق الإشارات، لذلك تُحدَّث هنا الملخصات اليومية وذاكرة التقارير مباشرة.
+"""
+from collections import Counter
+
+from django.db import transaction
+
+from .counters import bump_counters, contributions
+from .models import Attendance, Grade, Schedule, Student, Subject
+from .report_cache import invalidate_students
+from .rollups import deferred_daily_summaries, refresh_daily_summaries
+from .serializers import AttendanceBatchRowSerializer, GradeBatchRowSerializer
+
+# عدد الصفوف في كل جملة INSERT
+BATCH_SIZE = 500
+
+GRADE_KEY = ('student', 'subject', 'type', 'date')
+ATTENDANCE_KEY = ('student', 'schedule', 'date')
+
+
+def _missing(pk):
+    return [f'Invalid pk "{pk}" - object does not exist.']
+
+
+def _superseded(index):
+    return {'non_field_errors': [f"Superseded by row {index} with the same key."]}
+
+
+def upsert(model, rows, row_serializer, unique_fields, update_fields, relations):
+    """
+    إنشاء أو تحديث صفوف على المفتاح الفريد unique_fields
+    relations: {الحقل: النموذج} للمفاتيح الأجنبية، تُربط بالكائنات المحمّلة فلا يُحمَّل أي منها لاحقاً
+    عند تكرار المفتاح في الدفعة يُكتب آخر صف، وتُعاد الصفوف السابقة ضمن errors
+    الحقول الغائبة من صف يحدّث سجلاً موجوداً تبقى على قيمتها المحفوظة، والقيم الافتراضية للإنشاء فقط
+
+    يرجع (written, errors):
+    written قائمة (index, instance, previous) بترتيب المفاتيح، previous السجل قبل التحديث أو None عند الإنشاء
+    errors قائمة (index, data, error)
+    """
+    errors = []
+    valid = {}
+    for index, row in enumerate(rows):
+        serializer = row_serializer(data=row)
+        if not serializer.is_valid():
+            errors.append((index, row, serializer.errors))
+            continue
+        values = serializer.validated_data
+        key = tuple(values[field] for field in unique_fields)
+        if key in valid:
+            # لا يختفي الصف السابق بصمت: يُبلَّغ عنه خطأً يشير إلى الصف الذي حلّ محله
+            superseded, superseded_row, _ = valid.pop(key)
+            errors.append((superseded, superseded_row, _superseded(index)))
+        valid[key] = (index, row, values)
+
+    related = {
+        field: related_model.objects.in_bulk({values[field] for _, _, values in valid.values()})
+        for field, related_model in relations.items()
+    }
+    for key, (index, row, values) in list(valid.items()):
+        missing = {
+            field: _missing(values[field]) for field in relations if values[field] not in related[field]
+        }
+        if missing:
+            errors.append((index, row, missing))
+            del valid[key]
+
+    errors.sort(key=lambda error: error[0])
+    if not valid:
+        return [], errors
+
+    attnames = [model._meta.get_field(field).attname for field in unique_fields]
+    candidates = model.objects.filter(**{
+        f"{field}__in": {key[position] for key in valid}
+        for position, field in enumerate(unique_fields)
+    }).order_by()
+    existing = {tuple(getattr(obj, attname) for attname in attnames): obj for obj in candidates}
+
+    # bulk_create يحدّث update_fields نفسها لكل الصفوف، فتُملأ الحقول غير المرسلة من السجل المحفوظ
+    for key, (_, _, values) in valid.items():
+        previous = existing.get(key)
+        if previous is not None:
+            for field in map(model._meta.get_field, update_fields):
+                if field.name not in values and not getattr(field, 'auto_now', False):
+                    values[field.name] = getattr(previous, field.attname)
+
+    instances = {
+        key: model(**{
+            field: related[field][value] if field in relations else value
+            for field, value in values.items()
+        })
+        for key, (_, _, values) in valid.items()
+    }
+    model.objects.bulk_create(
+        instances.values(), batch_size=BATCH_SIZE, update_conflicts=True,
+        unique_fields=unique_fields, update_fields=update_fields
+    )
+
+    # update_conflicts لا يعيد المعرّفات، فتُقرأ معرّفات الصفوف الجديدة باستعلام واحد
+    created_keys = set(instances) - set(existing)
+    if created_keys:
+        for *key, pk in candidates.values_list(*attnames, 'pk'):
+            key = tuple(key)
+            if key in created_keys:
+                instances[key].pk = pk
+
+    # الصفوف المحدّثة تحتفظ بمعرّفها وبالحقول التي لا يغيّرها التحديث (مثل created_at)
+    kept = [
+        field.attname for field in model._meta.concrete_fields
+        if field.name not in update_fields and field.name not in unique_fields
+    ]
+    for key, previous in existing.items():
+        if key in instances:
+            for attname in kept:
+                setattr(instances[key], attname, getattr(previous, attname))
+
+    written = [(valid[key][0], instance, existing.get(key)) for key, instance in instances.items()]
+    return written, errors
+
+
+def _after_write(instances):
+    """ما تفعله الإشارات بعد الحفظ: الملخص اليومي وإبطال تقارير الطلاب"""
+    refresh_daily_summaries((instance.student_id, instance.date) for instance in instances)
+    invalidate_students(
+        {(instance.student.id, instance.student.class_name_id, instance.student.section_id) for instance in instances}
+    )
+
+
+def upsert_grades(rows):
+    """إنشاء أو تحديث درجات على (الطالب، المادة، النوع، التاريخ) في معاملة واحدة"""
+    with transaction.atomic(), deferred_daily_summaries():
+        written, errors = upsert(
+            Grade, rows, GradeBatchRowSerializer, GRADE_KEY,
+            update_fields=['score', 'max_score', 'updated_at'],
+            relations={'student': Student, 'subject': Subject}
+        )
+        _after_write([instance for _, instance, _ in written])
+    return written, errors
+
+
+def upsert_attendance(rows):
+    """
+    إنشاء أو تحديث سجلات حضور على (الطالب، الحصة، التاريخ) في معاملة واحدة
+    تُحدَّث عدّادات لوحة التحكم بفرق الدفعة كلها مرة واحدة
+    """
+    with transaction.atomic(), deferred_daily_summaries():
+        written, errors = upsert(
+            Attendance, rows, AttendanceBatchRowSerializer, ATTENDANCE_KEY,
+            update_fields=['status', 'subject_info', 'updated_at'],
+            relations={'student': Student, 'schedule': Schedule}
+        )
+        deltas = Counter()
+        for _, instance, previous in written:
+            deltas.update(contributions(instance))
+            if previous is not None:
+                deltas.subtract(contributions(previous))
+        bump_counters(deltas)
+        _after_write([instance for _, instance, _ in written])
+    return written, errors
@@ -0,0 +1,57 @@
+"""
+طلبات GET المشروطة (ETag / Last-Modified)
+
+يُحسب مُحقِّق رخيص لكل استجابة، فإذا طابق ما لدى العميل تُعاد 304 دون تسلسل البيانات.
+"""
+import hashlib
+
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+
+def make_etag(*parts):
+    return '"%s"' % hashlib.md5('|'.join(str(part) for part in parts).encode('utf-8')).hexdigest()
+
+
+def not_modified_response(request, etag=None, last_modified=None):
+    """استجابة 304 إذا طابقت ترويسات If-None-Match / If-Modified-Since المُحقِّق، وإلا None"""
+    if request.method not in ('GET', 'HEAD'):
+        return None
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is not None:
+        set_validators(response, etag, last_modified)
+    return response
+
+
+def set_validators(response, etag=None, last_modified=None):
+    if etag:
+        response['ETag'] = etag
+    if last_modified:
+        response['Last-Modified'] = http_date(last_modified)
+    return response
+
+
+def queryset_validators(request, queryset):
+    """
+    مُحقِّق ETag لقائمة: آخر تعديل وعدد الصفوف بعد التصفية
+    يدخل العدد ليُكتشف الحذف، ويدخل عنوان الطلب لأن البحث والترتيب يغيّران المحتوى.
+    لا تُرسل Last-Modified: حذف صف لا يغيّر أقصى updated_at، فيحصل العميل على 304 قديمة عبر If-Modified-Since
+    """
+    validators = queryset.order_by().aggregate(last_modified=Max('updated_at'), count=Count('pk'))
+    last_modified = validators['last_modified']
+    return make_etag(request.get_full_path(), last_modified.isoformat() if last_modified else '', validators['count'])
+
+
+class ConditionalListMixin:
+    """
+    إضافة GET المشروط إلى إجراء list في ModelViewSet
+    """
+
+    def list(self, request, *args, **kwargs):
+        etag = queryset_validators(request, self.filter_queryset(self.get_queryset()))
+        not_modified = not_modified_response(request, etag)
+        if not_modified is not None:
+            return not_modified
+        response = super().list(request, *args, **kwargs)
+        return set_validators(response, etag)
@@ -2,6 +2,7 @@ import json
 from channels.generic.websocket import AsyncWebsocketConsumer
 from channels.db import database_sync_to_async
 from .models import Notification, Grade, Attendance
+from .dashboard_live import DASHBOARD_GROUP, dashboard_snapshot
 
 class NotificationConsumer(AsyncWebsocketConsumer):
     """
@@ -128,3 +129,39 @@ class AttendanceConsumer(AsyncWebsocketConsumer):
         await self.send(text_data=json.dumps({
             'message': message
         }))
+
+class DashboardConsumer(AsyncWebsocketConsumer):
+    """
+    مستهلك WebSocket للوحة التحكم
+    يرسل لقطة كاملة عند الاتصال ثم فروق المؤشرات والملاحظات الجديدة فقط عند تغيّر البيانات
+    """
+    async def connect(self):
+        # الانضمام إلى مجموعة لوحة التحكم
+        await self.channel_layer.group_add(
+            DASHBOARD_GROUP,
+            self.channel_name
+        )
+        await self.accept()
+
+        await self.send(text_data=json.dumps({
+            'type': 'snapshot',
+            'data': await self.get_snapshot()
+        }))
+
+    async def disconnect(self, close_code):
+        # مغادرة مجموعة لوحة التحكم
+        await self.channel_layer.group_discard(
+            DASHBOARD_GROUP,
+            self.channel_name
+        )
+
+    async def dashboard_delta(self, event):
+        # إرسال الفروق المتجمعة إلى WebSocket
+        await self.send(text_data=json.dumps({
+            'type': 'delta',
+            'data': event['delta']
+        }))
+
+    @database_sync_to_async
+    def get_snapshot(self):
+        return dashboard_snapshot()
@@ -0,0 +1,110 @@
+"""
+صيانة عدّادات لوحة التحكم DashboardCounter
+
+تُحدَّث العدّادات بفروق ذرية (F) من الإشارات ومن مسارات الكتابة المجمّعة،
+ويُعاد عدّها بالكامل بأمر reconcile_dashboard_counters لتصحيح أي انحراف.
+"""
+from collections import Counter
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum
+from django.utils import timezone
+
+from .dashboard_live import publish_counter_deltas
+from .models import Attendance, Assignment, DashboardCounter, Student
+
+STUDENTS = 'students'
+ATTENDANCE_TOTAL = 'attendance_total'
+ATTENDANCE_PRESENT = 'attendance_present'
+ASSIGNMENTS_DUE = 'assignments_due'
+
+
+def _counter_key(name, day=None):
+    return f"{name}:{day.isoformat()}" if day else name
+
+
+def date_value(instance, name):
+    """قيمة حقل التاريخ كتاريخ، فقد يُسند نصاً مثل '2025-01-01' قبل الحفظ"""
+    return instance._meta.get_field(name).to_python(getattr(instance, name))
+
+
+def contributions(instance):
+    """ما يضيفه السجل إلى العدّادات: قاموس {(name, date): مقدار}"""
+    if isinstance(instance, Student):
+        return {(STUDENTS, None): 1}
+    if isinstance(instance, Attendance):
+        day = date_value(instance, 'date')
+        counts = {(ATTENDANCE_TOTAL, day): 1}
+        if instance.status == 'present':
+            counts[(ATTENDANCE_PRESENT, day)] = 1
+        return counts
+    if isinstance(instance, Assignment):
+        due_date = date_value(instance, 'due_date')
+        return {(ASSIGNMENTS_DUE, due_date): 1} if due_date else {}
+    return {}
+
+
+def bump_counters(deltas):
+    """
+    تطبيق فروق على العدّادات: deltas قاموس {(name, date): مقدار}
+    الزيادة بتعبير F ذرية فلا تضيع عند الكتابات المتزامنة، وتُدفع الفروق أيضاً إلى لوحة التحكم الحية
+    """
+    publish_counter_deltas(deltas)
+
+    now = timezone.now()
+    for (name, day), delta in deltas.items():
+        if not delta:
+            continue
+        key = _counter_key(name, day)
+        with transaction.atomic():
+            updated = DashboardCounter.objects.filter(key=key).update(value=F('value') + delta, updated_at=now)
+            if not updated:
+                DashboardCounter.objects.get_or_create(key=key, defaults={'name': name, 'date': day})
+                DashboardCounter.objects.filter(key=key).update(value=F('value') + delta, updated_at=now)
+
+
+def apply_change(before, after):
+    """تطبيق الفرق بين مساهمتين (قبل التعديل وبعده)"""
+    deltas = Counter(after)
+    deltas.subtract(before)
+    bump_counters(deltas)
+
+
+def recount_counters():
+    """إعادة عدّ كل العدّادات من الجداول الأصلية"""
+    counts = {(STUDENTS, None): Student.objects.count()}
+    for row in Attendance.objects.values('date').annotate(
+        total=Count('id'), present=Count('id', filter=Q(status='present'))
+    ).order_by():
+        counts[(ATTENDANCE_TOTAL, row['date'])] = row['total']
+        counts[(ATTENDANCE_PRESENT, row['date'])] = row['present']
+    for row in Assignment.objects.exclude(due_date=None).values('due_date').annotate(
+        total=Count('id')
+    ).order_by():
+        counts[(ASSIGNMENTS_DUE, row['due_date'])] = row['total']
+
+    with transaction.atomic():
+        DashboardCounter.objects.all().delete()
+        DashboardCounter.objects.bulk_create([
+            DashboardCounter(key=_counter_key(name, day), name=name, date=day, value=value)
+            for (name, day), value in counts.items()
+        ], batch_size=1000)
+    return len(counts)
+
+
+def dashboard_counts(today=None):
+    """
+    مؤشرات لوحة التحكم من العدّادات باستعلام واحد:
+    عدد الطلاب، وحضور الأسبوع الحالي (الإثنين إلى الأحد)، والواجبات التي لم يحن موعدها
+    """
+    today = today or timezone.now().date()
+    week_start = today - timedelta(days=today.weekday())
+    week_end = week_start + timedelta(days=6)
+
+    return DashboardCounter.objects.aggregate(
+        students=Sum('value', filter=Q(name=STUDENTS), default=0),
+        attendance_total=Sum('value', filter=Q(name=ATTENDANCE_TOTAL, date__range=[week_start, week_end]), default=0),
+        attendance_present=Sum('value', filter=Q(name=ATTENDANCE_PRESENT, date__range=[week_start, week_end]), default=0),
+        assignments_due=Sum('value', filter=Q(name=ASSIGNMENTS_DUE, date__gte=today), default=0),
+    )
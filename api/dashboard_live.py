@@ -0,0 +1,130 @@
+"""
+دفع تغييرات لوحة التحكم إلى مستهلك WebSocket بدل الاستطلاع الدوري
+
+تُجمع الفروق في ذاكرة العملية بعد تثبيت كل معاملة، وتُرسل دفعة واحدة إلى مجموعة "dashboard"
+بعد DASHBOARD_PUSH_DEBOUNCE ثانية من أول تغيير، فلا تُرسل رسالة لكل صف في عمليات الحفظ المجمّعة.
+يحصل العميل على لقطة كاملة عند الاتصال ثم يطبّق الفروق عليها.
+"""
+import threading
+from datetime import timedelta
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+DASHBOARD_GROUP = 'dashboard'
+
+DEBOUNCE = getattr(settings, 'DASHBOARD_PUSH_DEBOUNCE', 1.0)
+
+# أسماء المؤشرات في الرسائل، مطابقة لمفاتيح get_dashboard_stats
+COUNTER_FIELDS = {
+    'students': 'totalStudents',
+    'attendance_total': 'attendanceTotal',
+    'attendance_present': 'attendancePresent',
+    'assignments_due': 'assignmentsCount',
+}
+
+_lock = threading.Lock()
+_pending = None
+_timer = None
+
+
+def _empty_delta():
+    delta = {field: 0 for field in COUNTER_FIELDS.values()}
+    delta.update(notes=[], deletedNotes=[])
+    return delta
+
+
+def _merge(update):
+    global _pending, _timer
+    with _lock:
+        if _pending is None:
+            _pending = _empty_delta()
+        for key, value in update.items():
+            if isinstance(value, list):
+                _pending[key].extend(value)
+            else:
+                _pending[key] += value
+        if _timer is None:
+            _timer = threading.Timer(DEBOUNCE, flush)
+            _timer.daemon = True
+            _timer.start()
+
+
+def _queue(update):
+    # لا يُدفع تغيير قبل تثبيته، ولا يُدفع أبداً إذا أُلغيت المعاملة
+    transaction.on_commit(lambda: _merge(update))
+
+
+def flush():
+    """إرسال الفروق المتجمعة إلى مجموعة لوحة التحكم"""
+    global _pending, _timer
+    with _lock:
+        delta, _pending = _pending, None
+        _timer = None
+    if delta is None:
+        return
+
+    delta = {key: value for key, value in delta.items() if value}
+    if not delta:
+        return
+
+    channel_layer = get_channel_layer()
+    if channel_layer is None:
+        return
+    async_to_sync(channel_layer.group_send)(DASHBOARD_GROUP, {
+        'type': 'dashboard_delta',
+        'delta': delta,
+    })
+
+
+def publish_counter_deltas(deltas):
+    """
+    تحويل فروق العدّادات {(name, date): مقدار} إلى فروق مؤشرات اللوحة
+    تُحتسب فقط فروق أيام الأسبوع الحالي للحضور، والواجبات التي لم يحن موعدها
+    """
+    today = timezone.now().date()
+    week_start = today - timedelta(days=today.weekday())
+    week_end = week_start + timedelta(days=6)
+
+    update = {}
+    for (name, day), delta in deltas.items():
+        if not delta or name not in COUNTER_FIELDS:
+            continue
+        if name.startswith('attendance') and not (day and week_start <= day <= week_end):
+            continue
+        if name == 'assignments_due' and not (day and day >= today):
+            continue
+        field = COUNTER_FIELDS[name]
+        update[field] = update.get(field, 0) + delta
+
+    if update:
+        _queue(update)
+
+
+def publish_note(note):
+    """ملاحظة جديدة أو معدّلة؛ يستبدل العميل الملاحظة التي لها المعرّف نفسه"""
+    from .dashboard_views import note_entry
+
+    _queue({'notes': [note_entry(note)]})
+
+
+def publish_note_deleted(note_id):
+    _queue({'deletedNotes': [note_id]})
+
+
+def dashboard_snapshot():
+    """اللقطة الكاملة التي يبدأ منها العميل قبل تطبيق الفروق"""
+    from .counters import dashboard_counts
+    from .dashboard_views import dashboard_stats_data, recent_notes_data
+
+    counts = dashboard_counts()
+    snapshot = dashboard_stats_data()
+    snapshot.update(
+        attendanceTotal=counts['attendance_total'],
+        attendancePresent=counts['attendance_present'],
+        recentNotes=recent_notes_data(),
+    )
+    return snapshot
@@ -1,152 +1,121 @@
+import hashlib
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode
+
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
+from rest_framework import status
 from django.utils import timezone
-from django.db.models import Count, Avg
+from django.db import close_old_connections
+from django.db.models import Count, Avg, F, FloatField, Q
+from django.db.models.functions import Cast
 from datetime import timedelta
-from django.views.decorators.cache import cache_page
 from django.conf import settings
-from django.utils.decorators import method_decorator
 
-from .models import (
-    Student, Attendance, Assignment, Schedule, Grade, Note
-)
+from .models import Student, Attendance, Note
+from .counters import dashboard_counts
+from .shared_cache import cached_view, get_or_set
+from .timetable import day_entries, model_day
 
-@api_view(['GET'])
-@cache_page(settings.CACHE_TTL)  # تخزين مؤقت لمدة 15 دقيقة
-def get_dashboard_stats(request):
+# Default and maximum number of students returned by get_top_students
+TOP_STUDENTS_LIMIT = 5
+MAX_TOP_STUDENTS_LIMIT = 100
+
+# Number of notes returned by get_recent_notes
+RECENT_NOTES_LIMIT = 10
+
+def dashboard_stats_data(request=None):
     """
     Get dashboard statistics:
     - Total number of students
     - Attendance rate
     - Number of active assignments
     """
-    # Get total number of students
-    total_students = Student.objects.count()
-
-    # Calculate attendance rate for the current week
-    today = timezone.now().date()
-    week_start = today - timedelta(days=today.weekday())
-    week_end = week_start + timedelta(days=6)
-
-    # Get all attendance records for the current week
-    attendance_records = Attendance.objects.filter(date__range=[week_start, week_end])
+    # Students, this week's attendance and active assignments come from the counters table in one query
+    counts = dashboard_counts()
 
     # Calculate attendance rate
-    total_records = attendance_records.count()
-    present_records = attendance_records.filter(status='present').count()
+    total_records = counts['attendance_total']
+    present_records = counts['attendance_present']
 
     attendance_rate = 0
     if total_records > 0:
         attendance_rate = (present_records / total_records) * 100
 
-    # Get active assignments (due date is today or in the future)
-    active_assignments = Assignment.objects.filter(due_date__gte=today).count()
-
     # Get alerts count (for future implementation)
     alerts_count = 0
 
-    return Response({
-        'totalStudents': total_students,
+    return {
+        'totalStudents': counts['students'],
         'attendanceRate': round(attendance_rate, 1),
-        'assignmentsCount': active_assignments,
+        'assignmentsCount': counts['assignments_due'],
         'alertsCount': alerts_count
-    })
+    }
 
-@api_view(['GET'])
-@cache_page(settings.CACHE_TTL)  # تخزين مؤقت لمدة 15 دقيقة
-def get_today_schedule(request):
+def today_schedule_data(request):
     """
     Get today's schedule
     """
-    # Get current day of the week (0=Monday, 6=Sunday)
-    today_weekday = timezone.now().weekday()
-
-    # Map Django's weekday to our model (0=Sunday in our model)
-    model_weekday = (today_weekday + 1) % 7
-
-    # Get schedules for today
+    # Read from the in-memory timetable index, rebuilt whenever schedules or period times change
     try:
-        schedules = Schedule.objects.filter(day=model_weekday).select_related(
-            'class_name', 'section', 'subject'
-        ).order_by('period')
-
-        # Format the response
-        result = []
-        for schedule in schedules:
-            # Get period time based on period number
-            period_times = {
-                1: "08:00 - 08:45",
-                2: "08:45 - 09:30",
-                3: "09:30 - 10:15",
-                4: "10:15 - 11:00",
-                5: "11:00 - 11:45",
-                6: "11:45 - 12:30",
-                7: "12:30 - 13:15"
-            }
-
-            time = period_times.get(schedule.period, f"Period {schedule.period}")
-
-            result.append({
-                "id": schedule.id,
-                "time": time,
-                "subject": schedule.subject.name,
-                "class": schedule.class_name.name,
-                "section": schedule.section.name,
-                "duration": 45,  # Default duration in minutes
-                "classId": schedule.class_name.id,
-                "sectionId": schedule.section.id,
-                "subjectId": schedule.subject.id
-            })
-
-        return Response(result)
+        return day_entries(model_day(timezone.localdate()))
     except Exception as e:
         # If there's an error, return an empty schedule
         print(f"Error fetching today's schedule: {e}")
-        return Response([])
+        return []
 
-@api_view(['GET'])
-@cache_page(settings.CACHE_TTL)  # تخزين مؤقت لمدة 15 دقيقة
-def get_top_students(request):
+def top_students_data(request):
     """
-    Get top performing students
+    Get top performing students ranked by their average grade percentage (score / max_score)
+    Filters: class_id, section_id, limit (default 5, at most 100); raises ValueError for an invalid limit
     """
     try:
-        # Get all students with their grades
-        students = Student.objects.all()
-
-        # Calculate average grade for each student
-        result = []
-        for student in students:
-            # Get all grades for this student
-            grades = Grade.objects.filter(student=student)
-
-            # Calculate average score
-            avg_score = grades.aggregate(avg_score=Avg('score'))
-
-            # Only include students with grades
-            if avg_score['avg_score'] is not None:
-                result.append({
-                    "id": student.id,
-                    "name": student.name,
-                    "class": student.class_name.name,
-                    "section": student.section.name,
-                    "avg_score": round(avg_score['avg_score'], 1),
-                    "grades_count": grades.count(),
-                    "image_url": request.build_absolute_uri(student.image.url) if student.image else None
-                })
-
-        # Sort by average score (descending) and take top 5
-        result = sorted(result, key=lambda x: x['avg_score'], reverse=True)[:5]
-
-        return Response(result)
+        limit = min(max(int(request.query_params.get('limit', TOP_STUDENTS_LIMIT)), 1), MAX_TOP_STUDENTS_LIMIT)
+    except ValueError:
+        raise ValueError("limit must be an integer")
+
+    try:
+        students = Student.objects.select_related('class_name', 'section')
+
+        class_id = request.query_params.get('class_id')
+        if class_id:
+            students = students.filter(class_name_id=class_id)
+
+        section_id = request.query_params.get('section_id')
+        if section_id:
+            students = students.filter(section_id=section_id)
+
+        # Average percentage and grade count per student in one query; grades without a max score are skipped
+        graded = Q(grades__max_score__gt=0)
+        students = students.annotate(
+            avg_score=Avg(
+                Cast('grades__score', FloatField()) * 100 / F('grades__max_score'),
+                filter=graded
+            ),
+            grades_count=Count('grades', filter=graded)
+        ).filter(avg_score__isnull=False).order_by('-avg_score', 'name')[:limit]
+
+        result = [
+            {
+                "id": student.id,
+                "name": student.name,
+                "class": student.class_name.name,
+                "section": student.section.name,
+                "avg_score": round(student.avg_score, 1),
+                "grades_count": student.grades_count,
+                "image_url": request.build_absolute_uri(student.image.url) if student.image else None
+            }
+            for student in students
+        ]
+
+        return result
     except Exception as e:
         # If there's an error, return an empty list
         print(f"Error fetching top students: {e}")
-        return Response([])
+        return []
 
-@api_view(['GET'])
-@cache_page(settings.CACHE_TTL)  # تخزين مؤقت لمدة 15 دقيقة
-def get_weekly_attendance(request):
+def weekly_attendance_data(request):
     """
     Get weekly attendance statistics
     """
@@ -171,22 +140,23 @@ def get_weekly_attendance(request):
             {"day": "الخميس", "day_number": 4, "present": 0, "absent": 0, "rate": 0},
         ]
 
-        # Get attendance records for the week
-        attendance_records = Attendance.objects.filter(date__range=[week_start, week_end])
+        # Count present and total attendance records per date in the database
+        daily_counts = Attendance.objects.filter(
+            date__range=[week_start, week_end]
+        ).values('date').annotate(
+            total=Count('id'),
+            present=Count('id', filter=Q(status='present'))
+        ).order_by('date')
 
-        # Group attendance records by day
-        for record in attendance_records:
-            # Get day of week (0=Sunday, 6=Saturday)
-            day_of_week = record.date.weekday()
-            # Map to our model (0=Sunday, 4=Thursday)
-            model_day = (day_of_week + 1) % 7
+        # Group the daily counts by day
+        for row in daily_counts:
+            # Day in our model (0=Sunday, 4=Thursday)
+            day = model_day(row['date'])
 
             # Only count Sunday to Thursday (0-4)
-            if model_day <= 4:
-                if record.status == 'present':
-                    attendance_data[model_day]['present'] += 1
-                else:
-                    attendance_data[model_day]['absent'] += 1
+            if day <= 4:
+                attendance_data[day]['present'] += row['present']
+                attendance_data[day]['absent'] += row['total'] - row['present']
 
         # Calculate attendance rate for each day
         for day_data in attendance_data:
@@ -195,38 +165,156 @@ def get_weekly_attendance(request):
                 day_data['rate'] = round((day_data['present'] / total) * 100, 1)
             day_data['total'] = total
 
-        return Response(attendance_data)
+        return attendance_data
     except Exception as e:
         # If there's an error, return an empty list
         print(f"Error fetching weekly attendance: {e}")
-        return Response([])
+        return []
 
-@api_view(['GET'])
-@cache_page(settings.CACHE_TTL)  # تخزين مؤقت لمدة 15 دقيقة
-def get_recent_notes(request):
+def note_entry(note):
+    """
+    Format a note for the recent notes widget (also pushed to the dashboard WebSocket)
+    """
+    return {
+        "id": note.id,
+        "student_name": note.student.name,
+        "student_id": note.student.id,
+        "content": note.content,
+        "type": note.type,
+        "type_display": note.get_type_display(),
+        "date": note.date.strftime("%Y-%m-%d"),
+        "subject": note.subject_info or (note.schedule.subject.name if note.schedule and note.schedule.subject else "")
+    }
+
+def recent_notes_data(request=None):
     """
     Get recent student notes
     """
     try:
         # Get the 10 most recent notes
-        notes = Note.objects.all().select_related('student', 'schedule').order_by('-date', '-created_at')[:10]
+        notes = Note.objects.all().select_related(
+            'student', 'schedule__subject'
+        ).order_by('-date', '-created_at')[:RECENT_NOTES_LIMIT]
 
         # Format the response
-        result = []
-        for note in notes:
-            result.append({
-                "id": note.id,
-                "student_name": note.student.name,
-                "student_id": note.student.id,
-                "content": note.content,
-                "type": note.type,
-                "type_display": note.get_type_display(),
-                "date": note.date.strftime("%Y-%m-%d"),
-                "subject": note.subject_info or (note.schedule.subject.name if note.schedule and note.schedule.subject else "")
-            })
-
-        return Response(result)
+        return [note_entry(note) for note in notes]
     except Exception as e:
         # If there's an error, return an empty list
         print(f"Error fetching recent notes: {e}")
-        return Response([])
+        return []
+
+@api_view(['GET'])
+def get_dashboard_stats(request):
+    """
+    Get dashboard statistics:
+    - Total number of students
+    - Attendance rate
+    - Number of active assignments
+    """
+    return Response(dashboard_stats_data(request))
+
+@api_view(['GET'])
+def get_today_schedule(request):
+    """
+    Get today's schedule
+    """
+    return Response(today_schedule_data(request))
+
+@api_view(['GET'])
+@cached_view(settings.CACHE_TTL)  # تخزين مؤقت لمدة 15 دقيقة
+def get_top_students(request):
+    """
+    Get top performing students ranked by their average grade percentage (score / max_score)
+    Filters: class_id, section_id, limit (default 5, at most 100)
+    """
+    try:
+        return Response(top_students_data(request))
+    except ValueError as e:
+        return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+@api_view(['GET'])
+@cached_view(settings.CACHE_TTL)  # تخزين مؤقت لمدة 15 دقيقة
+def get_weekly_attendance(request):
+    """
+    Get weekly attendance statistics
+    """
+    return Response(weekly_attendance_data(request))
+
+@api_view(['GET'])
+@cached_view(settings.CACHE_TTL)  # تخزين مؤقت لمدة 15 دقيقة
+def get_recent_notes(request):
+    """
+    Get recent student notes
+    """
+    return Response(recent_notes_data(request))
+
+# Widgets returned together by get_dashboard_all, with their cache timeout
+# (None: read live, the widget is already cheap: maintained counters or the in-memory timetable)
+DASHBOARD_WIDGETS = {
+    'stats': (dashboard_stats_data, None),
+    'todaySchedule': (today_schedule_data, None),
+    'topStudents': (top_students_data, settings.CACHE_TTL),
+    'weeklyAttendance': (weekly_attendance_data, settings.CACHE_TTL),
+    'recentNotes': (recent_notes_data, settings.CACHE_TTL),
+}
+
+# Bounded pool shared by all requests, so a burst of dashboard loads cannot open unbounded connections
+_widget_pool = ThreadPoolExecutor(max_workers=settings.DASHBOARD_WORKERS, thread_name_prefix='dashboard')
+
+def _widget_data(name, request):
+    """
+    Compute one widget, or take it from the shared cache, in a pool thread
+    Returns the widget data and its timing metadata
+    """
+    started = time.perf_counter()
+    widget, timeout = DASHBOARD_WIDGETS[name]
+    computed = []
+
+    def compute():
+        computed.append(True)
+        return widget(request)
+
+    params = sorted((key, value) for key, value in request.query_params.items() if key != 'widgets')
+    key = f"dashboard-widget:{name}:{hashlib.md5(urlencode(params).encode('utf-8')).hexdigest()}"
+    try:
+        data = compute() if timeout is None else get_or_set(key, compute, timeout)
+    finally:
+        # Each pool thread keeps its own connection; drop it only once it is broken or older than CONN_MAX_AGE,
+        # like request_finished does for request threads
+        close_old_connections()
+
+    return data, {
+        'ms': round((time.perf_counter() - started) * 1000, 2),
+        'cached': not computed,
+    }
+
+@api_view(['GET'])
+def get_dashboard_all(request):
+    """
+    Get every dashboard widget in one payload
+    Widgets are computed concurrently in a bounded thread pool and cached separately;
+    meta.widgets holds the time of each widget in milliseconds and whether it came from the cache
+    Filters: widgets (comma-separated subset of the widget names) and the filters of each widget
+    """
+    names = [name for name in request.query_params.get('widgets', '').split(',') if name] or list(DASHBOARD_WIDGETS)
+    unknown = set(names) - set(DASHBOARD_WIDGETS)
+    if unknown:
+        return Response({"error": f"Unknown widgets: {', '.join(sorted(unknown))}"},
+                        status=status.HTTP_400_BAD_REQUEST)
+
+    started = time.perf_counter()
+    futures = {name: _widget_pool.submit(_widget_data, name, request) for name in names}
+
+    result = {}
+    timings = {}
+    try:
+        for name, future in futures.items():
+            result[name], timings[name] = future.result()
+    except ValueError as e:
+        return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    result['meta'] = {
+        'ms': round((time.perf_counter() - started) * 1000, 2),
+        'widgets': timings,
+    }
+    return Response(result)
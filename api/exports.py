@@ -0,0 +1,131 @@
+import csv
+import tempfile
+
+from django.http import FileResponse, StreamingHttpResponse
+from openpyxl import Workbook
+from rest_framework.renderers import BaseRenderer
+from rest_framework.settings import api_settings
+
+# عدد الصفوف التي تُجلب من قاعدة البيانات في كل دفعة أثناء التصدير
+EXPORT_CHUNK_SIZE = 2000
+
+XLSX_CONTENT_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+
+def _cell(value):
+    """تحويل القيم المتداخلة (قوائم/قواميس) إلى نص يصلح لخلية واحدة"""
+    if isinstance(value, dict):
+        return '; '.join(f"{key}: {_cell(item)}" for key, item in value.items())
+    if isinstance(value, (list, tuple)):
+        return ', '.join(str(_cell(item)) for item in value)
+    return value
+
+
+def _row_values(columns, row):
+    """استخراج قيم الأعمدة من صف بحسب تعريف الأعمدة (header, key أو دالة)"""
+    return [
+        _cell(getter(row) if callable(getter) else row.get(getter))
+        for _, getter in columns
+    ]
+
+
+def _sheets_from_data(data):
+    """تحويل بيانات Response عادية (قاموس أو قائمة قواميس) إلى ورقة واحدة"""
+    rows = data if isinstance(data, list) else [data]
+    keys = []
+    for row in rows:
+        for key in row:
+            if key not in keys:
+                keys.append(key)
+    return [('report', [(key, key) for key in keys], rows)]
+
+
+class _Echo:
+    """كائن يحاكي الملف ويعيد ما يُكتب إليه، لاستخدام csv.writer مع البث"""
+
+    def write(self, value):
+        return value
+
+
+def _csv_lines(sheets):
+    writer = csv.writer(_Echo())
+    # علامة BOM ليتعرف Excel على الترميز UTF-8 للنصوص العربية
+    yield '\ufeff'
+    for index, (title, columns, rows) in enumerate(sheets):
+        if len(sheets) > 1:
+            if index:
+                yield writer.writerow([])
+            yield writer.writerow([title])
+        yield writer.writerow([header for header, _ in columns])
+        for row in rows:
+            yield writer.writerow(_row_values(columns, row))
+
+
+def _write_xlsx(sheets, target):
+    # وضع الكتابة فقط يكتب الصفوف إلى ملفات مؤقتة بدل الاحتفاظ بها في الذاكرة
+    workbook = Workbook(write_only=True)
+    for title, columns, rows in sheets:
+        worksheet = workbook.create_sheet(title=title[:31])
+        worksheet.append([header for header, _ in columns])
+        for row in rows:
+            worksheet.append(_row_values(columns, row))
+    workbook.save(target)
+
+
+class CSVRenderer(BaseRenderer):
+    """عارض CSV لبيانات Response العادية (مثل رسائل الخطأ)"""
+    media_type = 'text/csv'
+    format = 'csv'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return ''.join(_csv_lines(_sheets_from_data(data))).encode(self.charset)
+
+
+class XLSXRenderer(BaseRenderer):
+    """عارض XLSX لبيانات Response العادية (مثل رسائل الخطأ)"""
+    media_type = XLSX_CONTENT_TYPE
+    format = 'xlsx'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        with tempfile.TemporaryFile() as target:
+            _write_xlsx(_sheets_from_data(data), target)
+            target.seek(0)
+            return target.read()
+
+
+EXPORT_FORMATS = (CSVRenderer.format, XLSXRenderer.format)
+
+# العارضات الافتراضية مع إضافة صيغ التصدير (?format=csv أو ?format=xlsx)
+EXPORT_RENDERER_CLASSES = list(api_settings.DEFAULT_RENDERER_CLASSES) + [CSVRenderer, XLSXRenderer]
+
+
+def is_export_request(request):
+    """هل طلب العميل صيغة تصدير بدل JSON؟"""
+    renderer = getattr(request, 'accepted_renderer', None)
+    return renderer is not None and renderer.format in EXPORT_FORMATS
+
+
+def export_response(request, filename, sheets):
+    """
+    بث التقرير كملف CSV أو XLSX
+
+    sheets: قائمة من (title, columns, rows) حيث columns قائمة من (header, key أو دالة)
+    و rows مُكرِّر من القواميس يُستهلك صفاً بصف دون تحميله كاملاً في الذاكرة
+    """
+    if request.accepted_renderer.format == XLSXRenderer.format:
+        target = tempfile.TemporaryFile()
+        _write_xlsx(sheets, target)
+        target.seek(0)
+        response = FileResponse(target, as_attachment=True, filename=f"{filename}.xlsx",
+                                content_type=XLSX_CONTENT_TYPE)
+    else:
+        response = StreamingHttpResponse(_csv_lines(sheets), content_type='text/csv; charset=utf-8')
+        response['Content-Disposition'] = f'attachment; filename="{filename}.csv"'
+    return response
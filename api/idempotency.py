@@ -0,0 +1,143 @@
+"""
+دعم ترويسة Idempotency-Key في نقاط الكتابة المجمّعة
+
+أول طلب بمفتاح جديد يحجز صفاً في جدول IdempotencyKey (المفتاح فريد، فالحجز ذري في قاعدة البيانات)،
+ثم يُنفَّذ ويُحفظ رمز حالته وبياناته في الصف نفسه. إعادة المحاولة بالمفتاح نفسه تحصل على الاستجابة
+المحفوظة دون أي كتابة في الدرجات أو الحضور، والطلب المتزامن بالمفتاح نفسه ينتظر انتهاء الأول بدل أن
+يُنفَّذ مرتين. يُحفظ مع المفتاح بصمة الطلب (العنوان والجسم)، فإعادة استخدام المفتاح بجسم مختلف تُرفض بـ 422
+بدل أن تُعاد لها استجابة طلب آخر. تُحذف المفاتيح بعد IDEMPOTENCY_KEY_TTL.
+"""
+import hashlib
+import tempfile
+import time
+from datetime import timedelta
+from functools import wraps
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.request import Request
+from rest_framework.response import Response
+
+from .models import IdempotencyKey
+
+HEADER = 'Idempotency-Key'
+
+KEY_TTL = getattr(settings, 'IDEMPOTENCY_KEY_TTL', 60 * 60 * 24)
+
+# مدة انتظار الطلب المتزامن قبل الرد بـ 409
+WAIT = getattr(settings, 'IDEMPOTENCY_WAIT', 30)
+
+# مفتاح لم يكتمل بعد هذه المدة يعود لعامل متعطل، فيحق لغيره تنفيذ الطلب
+PENDING_TTL = getattr(settings, 'IDEMPOTENCY_PENDING_TTL', 60 * 10)
+
+POLL_INTERVAL = 0.1
+
+# جسم الطلب يُقرأ على دفعات لحساب بصمته، ويُحفظ في الذاكرة حتى هذا الحجم ثم في ملف مؤقت
+BODY_CHUNK_SIZE = 64 * 1024
+BODY_SPOOL_SIZE = 1024 * 1024
+
+MAX_KEY_LENGTH = IdempotencyKey._meta.get_field('key').max_length
+
+
+def _purge_expired():
+    now = timezone.now()
+    IdempotencyKey.objects.filter(
+        Q(created_at__lt=now - timedelta(seconds=KEY_TTL))
+        | Q(status_code=None, created_at__lt=now - timedelta(seconds=PENDING_TTL))
+    ).delete()
+
+
+def _request_hash(request):
+    """
+    بصمة العنوان الكامل وجسم الطلب
+    الجسم يُقرأ مرة واحدة ثم يُعاد إلى الطلب من ملف مؤقت، فيبقى متاحاً لـ request.data و request.stream
+    دون تحميل ملفات الاستيراد الكبيرة في الذاكرة
+    """
+    digest = hashlib.sha256(request.get_full_path().encode('utf-8'))
+    http_request = request._request
+    if hasattr(http_request, '_body'):
+        digest.update(http_request._body)
+        return digest.hexdigest()
+
+    spool = tempfile.SpooledTemporaryFile(max_size=BODY_SPOOL_SIZE)
+    for chunk in iter(lambda: http_request.read(BODY_CHUNK_SIZE), b''):
+        digest.update(chunk)
+        spool.write(chunk)
+    spool.seek(0)
+    http_request._stream = spool
+    http_request._read_started = False
+    return digest.hexdigest()
+
+
+def _claim(key, path, request_hash):
+    """
+    حجز المفتاح: (None, True) عند نجاح الحجز، وإلا (الصف الموجود, False)
+    الصف قد يكون None إن حُذف بين المحاولتين، فيُعاد الحجز
+    """
+    try:
+        with transaction.atomic():
+            IdempotencyKey.objects.create(key=key, path=path, request_hash=request_hash)
+        return None, True
+    except IntegrityError:
+        return IdempotencyKey.objects.filter(key=key).first(), False
+
+
+def _replay(entry):
+    response = Response(entry.response, status=entry.status_code)
+    response['Idempotent-Replayed'] = 'true'
+    return response
+
+
+def idempotent(view):
+    """
+    مزخرف لدوال api_view وإجراءات ViewSet
+    الطلبات بلا ترويسة Idempotency-Key تُنفَّذ كما هي
+    """
+    @wraps(view)
+    def wrapped(*args, **kwargs):
+        request = next(arg for arg in args if isinstance(arg, Request))
+        key = request.headers.get(HEADER)
+        if not key:
+            return view(*args, **kwargs)
+        if len(key) > MAX_KEY_LENGTH:
+            return Response({"error": f"{HEADER} must be at most {MAX_KEY_LENGTH} characters"},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        request_hash = _request_hash(request)
+        _purge_expired()
+        deadline = time.monotonic() + WAIT
+        while True:
+            entry, claimed = _claim(key, request.path, request_hash)
+            if claimed:
+                break
+            if entry is None:
+                continue
+            if entry.path != request.path:
+                return Response({"error": f"{HEADER} was already used for another endpoint"},
+                                status=status.HTTP_422_UNPROCESSABLE_ENTITY)
+            if entry.request_hash and entry.request_hash != request_hash:
+                return Response({"error": f"{HEADER} was already used with a different request body"},
+                                status=status.HTTP_422_UNPROCESSABLE_ENTITY)
+            if entry.status_code is not None:
+                return _replay(entry)
+            if time.monotonic() > deadline:
+                return Response({"error": f"A request with this {HEADER} is still in progress"},
+                                status=status.HTTP_409_CONFLICT)
+            time.sleep(POLL_INTERVAL)
+
+        try:
+            response = view(*args, **kwargs)
+        except BaseException:
+            IdempotencyKey.objects.filter(key=key, status_code=None).delete()
+            raise
+
+        if response.status_code >= 500 or getattr(response, 'data', None) is None:
+            # أخطاء الخادم لا تُحفظ حتى تُنفَّذ إعادة المحاولة فعلاً
+            IdempotencyKey.objects.filter(key=key, status_code=None).delete()
+        else:
+            IdempotencyKey.objects.filter(key=key).update(status_code=response.status_code, response=response.data)
+        return response
+    return wrapped
@@ -0,0 +1,161 @@
+"""
+استيراد مجمّع للدرجات والحضور من ملفات NDJSON أو CSV
+
+يُقرأ جسم الطلب سطراً بسطر دون تحميله كاملاً في الذاكرة، وتُكتب الصفوف على دفعات ثابتة الحجم
+(IMPORT_CHUNK_SIZE) كل دفعة في معاملتها الخاصة عبر مسار الكتابة المجمّعة نفسه (api.bulk).
+الاستجابة ملخص صغير: عدد الأسطر والسجلات المنشأة والمحدّثة والأخطاء، مع خطأ كل سطر عند ?errors=1.
+"""
+import codecs
+import csv
+import json
+import logging
+
+from django.conf import settings
+from rest_framework import status
+from rest_framework.decorators import api_view
+from rest_framework.response import Response
+
+from .bulk import upsert_attendance, upsert_grades
+from .idempotency import idempotent
+
+logger = logging.getLogger(__name__)
+
+IMPORT_CHUNK_SIZE = getattr(settings, 'IMPORT_CHUNK_SIZE', 500)
+
+# أقصى عدد من أخطاء الأسطر يُعاد في الاستجابة
+MAX_REPORTED_ERRORS = 1000
+
+CSV_CONTENT_TYPES = ('text/csv', 'application/csv')
+
+
+def _lines(stream):
+    """أسطر جسم الطلب نصاً، مع إزالة علامة BOM التي تضيفها برامج الجداول"""
+    decoder = codecs.getincrementaldecoder('utf-8-sig')()
+    for line in stream:
+        yield decoder.decode(line)
+
+
+def ndjson_rows(lines):
+    """(رقم السطر، الصف، الخطأ) لكل سطر JSON غير فارغ"""
+    for number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            yield number, None, f"Invalid JSON: {e}"
+            continue
+        if not isinstance(row, dict):
+            yield number, None, "Each line must be a JSON object"
+            continue
+        yield number, row, None
+
+
+def csv_rows(lines):
+    """(رقم السطر، الصف، الخطأ) لكل صف CSV؛ السطر الأول أسماء الحقول والخلايا الفارغة تُعامل كحقول غائبة"""
+    reader = csv.DictReader(lines)
+    for row in reader:
+        yield reader.line_num, {key: value for key, value in row.items() if key and value not in ('', None)}, None
+
+
+class _ImportSummary:
+    """عدّادات الاستيراد وأخطاء الأسطر (حتى MAX_REPORTED_ERRORS)"""
+
+    def __init__(self, include_errors):
+        self.include_errors = include_errors
+        self.rows = 0
+        self.created = 0
+        self.updated = 0
+        self.error_count = 0
+        self.errors = []
+
+    def error(self, line, error):
+        self.error_count += 1
+        if self.include_errors and len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"line": line, "error": error})
+
+    def data(self):
+        data = {
+            "rows": self.rows,
+            "created": self.created,
+            "updated": self.updated,
+            "error_count": self.error_count,
+        }
+        if self.include_errors:
+            data["errors"] = self.errors
+        return data
+
+
+def _write_chunk(upsert, rows, lines, summary):
+    try:
+        written, errors = upsert(rows)
+    except Exception as e:
+        # الدفعة كلها أُلغيت؛ الدفعات السابقة ثُبّتت في معاملاتها
+        logger.error(f"Error importing lines {lines[0]}-{lines[-1]}: {e}")
+        for line in lines:
+            summary.error(line, str(e))
+        return
+    for _, _, previous in written:
+        if previous is None:
+            summary.created += 1
+        else:
+            summary.updated += 1
+    for index, _, error in errors:
+        summary.error(lines[index], error)
+
+
+def run_import(parsed_rows, upsert, include_errors=False):
+    """
+    كتابة صفوف (رقم السطر، الصف، الخطأ) على دفعات من IMPORT_CHUNK_SIZE صف
+    upsert: upsert_grades أو upsert_attendance
+    """
+    summary = _ImportSummary(include_errors)
+    rows, lines = [], []
+    for line, row, error in parsed_rows:
+        summary.rows += 1
+        if error:
+            summary.error(line, error)
+            continue
+        rows.append(row)
+        lines.append(line)
+        if len(rows) >= IMPORT_CHUNK_SIZE:
+            _write_chunk(upsert, rows, lines, summary)
+            rows, lines = [], []
+    if rows:
+        _write_chunk(upsert, rows, lines, summary)
+    return summary
+
+
+def _import_response(request, upsert):
+    content_type = request.content_type.split(';')[0].strip().lower()
+    parse = csv_rows if content_type in CSV_CONTENT_TYPES else ndjson_rows
+
+    # request.stream يقرأ الجسم تدريجياً (None عندما يكون فارغاً)
+    stream = request.stream
+    summary = run_import(
+        parse(_lines(stream if stream is not None else [])), upsert,
+        include_errors=request.query_params.get('errors') == '1'
+    )
+    if not summary.rows:
+        return Response({"error": "No rows provided"}, status=status.HTTP_400_BAD_REQUEST)
+    return Response(summary.data())
+
+
+@api_view(['POST'])
+@idempotent
+def import_grades(request):
+    """
+    استيراد درجات من NDJSON (سطر JSON لكل درجة) أو CSV (Content-Type: text/csv)
+    الحقول كما في grades/batch-create: student, subject, type, score, max_score, date
+    """
+    return _import_response(request, upsert_grades)
+
+
+@api_view(['POST'])
+@idempotent
+def import_attendance(request):
+    """
+    استيراد سجلات حضور من NDJSON أو CSV (Content-Type: text/csv)
+    الحقول كما في attendances/batch-create: student, schedule, date, status, subject_info
+    """
+    return _import_response(request, upsert_attendance)
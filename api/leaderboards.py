@@ -0,0 +1,354 @@
+"""
+حساب لوحات المتفوقين (champions) دفعة واحدة
+
+كل المؤشرات (نسبة الحضور، نسبة تسليم الواجبات، الملاحظات الإيجابية، متوسط الدرجات،
+متوسط القرآن، التحسن) تُحسب لكل الطلاب بعدد ثابت من الاستعلامات المجمّعة، ثم تُرتَّب
+كل لوحة من النتيجة نفسها وتُحفظ في جدول LeaderboardSnapshot لكل مدة في LEADERBOARD_WINDOWS.
+نقاط النهاية تقرأ من الجدول وترتّب بـ DenseRank في SQL (الطلاب المتساوون في المركز نفسه)،
+على مستوى المدرسة أو مقسّمة بحسب الصف والفصل. يُعاد ملء الجدول عند القراءة إذا غابت اللقطة أو مضى
+عليها أكثر من LEADERBOARD_REFRESH_INTERVAL، أو دورياً بأمر refresh_leaderboards --loop.
+"""
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Avg, Count, F, FloatField, Q, Window
+from django.db.models.functions import Cast, DenseRank
+from django.utils import timezone
+
+from .models import (
+    Assignment, AssignmentSubmission, Attendance, Grade, LeaderboardSnapshot, Note, Student
+)
+from .shared_cache import get_or_set, store
+
+# المدد المحسوبة مسبقاً بالأيام (?term=الاسم أو ?window_days=العدد)
+WINDOWS = getattr(settings, 'LEADERBOARD_WINDOWS', {'month': 30, 'term': 90, 'year': 365})
+
+# المدة الافتراضية: الفصل الدراسي
+SEMESTER_DAYS = WINDOWS.get('term', 90)
+
+DEFAULT_LIMIT = 5
+MAX_LIMIT = 100
+
+# النطاق الوحيد حالياً: كل الطلاب
+SCOPE_ALL = 'all'
+
+# عمر اللقطة الذي يُعاد بعده حسابها عند القراءة
+REFRESH_INTERVAL = getattr(settings, 'LEADERBOARD_REFRESH_INTERVAL', 60 * 15)
+
+# وقت آخر حساب في الذاكرة المشتركة، فلا تكلف القراءة العادية أي استعلام إضافي
+REFRESH_KEY = 'leaderboards:computed_at'
+
+# تُقرأ اللقطة القديمة أثناء إعادة حسابها طوال هذه المدة، ولا ينتظر الحساب إلا أول قراءة بعدها
+REFRESH_STALE_TTL = 60 * 60 * 24 * 7
+
+
+def _round(value):
+    return round(value, 1) if value is not None else None
+
+
+def compute_metrics(today=None, window_days=SEMESTER_DAYS):
+    """
+    مؤشرات كل الطلاب خلال آخر window_days يوماً: قاموس {student_id: {...}}
+    بستة استعلامات مهما كان عدد الطلاب
+    """
+    today = today or timezone.now().date()
+    semester_start = today - timedelta(days=window_days)
+    mid_semester = semester_start + (today - semester_start) / 2
+
+    # created_at حقل وقت، فتُقارن بداية اليوم بالتوقيت المحلي
+    semester_start_at = timezone.make_aware(datetime.combine(semester_start, time.min))
+    mid_semester_at = timezone.make_aware(datetime.combine(mid_semester, time.min))
+
+    students = {
+        student.id: {
+            "id": student.id,
+            "name": student.name,
+            "class": student.class_name.name if student.class_name else "",
+            "section": student.section.name if student.section else "",
+            "image": student.image.url if student.image else None,
+            "class_id": student.class_name_id,
+            "section_id": student.section_id,
+        }
+        for student in Student.objects.select_related('class_name', 'section')
+    }
+
+    attendance = Attendance.objects.filter(date__gte=semester_start).values('student_id').annotate(
+        total=Count('id'),
+        present=Count('id', filter=Q(status='present'))
+    ).order_by()
+    for row in attendance:
+        students[row['student_id']].update(present_days=row['present'], total_days=row['total'])
+
+    # الواجبات مرتبطة بالصف والفصل عبر الحصة
+    assignment_totals = {
+        (row['schedule__class_name'], row['schedule__section']): row['total']
+        for row in Assignment.objects.filter(created_at__gte=semester_start_at).values(
+            'schedule__class_name', 'schedule__section'
+        ).annotate(total=Count('id')).order_by()
+    }
+    submitted = AssignmentSubmission.objects.filter(
+        status='submitted',
+        assignment__created_at__gte=semester_start_at,
+        assignment__schedule__class_name=F('student__class_name'),
+        assignment__schedule__section=F('student__section')
+    ).values('student_id').annotate(submitted=Count('id')).order_by()
+    submitted = {row['student_id']: row['submitted'] for row in submitted}
+    for student_id, student in students.items():
+        total_assignments = assignment_totals.get((student['class_id'], student['section_id']), 0)
+        if total_assignments:
+            student.update(
+                submitted_assignments=submitted.get(student_id, 0),
+                total_assignments=total_assignments
+            )
+
+    positive_notes = Note.objects.filter(type='positive', date__gte=semester_start).values(
+        'student_id'
+    ).annotate(total=Count('id')).order_by()
+    for row in positive_notes:
+        students[row['student_id']]['positive_notes_count'] = row['total']
+
+    # التحسن: متوسط النصف الثاني من المدة ناقص متوسط النصف الأول، بالدرجة الخام وبالنسبة المئوية
+    # (النسبة تساوي بين تقييم من 5 وتقييم من 100)
+    quran = Q(type='quran')
+    early = Q(created_at__lt=mid_semester_at)
+    late = Q(created_at__gte=mid_semester_at)
+    percentage = Cast('score', FloatField()) * 100 / F('max_score')
+    graded = Q(max_score__gt=0)
+    grades = Grade.objects.filter(created_at__gte=semester_start_at).values('student_id').annotate(
+        avg_grade=Avg('score'),
+        grade_count=Count('id'),
+        avg_quran_grade=Avg('score', filter=quran),
+        quran_grade_count=Count('id', filter=quran),
+        early_avg=Avg('score', filter=early),
+        late_avg=Avg('score', filter=late),
+        early_pct=Avg(percentage, filter=early & graded),
+        late_pct=Avg(percentage, filter=late & graded)
+    ).annotate(
+        improvement=F('late_avg') - F('early_avg'),
+        improvement_pct=F('late_pct') - F('early_pct')
+    ).order_by()
+    for row in grades:
+        students[row.pop('student_id')].update(row)
+
+    return students
+
+
+def _board_row(student, fields):
+    row = {key: student[key] for key in ("id", "name", "class", "section", "image")}
+    row.update((field, value(student)) for field, value in fields)
+    return row
+
+
+# لكل لوحة: شرط دخول الطالب، قيمة الترتيب، والحقول المعروضة
+BOARDS = {
+    'attendance': (
+        lambda s: s.get('total_days'),
+        lambda s: s['present_days'] / s['total_days'] * 100,
+        (
+            ('attendance_rate', lambda s: _round(s['present_days'] / s['total_days'] * 100)),
+            ('present_days', lambda s: s['present_days']),
+            ('total_days', lambda s: s['total_days']),
+        ),
+    ),
+    'assignments': (
+        lambda s: s.get('total_assignments'),
+        lambda s: s['submitted_assignments'] / s['total_assignments'] * 100,
+        (
+            ('submission_rate', lambda s: _round(s['submitted_assignments'] / s['total_assignments'] * 100)),
+            ('submitted_assignments', lambda s: s['submitted_assignments']),
+            ('total_assignments', lambda s: s['total_assignments']),
+        ),
+    ),
+    'positive_notes': (
+        lambda s: s.get('positive_notes_count'),
+        lambda s: s['positive_notes_count'],
+        (
+            ('positive_notes_count', lambda s: s['positive_notes_count']),
+        ),
+    ),
+    'grades': (
+        lambda s: s.get('avg_grade') is not None,
+        lambda s: s['avg_grade'],
+        (
+            ('avg_grade', lambda s: _round(s['avg_grade'])),
+            ('grade_count', lambda s: s['grade_count']),
+        ),
+    ),
+    'quran': (
+        lambda s: s.get('avg_quran_grade') is not None,
+        lambda s: s['avg_quran_grade'],
+        (
+            ('avg_quran_grade', lambda s: _round(s['avg_quran_grade'])),
+            ('quran_grade_count', lambda s: s['quran_grade_count']),
+        ),
+    ),
+    'most_improved': (
+        lambda s: s.get('improvement') is not None and s['improvement'] > 0,
+        lambda s: s['improvement'],
+        (
+            ('improvement', lambda s: _round(s['improvement'])),
+            ('early_avg', lambda s: _round(s['early_avg'])),
+            ('late_avg', lambda s: _round(s['late_avg'])),
+        ),
+    ),
+    'most_improved_pct': (
+        lambda s: s.get('improvement_pct') is not None and s['improvement_pct'] > 0,
+        lambda s: s['improvement_pct'],
+        (
+            ('improvement', lambda s: _round(s['improvement_pct'])),
+            ('early_avg', lambda s: _round(s['early_pct'])),
+            ('late_avg', lambda s: _round(s['late_pct'])),
+        ),
+    ),
+}
+
+# أوضاع لوحة التحسن (?mode=): الدرجة الخام أو النسبة المئوية من الدرجة القصوى
+IMPROVEMENT_BOARDS = {'raw': 'most_improved', 'percentage': 'most_improved_pct'}
+
+
+def ranked(metrics, board):
+    """
+    صفوف لوحة واحدة من مؤشرات محسوبة مسبقاً: قائمة من (الترتيب، القيمة، صف العرض)
+    القيمة مقرّبة كما تُعرض حتى يتساوى في الترتيب من يتساوى في القيمة المعروضة
+    """
+    include, score, fields = BOARDS[board]
+    students = sorted(
+        ((_round(score(student)), student) for student in metrics.values() if include(student)),
+        key=lambda item: (-item[0], item[1]['name'])
+    )
+    rows = []
+    position = 0
+    previous = None
+    for value, student in students:
+        if value != previous:
+            position += 1
+            previous = value
+        rows.append((position, value, _board_row(student, fields)))
+    return rows
+
+
+def refresh_snapshots(today=None):
+    """إعادة حساب كل اللوحات لكل المدد واستبدال صفوف الجدول بها في معاملة واحدة"""
+    computed_at = timezone.now()
+    snapshots = []
+    for window_days in sorted(set(WINDOWS.values())):
+        metrics = compute_metrics(today, window_days)
+        snapshots.extend(
+            LeaderboardSnapshot(
+                metric=board, scope=SCOPE_ALL, window_days=window_days, rank=position,
+                student_id=row['id'], value=value, data=row, computed_at=computed_at
+            )
+            for board in BOARDS
+            for position, value, row in ranked(metrics, board)
+        )
+    with transaction.atomic():
+        LeaderboardSnapshot.objects.filter(scope=SCOPE_ALL).delete()
+        LeaderboardSnapshot.objects.bulk_create(snapshots, batch_size=1000)
+    store(REFRESH_KEY, computed_at, REFRESH_INTERVAL, REFRESH_STALE_TTL)
+    return len(snapshots)
+
+
+def _refresh():
+    refresh_snapshots()
+    return timezone.now()
+
+
+def ensure_fresh_snapshots():
+    """
+    إعادة حساب اللقطة إذا لم تُحسب بعد أو مضى عليها REFRESH_INTERVAL، حتى لا تعتمد اللوحات على
+    تشغيل refresh_leaderboards --loop. عملية واحدة فقط تعيد الحساب والبقية تقرأ اللقطة الحالية
+    """
+    get_or_set(REFRESH_KEY, _refresh, REFRESH_INTERVAL, REFRESH_STALE_TTL)
+
+
+def board_params(params):
+    """
+    قراءة معايير اللوحات: class_id, section_id, limit, window_days أو term
+    ترفع ValueError عند قيمة غير صالحة
+    """
+    try:
+        limit = int(params.get('limit', DEFAULT_LIMIT))
+        class_id = int(params['class_id']) if params.get('class_id') else None
+        section_id = int(params['section_id']) if params.get('section_id') else None
+        window_days = int(params.get('window_days', SEMESTER_DAYS))
+    except ValueError:
+        raise ValueError("limit, class_id, section_id and window_days must be integers")
+
+    term = params.get('term')
+    if term:
+        if term not in WINDOWS:
+            raise ValueError(f"term must be one of: {', '.join(WINDOWS)}")
+        window_days = WINDOWS[term]
+    if window_days not in WINDOWS.values():
+        raise ValueError(f"window_days must be one of: {', '.join(str(days) for days in sorted(set(WINDOWS.values())))}")
+
+    return {
+        'limit': min(max(limit, 1), MAX_LIMIT),
+        'class_id': class_id,
+        'section_id': section_id,
+        'window_days': window_days,
+    }
+
+
+def _ranked_snapshots(boards, limit=DEFAULT_LIMIT, class_id=None, section_id=None,
+                      window_days=SEMESTER_DAYS, per_section=False):
+    """
+    استعلام واحد يرتّب الطلاب بـ DenseRank لكل لوحة (ولكل صف وفصل إن طُلب) ويبقي أول limit مركزاً
+    الطلاب المتساوون في القيمة يأخذون المركز نفسه، فقد يزيد عدد الصفوف عن limit
+    """
+    ensure_fresh_snapshots()
+    snapshots = LeaderboardSnapshot.objects.filter(
+        metric__in=boards, scope=SCOPE_ALL, window_days=window_days
+    )
+    if class_id:
+        snapshots = snapshots.filter(student__class_name_id=class_id)
+    if section_id:
+        snapshots = snapshots.filter(student__section_id=section_id)
+
+    partition = [F('metric')]
+    if per_section:
+        partition += [F('student__class_name_id'), F('student__section_id')]
+
+    return snapshots.annotate(
+        position=Window(DenseRank(), partition_by=partition, order_by=F('value').desc()),
+        class_id=F('student__class_name_id'),
+        section_id=F('student__section_id')
+    ).filter(position__lte=limit).order_by(
+        'metric', *(['class_id', 'section_id'] if per_section else []), 'position', 'student__name'
+    ).values_list('metric', 'class_id', 'section_id', 'position', 'data')
+
+
+def _entry(position, data):
+    return dict(data, rank=position)
+
+
+def leaderboard(board, **params):
+    """لوحة واحدة من آخر لقطة محفوظة"""
+    return [_entry(position, data) for _, _, _, position, data in _ranked_snapshots([board], **params)]
+
+
+def leaderboards(**params):
+    """كل اللوحات من آخر لقطة محفوظة باستعلام واحد"""
+    boards = {board: [] for board in BOARDS}
+    for metric, _, _, position, data in _ranked_snapshots(list(BOARDS), **params):
+        boards[metric].append(_entry(position, data))
+    return boards
+
+
+def leaderboard_by_section(board, **params):
+    """
+    أول limit مركزاً في كل صف وفصل باستعلام واحد مقسّم بحسب الفصل
+    قائمة من {class_id, section_id, class, section, students}
+    """
+    sections = {}
+    for _, class_id, section_id, position, data in _ranked_snapshots([board], per_section=True, **params):
+        group = sections.setdefault((class_id, section_id), {
+            'class_id': class_id,
+            'section_id': section_id,
+            'class': data['class'],
+            'section': data['section'],
+            'students': [],
+        })
+        group['students'].append(_entry(position, data))
+    return list(sections.values())
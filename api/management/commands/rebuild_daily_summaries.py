@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from api.models import Student
+from api.rollups import rebuild_daily_summaries
+
+
+class Command(BaseCommand):
+    """
+    إعادة بناء جدول الملخص اليومي من الحضور والدرجات والواجبات
+
+        python manage.py rebuild_daily_summaries
+        python manage.py rebuild_daily_summaries --student 12 --student 15
+    """
+    help = 'Rebuild the StudentDailySummary rollup table from the raw rows'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--student', type=int, action='append', dest='student_ids',
+                            help='Only rebuild these students (repeatable)')
+        parser.add_argument('--chunk-size', type=int, default=100,
+                            help='Number of students rebuilt per transaction')
+
+    def handle(self, *args, **options):
+        student_ids = options['student_ids'] or Student.objects.order_by('id').values_list('id', flat=True)
+        total = rebuild_daily_summaries(student_ids, chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {total} daily summary rows"))
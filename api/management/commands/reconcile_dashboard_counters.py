@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from api.counters import recount_counters
+
+
+class Command(BaseCommand):
+    """
+    إعادة عدّ عدّادات لوحة التحكم من الجداول الأصلية
+    يُشغَّل عند النشر ودورياً (مثلاً مهمة cron ليلية) لتصحيح أي انحراف عن الإشارات
+
+        python manage.py reconcile_dashboard_counters
+    """
+    help = 'Recount the DashboardCounter table from the raw students, attendance and assignments'
+
+    def handle(self, *args, **options):
+        total = recount_counters()
+        self.stdout.write(self.style.SUCCESS(f"Recounted {total} dashboard counters"))
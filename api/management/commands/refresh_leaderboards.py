@@ -0,0 +1,30 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from api.leaderboards import refresh_snapshots
+
+
+class Command(BaseCommand):
+    """
+    إعادة حساب لوحات المتفوقين وحفظها في جدول LeaderboardSnapshot
+
+        python manage.py refresh_leaderboards
+        python manage.py refresh_leaderboards --loop --interval 900
+    """
+    help = 'Recompute the champions boards into the LeaderboardSnapshot table'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true',
+                            help='Keep refreshing every --interval seconds')
+        parser.add_argument('--interval', type=float, default=settings.LEADERBOARD_REFRESH_INTERVAL,
+                            help='Seconds between refreshes with --loop')
+
+    def handle(self, *args, **options):
+        while True:
+            total = refresh_snapshots()
+            self.stdout.write(self.style.SUCCESS(f"Stored {total} leaderboard ranks"))
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
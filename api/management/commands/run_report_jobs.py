@@ -0,0 +1,90 @@
+import multiprocessing
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from api.models import ReportJob
+from api.report_jobs import claim_report_job, claimable_jobs, run_report_job
+
+
+def _close_connections():
+    # كل عملية عاملة تفتح اتصالها الخاص بقاعدة البيانات بدل مشاركة اتصال العملية الأم
+    connections.close_all()
+
+
+class Command(BaseCommand):
+    """
+    تنفيذ مهام التقارير في الخلفية باستخدام مجمع عمليات
+
+        python manage.py run_report_jobs --workers 2
+    """
+    help = 'Run pending report jobs with a local process pool'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=min(4, os.cpu_count() or 1),
+                            help='Number of worker processes')
+        parser.add_argument('--interval', type=float, default=2.0,
+                            help='Seconds to wait between polls when there is nothing to do')
+        parser.add_argument('--once', action='store_true',
+                            help='Exit once no pending jobs are left')
+
+    def _pool(self, workers):
+        # العمال تُنشأ بـ fork فترث إعداد Django الجاهز؛ مع spawn أو forkserver تُعاد قراءة هذه الوحدة
+        # في العملية الجديدة قبل django.setup() فيفشل استيراد النماذج وينكسر المجمع عند كل إنشاء
+        return ProcessPoolExecutor(max_workers=workers, initializer=_close_connections,
+                                   mp_context=multiprocessing.get_context('fork'))
+
+    def _fail(self, job_id, error):
+        ReportJob.objects.filter(id=job_id).update(status='failed', error=error)
+        self.stderr.write(f"Report job {job_id} crashed: {error}")
+
+    def handle(self, *args, **options):
+        workers = options['workers']
+        running = {}
+
+        _close_connections()
+        pool = self._pool(workers)
+        try:
+            while True:
+                # حجز مهام جديدة بقدر العمال المتاحين، مع المهام التي تركها عامل متوقف
+                free_slots = workers - len(running)
+                if free_slots > 0:
+                    job_ids = claimable_jobs().exclude(id__in=running.values()).order_by(
+                        'created_at'
+                    ).values_list('id', flat=True)[:free_slots]
+                    for job_id in job_ids:
+                        if claim_report_job(job_id):
+                            running[pool.submit(run_report_job, job_id)] = job_id
+
+                if not running:
+                    if options['once']:
+                        break
+                    time.sleep(options['interval'])
+                    continue
+
+                done, _ = wait(running, timeout=options['interval'], return_when=FIRST_COMPLETED)
+                broken = False
+                for future in done:
+                    job_id = running.pop(future)
+                    try:
+                        self.stdout.write(f"Report job {job_id}: {future.result()}")
+                    except BrokenProcessPool:
+                        broken = True
+                        self._fail(job_id, "Report worker process exited unexpectedly")
+                    except Exception as e:
+                        # خطأ لم تلتقطه المهمة نفسها؛ تُسجّل كفاشلة
+                        self._fail(job_id, str(e))
+
+                if broken:
+                    # موت إحدى العمليات يُفسد المجمع كله ويُفشل كل مهامه الجارية، فيُنشأ مجمع جديد
+                    for job_id in running.values():
+                        self._fail(job_id, "Report worker process exited unexpectedly")
+                    running.clear()
+                    pool.shutdown(wait=False, cancel_futures=True)
+                    pool = self._pool(workers)
+        finally:
+            pool.shutdown()
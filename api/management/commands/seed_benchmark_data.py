@@ -0,0 +1,104 @@
+import random
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from api.models import (
+    Class, Section, Subject, Student, Schedule,
+    Attendance, Assignment, AssignmentSubmission, Grade
+)
+from api.counters import recount_counters
+from api.rollups import rebuild_daily_summaries
+
+
+class Command(BaseCommand):
+    """
+    إنشاء بيانات تجريبية لقياس أداء التقارير
+
+    تُستخدم مع test_performance.py لمقارنة أزمنة الاستجابة قبل التعديل وبعده:
+        python manage.py seed_benchmark_data --students 600
+        python test_performance.py
+    """
+    help = 'Seed a class/section with students, grades, attendance and assignments for benchmarking'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--students', type=int, default=600)
+        parser.add_argument('--subjects', type=int, default=12)
+        parser.add_argument('--assignments', type=int, default=20)
+        parser.add_argument('--days', type=int, default=30)
+        parser.add_argument('--seed', type=int, default=1)
+
+    @transaction.atomic
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        today = timezone.now().date()
+
+        class_obj = Class.objects.create(name='Benchmark')
+        section = Section.objects.create(name='Benchmark')
+        subjects = Subject.objects.bulk_create([
+            Subject(name=f'Benchmark subject {i}') for i in range(options['subjects'])
+        ])
+        students = Student.objects.bulk_create([
+            Student(name=f'Benchmark student {i:04d}', class_name=class_obj, section=section)
+            for i in range(options['students'])
+        ])
+        schedules = Schedule.objects.bulk_create([
+            Schedule(day=day, period=period, class_name=class_obj, section=section,
+                     subject=subjects[(day * 7 + period) % len(subjects)])
+            for day in range(5)
+            for period in range(1, 8)
+        ])
+
+        grades = []
+        for student in students:
+            for subject in subjects:
+                for grade_type, max_score in (('theory', 15), ('practical', 5), ('participation', 10)):
+                    grades.append(Grade(
+                        student=student, subject=subject, type=grade_type,
+                        score=rng.randint(0, max_score), max_score=max_score,
+                        date=today - timedelta(days=rng.randint(0, options['days']))
+                    ))
+        Grade.objects.bulk_create(grades, batch_size=1000)
+
+        attendances = []
+        for offset in range(options['days']):
+            date = today - timedelta(days=offset)
+            model_day = (date.weekday() + 1) % 7
+            day_schedules = [schedule for schedule in schedules if schedule.day == model_day]
+            for student in students:
+                for schedule in day_schedules[:2]:
+                    attendances.append(Attendance(
+                        student=student, schedule=schedule, date=date,
+                        status='absent' if rng.random() < 0.1 else 'present'
+                    ))
+        Attendance.objects.bulk_create(attendances, batch_size=1000)
+
+        assignments = Assignment.objects.bulk_create([
+            Assignment(title=f'Benchmark assignment {i}', score=10,
+                       due_date=today - timedelta(days=rng.randint(0, options['days'])),
+                       schedule=schedules[i % len(schedules)],
+                       subject=schedules[i % len(schedules)].subject)
+            for i in range(options['assignments'])
+        ])
+        submissions = []
+        for student in students:
+            for assignment in assignments:
+                submitted = rng.random() < 0.8
+                submissions.append(AssignmentSubmission(
+                    student=student, assignment=assignment,
+                    status='submitted' if submitted else 'not_submitted',
+                    score=rng.randint(0, assignment.score) if submitted else 0
+                ))
+        AssignmentSubmission.objects.bulk_create(submissions, batch_size=1000)
+
+        # bulk_create لا يُطلق الإشارات، لذا يُبنى الملخص اليومي وتُعدّ العدّادات مباشرة
+        rebuild_daily_summaries(student.id for student in students)
+        recount_counters()
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Created {len(students)} students, {len(grades)} grades, '
+            f'{len(attendances)} attendance records and {len(submissions)} submissions '
+            f'(class_id={class_obj.id}, section_id={section.id})'
+        ))
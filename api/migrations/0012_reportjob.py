@@ -0,0 +1,37 @@
+# Generated by Django 4.2.7 on 2026-10-18 04:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0011_merge_0002_add_indexes_0010_alter_grade_type'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReportJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('grades', 'تقرير الدرجات'), ('attendance', 'تقرير الحضور'), ('assignments', 'تقرير الواجبات'), ('student', 'تقرير الطالب')], max_length=20, verbose_name='نوع التقرير')),
+                ('params', models.JSONField(blank=True, default=dict, verbose_name='معايير التقرير')),
+                ('status', models.CharField(choices=[('pending', 'في الانتظار'), ('running', 'قيد التنفيذ'), ('completed', 'مكتمل'), ('failed', 'فشل')], default='pending', max_length=10, verbose_name='الحالة')),
+                ('result', models.JSONField(blank=True, null=True, verbose_name='نتيجة التقرير')),
+                ('error', models.TextField(blank=True, null=True, verbose_name='الخطأ')),
+                ('started_at', models.DateTimeField(blank=True, null=True, verbose_name='وقت البدء')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='وقت الانتهاء')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='تاريخ الإنشاء')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='تاريخ التحديث')),
+            ],
+            options={
+                'verbose_name': 'مهمة تقرير',
+                'verbose_name_plural': 'مهام التقارير',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='reportjob',
+            index=models.Index(fields=['status', 'created_at'], name='reportjob_status_created_idx'),
+        ),
+    ]
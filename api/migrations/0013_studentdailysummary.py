@@ -0,0 +1,54 @@
+# Generated by Django 4.2.7 on 2026-10-18 04:58
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0012_reportjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StudentDailySummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='التاريخ')),
+                ('present_count', models.PositiveIntegerField(default=0, verbose_name='عدد الحضور')),
+                ('absent_count', models.PositiveIntegerField(default=0, verbose_name='عدد الغياب')),
+                ('grades_count', models.PositiveIntegerField(default=0, verbose_name='عدد الدرجات')),
+                ('score_sum', models.PositiveIntegerField(default=0, verbose_name='مجموع الدرجات')),
+                ('max_score_sum', models.PositiveIntegerField(default=0, verbose_name='مجموع الدرجات القصوى')),
+                ('submissions_count', models.PositiveIntegerField(default=0, verbose_name='عدد الواجبات')),
+                ('submitted_count', models.PositiveIntegerField(default=0, verbose_name='عدد الواجبات المسلمة')),
+                ('submission_score_sum', models.PositiveIntegerField(default=0, verbose_name='مجموع درجات الواجبات')),
+                ('submission_max_score_sum', models.PositiveIntegerField(default=0, verbose_name='مجموع الدرجات القصوى للواجبات')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='تاريخ التحديث')),
+            ],
+            options={
+                'verbose_name': 'ملخص يومي للطالب',
+                'verbose_name_plural': 'ملخصات يومية للطلاب',
+                'ordering': ['-date', 'student'],
+            },
+        ),
+        migrations.AddField(
+            model_name='studentdailysummary',
+            name='student',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_summaries', to='api.student', verbose_name='الطالب'),
+        ),
+        migrations.AddField(
+            model_name='studentdailysummary',
+            name='subject',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='daily_summaries', to='api.subject', verbose_name='المادة'),
+        ),
+        migrations.AddIndex(
+            model_name='studentdailysummary',
+            index=models.Index(fields=['date', 'student'], name='dailysummary_date_student_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='studentdailysummary',
+            unique_together={('student', 'date', 'subject')},
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 4.2.7 on 2026-10-18 05:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0013_studentdailysummary'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DashboardCounter',
+            fields=[
+                ('key', models.CharField(max_length=64, primary_key=True, serialize=False, verbose_name='المفتاح')),
+                ('name', models.CharField(max_length=32, verbose_name='العدّاد')),
+                ('date', models.DateField(blank=True, null=True, verbose_name='التاريخ')),
+                ('value', models.BigIntegerField(default=0, verbose_name='القيمة')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='تاريخ التحديث')),
+            ],
+            options={
+                'verbose_name': 'عدّاد لوحة التحكم',
+                'verbose_name_plural': 'عدّادات لوحة التحكم',
+                'ordering': ['name', 'date'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='dashboardcounter',
+            index=models.Index(fields=['name', 'date'], name='dashcounter_name_date_idx'),
+        ),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 4.2.7 on 2026-10-18 05:08
+
+import datetime
+
+from django.db import migrations, models
+
+
+# التوقيت الذي كان مكتوباً في get_today_schedule
+DEFAULT_PERIOD_TIMES = [
+    (1, datetime.time(8, 0), datetime.time(8, 45)),
+    (2, datetime.time(8, 45), datetime.time(9, 30)),
+    (3, datetime.time(9, 30), datetime.time(10, 15)),
+    (4, datetime.time(10, 15), datetime.time(11, 0)),
+    (5, datetime.time(11, 0), datetime.time(11, 45)),
+    (6, datetime.time(11, 45), datetime.time(12, 30)),
+    (7, datetime.time(12, 30), datetime.time(13, 15)),
+]
+
+
+def create_default_period_times(apps, schema_editor):
+    PeriodTime = apps.get_model('api', 'PeriodTime')
+    PeriodTime.objects.bulk_create([
+        PeriodTime(period=period, start_time=start_time, end_time=end_time)
+        for period, start_time, end_time in DEFAULT_PERIOD_TIMES
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0014_dashboardcounter'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PeriodTime',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.IntegerField(choices=[(1, 'الحصة الأولى'), (2, 'الحصة الثانية'), (3, 'الحصة الثالثة'), (4, 'الحصة الرابعة'), (5, 'الحصة الخامسة'), (6, 'الحصة السادسة'), (7, 'الحصة السابعة')], unique=True, verbose_name='الحصة')),
+                ('start_time', models.TimeField(verbose_name='وقت البداية')),
+                ('end_time', models.TimeField(verbose_name='وقت النهاية')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='تاريخ الإنشاء')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='تاريخ التحديث')),
+            ],
+            options={
+                'verbose_name': 'توقيت حصة',
+                'verbose_name_plural': 'توقيت الحصص',
+                'ordering': ['start_time'],
+            },
+        ),
+        migrations.RunPython(create_default_period_times, migrations.RunPython.noop),
+    ]
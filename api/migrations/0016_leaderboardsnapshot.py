@@ -0,0 +1,41 @@
+# Generated by Django 4.2.7 on 2026-10-18 05:13
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0015_periodtime'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LeaderboardSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('metric', models.CharField(max_length=32, verbose_name='المؤشر')),
+                ('scope', models.CharField(default='all', max_length=64, verbose_name='النطاق')),
+                ('window_days', models.PositiveIntegerField(verbose_name='المدة بالأيام')),
+                ('rank', models.PositiveIntegerField(verbose_name='الترتيب')),
+                ('value', models.FloatField(verbose_name='القيمة')),
+                ('data', models.JSONField(default=dict, verbose_name='بيانات العرض')),
+                ('computed_at', models.DateTimeField(verbose_name='وقت الحساب')),
+            ],
+            options={
+                'verbose_name': 'ترتيب لوحة المتفوقين',
+                'verbose_name_plural': 'ترتيب لوحات المتفوقين',
+                'ordering': ['metric', 'scope', 'window_days', 'rank'],
+            },
+        ),
+        migrations.AddField(
+            model_name='leaderboardsnapshot',
+            name='student',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='leaderboard_snapshots', to='api.student', verbose_name='الطالب'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='leaderboardsnapshot',
+            unique_together={('metric', 'scope', 'window_days', 'rank')},
+        ),
+    ]
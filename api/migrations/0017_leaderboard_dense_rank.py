@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-18 05:14
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0016_leaderboardsnapshot'),
+    ]
+
+    operations = [
+        migrations.AlterUniqueTogether(
+            name='leaderboardsnapshot',
+            unique_together={('metric', 'scope', 'window_days', 'student')},
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 4.2.7 on 2026-10-18 05:17
+
+from django.db import migrations
+from django.db.models import Count
+
+# أقصى عدد من المفاتيح المكررة يُعرض في رسالة الخطأ
+MAX_LISTED = 50
+
+
+def check_duplicate_grades(apps, schema_editor):
+    # لا تُحذف أي درجة تلقائياً: الدرجات المكررة تُعرض ليقرر المشرف أيها يبقى ثم يُعاد الترحيل
+    Grade = apps.get_model('api', 'Grade')
+    key = ('student', 'subject', 'type', 'date')
+    duplicates = list(Grade.objects.values(*key).annotate(total=Count('id')).filter(total__gt=1).order_by(*key))
+    if not duplicates:
+        return
+
+    lines = []
+    for row in duplicates[:MAX_LISTED]:
+        grades = Grade.objects.filter(**{field: row[field] for field in key}).order_by('id')
+        lines.append(
+            f"student={row['student']} subject={row['subject']} type={row['type']} date={row['date']}: "
+            + ', '.join(f"id={grade.id} score={grade.score}/{grade.max_score}" for grade in grades)
+        )
+    if len(duplicates) > MAX_LISTED:
+        lines.append(f"... and {len(duplicates) - MAX_LISTED} more")
+    raise RuntimeError(
+        f"{len(duplicates)} (student, subject, type, date) keys have more than one grade. "
+        "Delete or correct the extra rows, then run the migration again:\n" + '\n'.join(lines)
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0017_leaderboard_dense_rank'),
+    ]
+
+    operations = [
+        migrations.RunPython(check_duplicate_grades, migrations.RunPython.noop),
+        migrations.AlterUniqueTogether(
+            name='grade',
+            unique_together={('student', 'subject', 'type', 'date')},
+        ),
+    ]
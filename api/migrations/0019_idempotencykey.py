@@ -0,0 +1,33 @@
+# Generated by Django 4.2.7 on 2026-10-18 05:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0018_grade_unique_per_day'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IdempotencyKey',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=255, unique=True, verbose_name='المفتاح')),
+                ('path', models.CharField(max_length=255, verbose_name='المسار')),
+                ('status_code', models.PositiveSmallIntegerField(blank=True, null=True, verbose_name='رمز الحالة')),
+                ('response', models.JSONField(blank=True, null=True, verbose_name='الاستجابة')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='تاريخ الإنشاء')),
+            ],
+            options={
+                'verbose_name': 'مفتاح طلب مكرر',
+                'verbose_name_plural': 'مفاتيح الطلبات المكررة',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='idempotencykey',
+            index=models.Index(fields=['created_at'], name='idempotency_created_idx'),
+        ),
+    ]
@@ -117,6 +117,28 @@ class Schedule(models.Model):
     def __str__(self):
         return f"{self.get_day_display()} - {self.get_period_display()} - {self.class_name} {self.section} - {self.subject}"
 
+class PeriodTime(models.Model):
+    """توقيت الحصص الدراسية"""
+    period = models.IntegerField(choices=Schedule.PERIOD_CHOICES, unique=True, verbose_name="الحصة")
+    start_time = models.TimeField(verbose_name="وقت البداية")
+    end_time = models.TimeField(verbose_name="وقت النهاية")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="تاريخ الإنشاء")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="تاريخ التحديث")
+
+    class Meta:
+        verbose_name = "توقيت حصة"
+        verbose_name_plural = "توقيت الحصص"
+        ordering = ['start_time']
+
+    def __str__(self):
+        return f"{self.get_period_display()} ({self.start_time:%H:%M} - {self.end_time:%H:%M})"
+
+    @property
+    def duration(self):
+        """مدة الحصة بالدقائق"""
+        return (self.end_time.hour * 60 + self.end_time.minute) - (self.start_time.hour * 60 + self.start_time.minute)
+
+
 class Attendance(models.Model):
     """نموذج الحضور والغياب"""
     STATUS_CHOICES = [
@@ -208,6 +230,7 @@ class Grade(models.Model):
         verbose_name = "درجة"
         verbose_name_plural = "درجات"
         ordering = ['-date', 'student__name']
+        unique_together = ['student', 'subject', 'type', 'date']
 
     def __str__(self):
         return f"{self.student} - {self.subject} - {self.get_type_display()} - {self.score}/{self.max_score}"
@@ -279,3 +302,143 @@ class Notification(models.Model):
 
     def __str__(self):
         return self.title
+
+
+class ReportJob(models.Model):
+    """نموذج مهام التقارير التي تُنفّذ في الخلفية"""
+    KIND_CHOICES = [
+        ('grades', "تقرير الدرجات"),
+        ('attendance', "تقرير الحضور"),
+        ('assignments', "تقرير الواجبات"),
+        ('student', "تقرير الطالب"),
+    ]
+
+    STATUS_CHOICES = [
+        ('pending', "في الانتظار"),
+        ('running', "قيد التنفيذ"),
+        ('completed', "مكتمل"),
+        ('failed', "فشل"),
+    ]
+
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES, verbose_name="نوع التقرير")
+    params = models.JSONField(default=dict, blank=True, verbose_name="معايير التقرير")
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending', verbose_name="الحالة")
+    result = models.JSONField(blank=True, null=True, verbose_name="نتيجة التقرير")
+    error = models.TextField(blank=True, null=True, verbose_name="الخطأ")
+    started_at = models.DateTimeField(blank=True, null=True, verbose_name="وقت البدء")
+    finished_at = models.DateTimeField(blank=True, null=True, verbose_name="وقت الانتهاء")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="تاريخ الإنشاء")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="تاريخ التحديث")
+
+    class Meta:
+        verbose_name = "مهمة تقرير"
+        verbose_name_plural = "مهام التقارير"
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'created_at'], name='reportjob_status_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_kind_display()} - {self.get_status_display()}"
+
+
+class StudentDailySummary(models.Model):
+    """ملخص يومي مجمّع لكل طالب ومادة (يُحدَّث تلقائياً من الحضور والدرجات والواجبات)"""
+    student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name='daily_summaries', verbose_name="الطالب")
+    date = models.DateField(verbose_name="التاريخ")
+    subject = models.ForeignKey(Subject, on_delete=models.CASCADE, blank=True, null=True,
+                                related_name='daily_summaries', verbose_name="المادة")
+    present_count = models.PositiveIntegerField(default=0, verbose_name="عدد الحضور")
+    absent_count = models.PositiveIntegerField(default=0, verbose_name="عدد الغياب")
+    grades_count = models.PositiveIntegerField(default=0, verbose_name="عدد الدرجات")
+    score_sum = models.PositiveIntegerField(default=0, verbose_name="مجموع الدرجات")
+    max_score_sum = models.PositiveIntegerField(default=0, verbose_name="مجموع الدرجات القصوى")
+    submissions_count = models.PositiveIntegerField(default=0, verbose_name="عدد الواجبات")
+    submitted_count = models.PositiveIntegerField(default=0, verbose_name="عدد الواجبات المسلمة")
+    submission_score_sum = models.PositiveIntegerField(default=0, verbose_name="مجموع درجات الواجبات")
+    submission_max_score_sum = models.PositiveIntegerField(default=0, verbose_name="مجموع الدرجات القصوى للواجبات")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="تاريخ التحديث")
+
+    class Meta:
+        verbose_name = "ملخص يومي للطالب"
+        verbose_name_plural = "ملخصات يومية للطلاب"
+        ordering = ['-date', 'student']
+        unique_together = ['student', 'date', 'subject']
+        indexes = [
+            models.Index(fields=['date', 'student'], name='dailysummary_date_student_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.student} - {self.date} - {self.subject}"
+
+
+class DashboardCounter(models.Model):
+    """
+    عدّادات مؤشرات لوحة التحكم تُحدَّث مع كل كتابة بدل العدّ عند كل طلب
+    العدّادات المرتبطة بيوم (الحضور، تواريخ تسليم الواجبات) لها صف لكل تاريخ
+    """
+    key = models.CharField(max_length=64, primary_key=True, verbose_name="المفتاح")
+    name = models.CharField(max_length=32, verbose_name="العدّاد")
+    date = models.DateField(null=True, blank=True, verbose_name="التاريخ")
+    value = models.BigIntegerField(default=0, verbose_name="القيمة")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="تاريخ التحديث")
+
+    class Meta:
+        verbose_name = "عدّاد لوحة التحكم"
+        verbose_name_plural = "عدّادات لوحة التحكم"
+        ordering = ['name', 'date']
+        indexes = [
+            models.Index(fields=['name', 'date'], name='dashcounter_name_date_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.key}: {self.value}"
+
+
+class LeaderboardSnapshot(models.Model):
+    """
+    ترتيب محسوب مسبقاً للوحات المتفوقين
+    صف لكل (مؤشر، نطاق، مدة، طالب) مع قيمته وترتيبه على مستوى المدرسة (المتساوون في المركز نفسه)
+    يُعاد ملؤه دورياً بأمر refresh_leaderboards، ويُعاد الترتيب داخل الصف أو الفصل عند القراءة
+    """
+    metric = models.CharField(max_length=32, verbose_name="المؤشر")
+    scope = models.CharField(max_length=64, default='all', verbose_name="النطاق")
+    window_days = models.PositiveIntegerField(verbose_name="المدة بالأيام")
+    rank = models.PositiveIntegerField(verbose_name="الترتيب")
+    student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name='leaderboard_snapshots', verbose_name="الطالب")
+    value = models.FloatField(verbose_name="القيمة")
+    data = models.JSONField(default=dict, verbose_name="بيانات العرض")
+    computed_at = models.DateTimeField(verbose_name="وقت الحساب")
+
+    class Meta:
+        verbose_name = "ترتيب لوحة المتفوقين"
+        verbose_name_plural = "ترتيب لوحات المتفوقين"
+        ordering = ['metric', 'scope', 'window_days', 'rank']
+        unique_together = ['metric', 'scope', 'window_days', 'student']
+
+    def __str__(self):
+        return f"{self.metric} ({self.scope}, {self.window_days}) #{self.rank}: {self.student}"
+
+
+class IdempotencyKey(models.Model):
+    """
+    استجابة محفوظة لطلب كتابة مجمّعة بحسب ترويسة Idempotency-Key
+    الصف بلا status_code يعني أن الطلب الأول ما زال يُنفَّذ
+    """
+    key = models.CharField(max_length=255, unique=True, verbose_name="المفتاح")
+    path = models.CharField(max_length=255, verbose_name="المسار")
+    request_hash = models.CharField(max_length=64, blank=True, verbose_name="بصمة الطلب")
+    status_code = models.PositiveSmallIntegerField(null=True, blank=True, verbose_name="رمز الحالة")
+    response = models.JSONField(null=True, blank=True, verbose_name="الاستجابة")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="تاريخ الإنشاء")
+
+    class Meta:
+        verbose_name = "مفتاح طلب مكرر"
+        verbose_name_plural = "مفاتيح الطلبات المكررة"
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['created_at'], name='idempotency_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.key} ({self.path})"
@@ -0,0 +1,162 @@
+"""
+تخزين مؤقت لنتائج التقارير مع أرقام أجيال (generations) للإبطال
+
+مفتاح كل تقرير يتكوّن من معاييره بعد توحيدها ومن رقم جيل نطاقه (الصف، الفصل) أو الطالب.
+عند أي تعديل على الدرجات أو الحضور أو الواجبات أو الملاحظات يُزاد رقم جيل النطاق،
+فتصبح المفاتيح القديمة غير قابلة للوصول ولا تُعاد بيانات أقدم من آخر كتابة.
+"""
+import hashlib
+import json
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from .shared_cache import get_or_set, incr
+
+REPORT_CACHE_TTL = getattr(settings, 'REPORT_CACHE_TTL', settings.CACHE_TTL)
+
+REPORT_NAMES = ('grades', 'attendance', 'assignments', 'student', 'trends')
+
+# تعديلات البنية (الجداول، الواجبات، المواد، الصفوف) نادرة فتُبطل كل التقارير
+STRUCTURE_SCOPE = 'report-gen:structure'
+
+# معايير لا تؤثر في محتوى التقرير
+IGNORED_PARAMS = ('format',)
+
+
+def scope_key(class_id=None, section_id=None):
+    return f"report-gen:scope:{class_id or '*'}:{section_id or '*'}"
+
+
+def student_scope_key(student_id):
+    return f"report-gen:student:{student_id}"
+
+
+def _student_scope_keys(student_id, class_id, section_id):
+    """كل النطاقات التي يظهر فيها الطالب: صفه وفصله، الصف كاملاً، الفصل كاملاً، والمدرسة"""
+    return {
+        scope_key(class_id, section_id),
+        scope_key(class_id, None),
+        scope_key(None, section_id),
+        scope_key(None, None),
+        student_scope_key(student_id),
+    }
+
+
+def _bump(keys):
+    # يكفي أن يتغير الجيل: قيمة زمنية جديدة لكل المفاتيح بكتابة مجمّعة واحدة (set_many)
+    # بدل incr لكل مفتاح، ولا تتكرر قيمة قديمة حتى إذا حُذف المفتاح من الذاكرة
+    cache.set_many(dict.fromkeys(keys, time.time_ns()), None)
+
+
+def bump_generations(keys):
+    """
+    زيادة أرقام الأجيال الآن وبعد تثبيت المعاملة
+    الزيادة الثانية تُبطل أي نتيجة حُسبت أثناء المعاملة من بيانات لم تُثبّت بعد
+    """
+    keys = set(keys)
+    if not keys:
+        return
+    _bump(keys)
+    transaction.on_commit(lambda: _bump(keys))
+
+
+def invalidate_students(students):
+    """إبطال تقارير مجموعة طلاب؛ students: مُكرِّر من (student_id, class_id, section_id)"""
+    keys = set()
+    for student_id, class_id, section_id in students:
+        keys |= _student_scope_keys(student_id, class_id, section_id)
+    bump_generations(keys)
+
+
+def invalidate_student_ids(student_ids):
+    """إبطال تقارير طلاب بمعرّفاتهم (لمسارات الكتابة المجمّعة التي لا تُطلق الإشارات)"""
+    from .models import Student
+
+    invalidate_students(
+        Student.objects.filter(id__in=set(student_ids)).values_list('id', 'class_name_id', 'section_id')
+    )
+
+
+def invalidate_structure():
+    bump_generations({STRUCTURE_SCOPE})
+
+
+def _generations(keys):
+    values = cache.get_many(keys)
+    for key in keys:
+        if key not in values:
+            cache.add(key, time.time_ns(), None)
+            values[key] = cache.get(key)
+    return [values[key] for key in keys]
+
+
+def _normalize(params):
+    normalized = {
+        key: ','.join(sorted(params.getlist(key))) if hasattr(params, 'getlist') else str(params[key])
+        for key in params
+        if key not in IGNORED_PARAMS and params.get(key) not in (None, '')
+    }
+    # تاريخ النهاية الافتراضي هو اليوم، فيجب أن يتغير المفتاح بتغير اليوم
+    normalized.setdefault('date_to', timezone.now().date().isoformat())
+    return normalized
+
+
+def _record(report, outcome):
+    incr(f"report-cache-stats:{report}:{outcome}")
+
+
+def report_version(report, params, scope):
+    """
+    بصمة التقرير: معاييره الموحّدة مع أجيال نطاقه
+    تتغير مع كل كتابة تمس النطاق، فتصلح مفتاحاً للذاكرة المؤقتة وقيمة ETag معاً
+    """
+    normalized = _normalize(params)
+    generations = _generations([scope, STRUCTURE_SCOPE])
+    return hashlib.md5(
+        json.dumps([report, normalized, generations], sort_keys=True).encode('utf-8')
+    ).hexdigest()
+
+
+def get_or_compute(report, params, scope, compute, version=None):
+    """
+    إعادة التقرير من الذاكرة المؤقتة أو حسابه وتخزينه
+    report: اسم التقرير، scope: مفتاح جيل النطاق، compute: دالة تحسب البيانات
+    version: بصمة محسوبة مسبقاً بـ report_version (اختياري)
+    """
+    key = f"report:{report}:{version or report_version(report, params, scope)}"
+
+    computed = []
+
+    def compute_and_record():
+        computed.append(True)
+        return compute()
+
+    # المفتاح يتغير مع كل كتابة، فلا حاجة لمدة قيمة قديمة؛ القفل وحده يمنع الحساب المتزامن
+    data = get_or_set(key, compute_and_record, REPORT_CACHE_TTL, stale_ttl=0)
+    _record(report, 'misses' if computed else 'hits')
+    return data
+
+
+def cache_stats():
+    """عدد مرات الإصابة والإخفاق لكل تقرير وللمجموع"""
+    keys = [f"report-cache-stats:{report}:{outcome}" for report in REPORT_NAMES for outcome in ('hits', 'misses')]
+    values = cache.get_many(keys)
+
+    reports = {}
+    for report in REPORT_NAMES:
+        hits = values.get(f"report-cache-stats:{report}:hits", 0)
+        misses = values.get(f"report-cache-stats:{report}:misses", 0)
+        reports[report] = {'hits': hits, 'misses': misses}
+
+    hits = sum(report['hits'] for report in reports.values())
+    misses = sum(report['misses'] for report in reports.values())
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_rate': round(hits / (hits + misses) * 100, 2) if hits + misses else 0,
+        'reports': reports,
+    }
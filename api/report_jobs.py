@@ -0,0 +1,104 @@
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.decorators import api_view
+from rest_framework.response import Response
+
+from .models import ReportJob
+from .reports import (
+    ReportError, grades_report_rows, attendance_report_rows,
+    assignments_report_rows, student_report_data
+)
+from .serializers import ReportJobSerializer, ReportJobSummarySerializer
+
+logger = logging.getLogger(__name__)
+
+# منطق التقارير الحالي مُعاد استخدامه كأنواع للمهام
+REPORT_JOB_KINDS = {
+    'grades': lambda params: list(grades_report_rows(params)),
+    'attendance': lambda params: list(attendance_report_rows(params)),
+    'assignments': lambda params: list(assignments_report_rows(params)),
+    'student': student_report_data,
+}
+
+
+# مهمة قيد التنفيذ منذ أكثر من هذه المدة تعود لعامل توقف، فيُعاد حجزها وتنفيذها
+REPORT_JOB_TIMEOUT = getattr(settings, 'REPORT_JOB_TIMEOUT', 60 * 30)
+
+
+def claimable_jobs():
+    """المهام في الانتظار، والمهام العالقة في running بعد توقف العامل الذي حجزها"""
+    stale_before = timezone.now() - timedelta(seconds=REPORT_JOB_TIMEOUT)
+    return ReportJob.objects.filter(Q(status='pending') | Q(status='running', started_at__lt=stale_before))
+
+
+def claim_report_job(job_id):
+    """
+    حجز مهمة في الانتظار (أو عالقة) لتنفيذها
+    التحديث الشرطي يضمن أن عاملاً واحداً فقط يحجز المهمة، فوقت البدء الجديد يخرجها من العالقة
+    """
+    return claimable_jobs().filter(id=job_id).update(
+        status='running', started_at=timezone.now()
+    ) == 1
+
+
+def run_report_job(job_id):
+    """
+    تنفيذ مهمة محجوزة وتخزين نتيجتها
+    تُستدعى من عمليات مجمع العمال في الأمر run_report_jobs
+    """
+    job = ReportJob.objects.get(id=job_id)
+
+    try:
+        job.result = REPORT_JOB_KINDS[job.kind](job.params)
+        job.status = 'completed'
+    except ReportError as e:
+        job.error = str(e)
+        job.status = 'failed'
+    except Exception as e:
+        logger.exception(f"Error running report job {job_id}")
+        job.error = str(e)
+        job.status = 'failed'
+
+    job.finished_at = timezone.now()
+    job.save(update_fields=['result', 'error', 'status', 'finished_at', 'updated_at'])
+    return job.status
+
+
+@api_view(['GET', 'POST'])
+def report_jobs(request):
+    """
+    List recent report jobs or submit a new one
+    Body: {"kind": "grades|attendance|assignments|student", "params": {...report filters}}
+    """
+    if request.method == 'GET':
+        jobs = ReportJob.objects.defer('result')[:50]
+        serializer = ReportJobSummarySerializer(jobs, many=True)
+        return Response(serializer.data)
+
+    serializer = ReportJobSerializer(data=request.data)
+    if serializer.is_valid():
+        params = dict(serializer.validated_data.get('params') or {})
+        # تثبيت تاريخ النهاية عند الإرسال حتى لا يتغير التقرير بتأخر تنفيذه
+        params.setdefault('date_to', timezone.now().date().isoformat())
+        job = serializer.save(params=params)
+        return Response(ReportJobSummarySerializer(job).data, status=status.HTTP_202_ACCEPTED)
+    return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
+@api_view(['GET'])
+def report_job_detail(request, pk):
+    """
+    Poll a report job; the report payload is included once it has completed
+    """
+    try:
+        job = ReportJob.objects.get(pk=pk)
+    except ReportJob.DoesNotExist:
+        return Response({"error": "Report job not found"}, status=status.HTTP_404_NOT_FOUND)
+
+    serializer = ReportJobSerializer(job)
+    return Response(serializer.data)
@@ -1,12 +1,19 @@
 from django.db.models import Count, Sum, Avg, Q, F
+from django.db.models.functions import Coalesce, TruncMonth, TruncWeek
 from django.utils import timezone
 from rest_framework import status
-from rest_framework.decorators import api_view
+from rest_framework.decorators import api_view, renderer_classes
 from rest_framework.response import Response
 
+from .exports import (
+    EXPORT_CHUNK_SIZE, EXPORT_RENDERER_CLASSES, is_export_request, export_response
+)
+from .report_cache import get_or_compute, report_version, scope_key, student_scope_key, cache_stats
+from .conditional import not_modified_response, set_validators
+
 from .models import (
-    Student, Class, Section, Subject, 
-    Grade, Attendance, Assignment, AssignmentSubmission, Note
+    Student, Class, Section, 
+    Grade, Attendance, Assignment, AssignmentSubmission, Note, StudentDailySummary
 )
 from .serializers import (
     StudentDetailSerializer, GradeDetailSerializer, 
@@ -14,17 +21,67 @@ from .serializers import (
     NoteDetailSerializer
 )
 
-@api_view(['GET'])
-def grades_report(request):
+def _percentage(part, total):
+    """Return part/total as a percentage rounded to 2 places (0 when total is 0)"""
+    if total > 0:
+        return round((part / total) * 100, 2)
+    return 0
+
+# Id filters that also select the cache scope of a report
+ID_PARAMS = ('student_id', 'class_id', 'section_id', 'subject_id')
+
+def _report_params(request):
     """
-    Generate a grades report based on filters
+    Query parameters with the id filters in canonical integer form (ReportError when not an integer)
+    Writes only bump the generation of the integer ids, so ?class_id=01 must share the key of ?class_id=1
+    """
+    params = request.query_params.copy()
+    for name in ID_PARAMS:
+        value = _id_param(params, name)
+        if value is not None:
+            params[name] = str(value)
+    return params
+
+def _report_response(request, report, compute, by_student=False):
+    """
+    JSON report response served from the report cache
+    The cache version doubles as the ETag, so unchanged reports answer 304 without any query
+    compute receives the parsed parameters; by_student scopes the cache to ?student_id= when given
+    """
+    try:
+        params = _report_params(request)
+        if by_student and params.get('student_id'):
+            scope = student_scope_key(params['student_id'])
+        else:
+            scope = scope_key(params.get('class_id'), params.get('section_id'))
+
+        version = report_version(report, params, scope)
+        etag = f'"{version}"'
+        not_modified = not_modified_response(request, etag=etag)
+        if not_modified is not None:
+            return not_modified
+
+        data = get_or_compute(report, params, scope, lambda: compute(params), version)
+    except ReportError as e:
+        return Response({"error": str(e)}, status=e.status_code)
+    return set_validators(Response(data), etag=etag)
+
+def _iterate(queryset, chunk_size=None):
+    """Iterate a queryset, streaming it in chunks when chunk_size is given"""
+    if chunk_size:
+        return queryset.iterator(chunk_size=chunk_size)
+    return queryset
+
+def grades_report_rows(params, chunk_size=None):
+    """
+    Yield one grades report entry per student
     Filters: class_id, section_id, subject_id, date_from, date_to
     """
-    class_id = request.query_params.get('class_id')
-    section_id = request.query_params.get('section_id')
-    subject_id = request.query_params.get('subject_id')
-    date_from = request.query_params.get('date_from')
-    date_to = request.query_params.get('date_to', timezone.now().date())
+    class_id = params.get('class_id')
+    section_id = params.get('section_id')
+    subject_id = params.get('subject_id')
+    date_from = params.get('date_from')
+    date_to = params.get('date_to', timezone.now().date())
     
     # Base query
     grades = Grade.objects.all()
@@ -44,70 +101,87 @@ def grades_report(request):
     
     grades = grades.filter(date__lte=date_to)
     
-    # Group by student and calculate statistics
-    students = Student.objects.filter(
-        id__in=grades.values_list('student_id', flat=True).distinct()
-    )
-    
-    result = []
-    for student in students:
-        student_grades = grades.filter(student=student)
-        
-        # Calculate average score
-        total_score = sum(grade.score for grade in student_grades)
-        total_max_score = sum(grade.max_score for grade in student_grades)
-        
-        if total_max_score > 0:
-            average_percentage = (total_score / total_max_score) * 100
-        else:
-            average_percentage = 0
-        
-        # Get subject names
-        subjects = Subject.objects.filter(
-            id__in=student_grades.values_list('subject_id', flat=True).distinct()
-        )
-        subject_scores = {}
-        
-        for subject in subjects:
-            subject_grades = student_grades.filter(subject=subject)
-            subject_total_score = sum(grade.score for grade in subject_grades)
-            subject_total_max = sum(grade.max_score for grade in subject_grades)
-            
-            if subject_total_max > 0:
-                subject_percentage = (subject_total_score / subject_total_max) * 100
-            else:
-                subject_percentage = 0
-                
-            subject_scores[subject.name] = {
-                'score': subject_total_score,
-                'max_score': subject_total_max,
-                'percentage': round(subject_percentage, 2)
+    # Aggregate every (student, subject) pair in a single grouped query
+    rows = grades.values(
+        'student_id', 'student__name',
+        'student__class_name__name', 'student__section__name',
+        'subject__name'
+    ).annotate(
+        score_sum=Sum('score'),
+        max_score_sum=Sum('max_score'),
+        grades_count=Count('id')
+    ).order_by('student__name', 'student_id', 'subject__name')
+    
+    # Fold the grouped rows (ordered by student) into one entry per student
+    current = None
+    for row in _iterate(rows, chunk_size):
+        if current is None or current['student_id'] != row['student_id']:
+            if current is not None:
+                current['average_percentage'] = _percentage(current['total_score'], current['total_max_score'])
+                yield current
+            current = {
+                'student_id': row['student_id'],
+                'student_name': row['student__name'],
+                'class_name': row['student__class_name__name'],
+                'section_name': row['student__section__name'],
+                'total_score': 0,
+                'total_max_score': 0,
+                'average_percentage': 0,
+                'subject_scores': {},
+                'grades_count': 0
             }
         
-        result.append({
-            'student_id': student.id,
-            'student_name': student.name,
-            'class_name': student.class_name.name,
-            'section_name': student.section.name,
-            'total_score': total_score,
-            'total_max_score': total_max_score,
-            'average_percentage': round(average_percentage, 2),
-            'subject_scores': subject_scores,
-            'grades_count': student_grades.count()
-        })
-    
-    return Response(result)
+        current['total_score'] += row['score_sum']
+        current['total_max_score'] += row['max_score_sum']
+        current['grades_count'] += row['grades_count']
+        current['subject_scores'][row['subject__name']] = {
+            'score': row['score_sum'],
+            'max_score': row['max_score_sum'],
+            'percentage': _percentage(row['score_sum'], row['max_score_sum'])
+        }
+    
+    if current is not None:
+        current['average_percentage'] = _percentage(current['total_score'], current['total_max_score'])
+        yield current
+
+GRADES_REPORT_COLUMNS = [
+    ('student_id', 'student_id'),
+    ('student_name', 'student_name'),
+    ('class_name', 'class_name'),
+    ('section_name', 'section_name'),
+    ('total_score', 'total_score'),
+    ('total_max_score', 'total_max_score'),
+    ('average_percentage', 'average_percentage'),
+    ('grades_count', 'grades_count'),
+    ('subject_scores', lambda row: '; '.join(
+        f"{name}: {scores['score']}/{scores['max_score']}"
+        for name, scores in row['subject_scores'].items()
+    )),
+]
 
 @api_view(['GET'])
-def attendance_report(request):
+@renderer_classes(EXPORT_RENDERER_CLASSES)
+def grades_report(request):
     """
-    Generate an attendance report based on filters
+    Generate a grades report based on filters
+    Filters: class_id, section_id, subject_id, date_from, date_to
+    Export: format=csv|xlsx
+    """
+    if is_export_request(request):
+        rows = grades_report_rows(request.query_params, chunk_size=EXPORT_CHUNK_SIZE)
+        return export_response(request, 'grades_report', [('grades', GRADES_REPORT_COLUMNS, rows)])
+    
+    return _report_response(request, 'grades', lambda params: list(grades_report_rows(params)))
+
+def attendance_report_rows(params, chunk_size=None):
+    """
+    Yield one attendance report entry per student
     Filters: class_id, section_id, date_from, date_to
     """
-    class_id = request.query_params.get('class_id')
-    section_id = request.query_params.get('section_id')
-    date_from = request.query_params.get('date_from')
-    date_to = request.query_params.get('date_to', timezone.now().date())
+    class_id = params.get('class_id')
+    section_id = params.get('section_id')
+    date_from = params.get('date_from')
+    date_to = params.get('date_to', timezone.now().date())
     
     # Base query
     attendances = Attendance.objects.all()
@@ -124,49 +198,61 @@ def attendance_report(request):
     
     attendances = attendances.filter(date__lte=date_to)
     
-    # Group by student and calculate statistics
-    students = Student.objects.filter(
-        id__in=attendances.values_list('student_id', flat=True).distinct()
-    )
-    
-    result = []
-    for student in students:
-        student_attendances = attendances.filter(student=student)
-        
-        # Calculate attendance statistics
-        total_days = student_attendances.count()
-        present_days = student_attendances.filter(status='present').count()
-        absent_days = total_days - present_days
+    # Count total and present records per student in a single grouped query
+    rows = attendances.values(
+        'student_id', 'student__name',
+        'student__class_name__name', 'student__section__name'
+    ).annotate(
+        total_days=Count('id'),
+        present_days=Count('id', filter=Q(status='present'))
+    ).order_by('student__name', 'student_id')
+    
+    for row in _iterate(rows, chunk_size):
+        total_days = row['total_days']
+        present_days = row['present_days']
         
-        if total_days > 0:
-            attendance_percentage = (present_days / total_days) * 100
-        else:
-            attendance_percentage = 0
-        
-        result.append({
-            'student_id': student.id,
-            'student_name': student.name,
-            'class_name': student.class_name.name,
-            'section_name': student.section.name,
+        yield {
+            'student_id': row['student_id'],
+            'student_name': row['student__name'],
+            'class_name': row['student__class_name__name'],
+            'section_name': row['student__section__name'],
             'total_days': total_days,
             'present_days': present_days,
-            'absent_days': absent_days,
-            'attendance_percentage': round(attendance_percentage, 2)
-        })
-    
-    return Response(result)
+            'absent_days': total_days - present_days,
+            'attendance_percentage': _percentage(present_days, total_days)
+        }
+
+ATTENDANCE_REPORT_COLUMNS = [
+    (key, key) for key in (
+        'student_id', 'student_name', 'class_name', 'section_name',
+        'total_days', 'present_days', 'absent_days', 'attendance_percentage'
+    )
+]
 
 @api_view(['GET'])
-def assignments_report(request):
+@renderer_classes(EXPORT_RENDERER_CLASSES)
+def attendance_report(request):
     """
-    Generate an assignments report based on filters
+    Generate an attendance report based on filters
+    Filters: class_id, section_id, date_from, date_to
+    Export: format=csv|xlsx
+    """
+    if is_export_request(request):
+        rows = attendance_report_rows(request.query_params, chunk_size=EXPORT_CHUNK_SIZE)
+        return export_response(request, 'attendance_report', [('attendance', ATTENDANCE_REPORT_COLUMNS, rows)])
+    
+    return _report_response(request, 'attendance', lambda params: list(attendance_report_rows(params)))
+
+def assignments_report_rows(params, chunk_size=None):
+    """
+    Yield one assignments report entry per student
     Filters: class_id, section_id, subject_id, date_from, date_to
     """
-    class_id = request.query_params.get('class_id')
-    section_id = request.query_params.get('section_id')
-    subject_id = request.query_params.get('subject_id')
-    date_from = request.query_params.get('date_from')
-    date_to = request.query_params.get('date_to', timezone.now().date())
+    class_id = params.get('class_id')
+    section_id = params.get('section_id')
+    subject_id = params.get('subject_id')
+    date_from = params.get('date_from')
+    date_to = params.get('date_to', timezone.now().date())
     
     # Base query for assignments
     assignments = Assignment.objects.all()
@@ -189,15 +275,8 @@ def assignments_report(request):
             schedule_filters &= Q(schedule__section_id=section_id)
         assignments = assignments.filter(schedule_filters)
     
-    # Get all submissions for these assignments
-    submissions = AssignmentSubmission.objects.filter(
-        assignment__in=assignments
-    )
-    
-    # Group by student and calculate statistics
-    students = Student.objects.filter(
-        id__in=submissions.values_list('student_id', flat=True).distinct()
-    )
+    # Students in scope, including those without any submission
+    students = Student.objects.all()
     
     if class_id:
         students = students.filter(class_name_id=class_id)
@@ -205,103 +284,163 @@ def assignments_report(request):
     if section_id:
         students = students.filter(section_id=section_id)
     
-    result = []
-    for student in students:
-        student_submissions = submissions.filter(student=student)
+    # Aggregate every student's submissions (joined to their assignment) in one outer query
+    in_scope = Q(submissions__assignment__in=assignments)
+    submitted = in_scope & Q(submissions__status='submitted')
+    rows = students.values(
+        'id', 'name', 'class_name__name', 'section__name'
+    ).annotate(
+        assignments_count=Count('submissions', filter=in_scope),
+        submitted_count=Count('submissions', filter=submitted),
+        total_score=Coalesce(Sum('submissions__score', filter=submitted), 0),
+        total_max_score=Coalesce(Sum('submissions__assignment__score', filter=submitted), 0)
+    ).order_by('name', 'id')
+    
+    for row in _iterate(rows, chunk_size):
+        total_assignments = row['assignments_count']
+        submitted_count = row['submitted_count']
         
-        # Calculate submission statistics
-        total_assignments = student_submissions.count()
-        submitted_count = student_submissions.filter(status='submitted').count()
-        not_submitted_count = total_assignments - submitted_count
-        
-        if total_assignments > 0:
-            submission_percentage = (submitted_count / total_assignments) * 100
-        else:
-            submission_percentage = 0
-        
-        # Calculate average score
-        submitted_with_score = student_submissions.filter(status='submitted')
-        total_score = sum(sub.score for sub in submitted_with_score)
-        total_max_score = sum(sub.assignment.score for sub in submitted_with_score)
-        
-        if total_max_score > 0:
-            average_percentage = (total_score / total_max_score) * 100
-        else:
-            average_percentage = 0
-        
-        result.append({
-            'student_id': student.id,
-            'student_name': student.name,
-            'class_name': student.class_name.name,
-            'section_name': student.section.name,
+        yield {
+            'student_id': row['id'],
+            'student_name': row['name'],
+            'class_name': row['class_name__name'],
+            'section_name': row['section__name'],
             'assignments_count': total_assignments,
             'submitted_count': submitted_count,
-            'not_submitted_count': not_submitted_count,
-            'submission_percentage': round(submission_percentage, 2),
-            'total_score': total_score,
-            'total_max_score': total_max_score,
-            'average_percentage': round(average_percentage, 2)
-        })
-    
-    return Response(result)
+            'not_submitted_count': total_assignments - submitted_count,
+            'submission_percentage': _percentage(submitted_count, total_assignments),
+            'total_score': row['total_score'],
+            'total_max_score': row['total_max_score'],
+            'average_percentage': _percentage(row['total_score'], row['total_max_score'])
+        }
+
+ASSIGNMENTS_REPORT_COLUMNS = [
+    (key, key) for key in (
+        'student_id', 'student_name', 'class_name', 'section_name',
+        'assignments_count', 'submitted_count', 'not_submitted_count', 'submission_percentage',
+        'total_score', 'total_max_score', 'average_percentage'
+    )
+]
 
 @api_view(['GET'])
-def student_report(request):
+@renderer_classes(EXPORT_RENDERER_CLASSES)
+def assignments_report(request):
     """
-    Generate a comprehensive report for a specific student
-    Filters: student_id, date_from, date_to
+    Generate an assignments report based on filters
+    Filters: class_id, section_id, subject_id, date_from, date_to
+    Export: format=csv|xlsx
     """
-    student_id = request.query_params.get('student_id')
-    date_from = request.query_params.get('date_from')
-    date_to = request.query_params.get('date_to', timezone.now().date())
+    if is_export_request(request):
+        rows = assignments_report_rows(request.query_params, chunk_size=EXPORT_CHUNK_SIZE)
+        return export_response(request, 'assignments_report', [('assignments', ASSIGNMENTS_REPORT_COLUMNS, rows)])
+    
+    return _report_response(request, 'assignments', lambda params: list(assignments_report_rows(params)))
+
+STUDENT_REPORT_SECTIONS = ('grades', 'attendance', 'assignments', 'notes', 'summary')
+
+class ReportError(Exception):
+    """Invalid report parameters; carries the HTTP status to answer with"""
+
+    def __init__(self, message, status_code=status.HTTP_400_BAD_REQUEST):
+        super().__init__(message)
+        self.status_code = status_code
+
+def _id_param(params, name):
+    """Optional integer id filter; a non-integer value is a ReportError (400) rather than a 500"""
+    value = params.get(name)
+    if not value:
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise ReportError(f"{name} must be an integer")
+
+def _grade_entry(grade):
+    return {
+        'subject': grade.subject.name,
+        'type': grade.get_type_display(),
+        'score': f"{grade.score}/{grade.max_score}",
+        'percentage': _percentage(grade.score, grade.max_score),
+        'date': grade.date.strftime('%Y-%m-%d')
+    }
+
+def _attendance_entry(record):
+    return {
+        'date': record.date.strftime('%Y-%m-%d'),
+        'day': record.schedule.get_day_display(),
+        'period': record.schedule.get_period_display(),
+        'subject': record.schedule.subject.name,
+        'status': record.get_status_display()
+    }
+
+def _assignment_entry(submission):
+    return {
+        'title': submission.assignment.title,
+        'subject': submission.assignment.subject.name if submission.assignment.subject else submission.subject_info,
+        'due_date': submission.assignment.due_date.strftime('%Y-%m-%d'),
+        'status': submission.get_status_display(),
+        'score': f"{submission.score}/{submission.assignment.score}" if submission.status == 'submitted' else '-'
+    }
+
+def _note_entry(note):
+    return {
+        'date': note.date.strftime('%Y-%m-%d'),
+        'subject': note.schedule.subject.name if hasattr(note.schedule, 'subject') else note.subject_info,
+        'type': note.get_type_display(),
+        'content': note.content
+    }
+
+STUDENT_REPORT_ENTRIES = {
+    'grades': _grade_entry,
+    'attendance': _attendance_entry,
+    'assignments': _assignment_entry,
+    'notes': _note_entry,
+}
+
+STUDENT_REPORT_COLUMNS = {
+    'grades': ('subject', 'type', 'score', 'percentage', 'date'),
+    'attendance': ('date', 'day', 'period', 'subject', 'status'),
+    'assignments': ('title', 'subject', 'due_date', 'status', 'score'),
+    'notes': ('date', 'subject', 'type', 'content'),
+}
+
+def _student_report_scope(params):
+    """
+    Validate the student report parameters
+    Returns (student, include, querysets) where querysets holds the filtered rows of each section
+    """
+    student_id = params.get('student_id')
+    date_from = params.get('date_from')
+    date_to = params.get('date_to', timezone.now().date())
+    include_param = params.get('include')
     
     if not student_id:
-        return Response(
-            {"error": "student_id is required"}, 
-            status=status.HTTP_400_BAD_REQUEST
-        )
+        raise ReportError("student_id is required")
+    
+    if include_param:
+        include = {name.strip() for name in include_param.split(',') if name.strip()}
+        unknown = include - set(STUDENT_REPORT_SECTIONS)
+        if unknown:
+            raise ReportError(f"Unknown sections: {', '.join(sorted(unknown))}")
+    else:
+        include = set(STUDENT_REPORT_SECTIONS)
     
     try:
-        student = Student.objects.get(id=student_id)
+        student = Student.objects.select_related('class_name', 'section').get(id=student_id)
     except Student.DoesNotExist:
-        return Response(
-            {"error": "Student not found"}, 
-            status=status.HTTP_404_NOT_FOUND
-        )
+        raise ReportError("Student not found", status.HTTP_404_NOT_FOUND)
     
-    # Get grades
+    # Filtered querysets for each section, with the related rows they display joined in
     grades_query = Grade.objects.filter(student_id=student_id)
     if date_from:
         grades_query = grades_query.filter(date__gte=date_from)
     grades_query = grades_query.filter(date__lte=date_to)
     
-    grades = []
-    for grade in grades_query:
-        grades.append({
-            'subject': grade.subject.name,
-            'type': grade.get_type_display(),
-            'score': f"{grade.score}/{grade.max_score}",
-            'percentage': round((grade.score / grade.max_score) * 100, 2) if grade.max_score > 0 else 0,
-            'date': grade.date.strftime('%Y-%m-%d')
-        })
-    
-    # Get attendance
     attendance_query = Attendance.objects.filter(student_id=student_id)
     if date_from:
         attendance_query = attendance_query.filter(date__gte=date_from)
     attendance_query = attendance_query.filter(date__lte=date_to)
     
-    attendance = []
-    for record in attendance_query:
-        attendance.append({
-            'date': record.date.strftime('%Y-%m-%d'),
-            'day': record.schedule.get_day_display(),
-            'period': record.schedule.get_period_display(),
-            'subject': record.schedule.subject.name,
-            'status': record.get_status_display()
-        })
-    
-    # Get assignments
     submissions_query = AssignmentSubmission.objects.filter(student_id=student_id)
     submissions_query = submissions_query.filter(
         assignment__due_date__lte=date_to
@@ -311,89 +450,230 @@ def student_report(request):
             assignment__due_date__gte=date_from
         )
     
-    assignments = []
-    for submission in submissions_query:
-        assignments.append({
-            'title': submission.assignment.title,
-            'subject': submission.assignment.subject.name if submission.assignment.subject else submission.subject_info,
-            'due_date': submission.assignment.due_date.strftime('%Y-%m-%d'),
-            'status': submission.get_status_display(),
-            'score': f"{submission.score}/{submission.assignment.score}" if submission.status == 'submitted' else '-'
-        })
-    
-    # Get notes
     notes_query = Note.objects.filter(student_id=student_id)
     if date_from:
         notes_query = notes_query.filter(date__gte=date_from)
     notes_query = notes_query.filter(date__lte=date_to)
     
-    notes = []
-    for note in notes_query:
-        notes.append({
-            'date': note.date.strftime('%Y-%m-%d'),
-            'subject': note.schedule.subject.name if hasattr(note.schedule, 'subject') else note.subject_info,
-            'type': note.get_type_display(),
-            'content': note.content
-        })
-    
-    # Calculate summary statistics
-    total_grades = grades_query.count()
-    total_score = sum(grade.score for grade in grades_query)
-    total_max_score = sum(grade.max_score for grade in grades_query)
-    
-    if total_max_score > 0:
-        average_percentage = (total_score / total_max_score) * 100
+    querysets = {
+        'grades': grades_query.select_related('subject'),
+        'attendance': attendance_query.select_related('schedule__subject'),
+        'assignments': submissions_query.select_related('assignment__subject'),
+        'notes': notes_query.select_related('schedule__subject'),
+    }
+    return student, include, querysets
+
+def _student_report_summary(querysets, rows=None):
+    """
+    Summary statistics of a student report
+    Reuses the already loaded rows of a section when given, otherwise runs one aggregate per section
+    """
+    rows = rows or {}
+    
+    if 'grades' in rows:
+        grade_totals = {
+            'total': len(rows['grades']),
+            'score': sum(grade.score for grade in rows['grades']),
+            'max_score': sum(grade.max_score for grade in rows['grades'])
+        }
     else:
-        average_percentage = 0
-    
-    total_attendance_days = attendance_query.count()
-    present_days = attendance_query.filter(status='present').count()
-    absent_days = total_attendance_days - present_days
+        grade_totals = querysets['grades'].aggregate(
+            total=Count('id'),
+            score=Coalesce(Sum('score'), 0),
+            max_score=Coalesce(Sum('max_score'), 0)
+        )
     
-    if total_attendance_days > 0:
-        attendance_percentage = (present_days / total_attendance_days) * 100
+    if 'attendance' in rows:
+        attendance_totals = {
+            'total': len(rows['attendance']),
+            'present': sum(1 for record in rows['attendance'] if record.status == 'present')
+        }
     else:
-        attendance_percentage = 0
-    
-    total_assignments = submissions_query.count()
-    submitted_assignments = submissions_query.filter(status='submitted').count()
-    not_submitted_assignments = total_assignments - submitted_assignments
+        attendance_totals = querysets['attendance'].aggregate(
+            total=Count('id'),
+            present=Count('id', filter=Q(status='present'))
+        )
     
-    if total_assignments > 0:
-        submission_percentage = (submitted_assignments / total_assignments) * 100
+    if 'assignments' in rows:
+        submission_totals = {
+            'total': len(rows['assignments']),
+            'submitted': sum(1 for submission in rows['assignments'] if submission.status == 'submitted')
+        }
     else:
-        submission_percentage = 0
+        submission_totals = querysets['assignments'].aggregate(
+            total=Count('id'),
+            submitted=Count('id', filter=Q(status='submitted'))
+        )
+    
+    return {
+        'grades': {
+            'total': grade_totals['total'],
+            'average_percentage': _percentage(grade_totals['score'], grade_totals['max_score'])
+        },
+        'attendance': {
+            'total_days': attendance_totals['total'],
+            'present_days': attendance_totals['present'],
+            'absent_days': attendance_totals['total'] - attendance_totals['present'],
+            'attendance_percentage': _percentage(attendance_totals['present'], attendance_totals['total'])
+        },
+        'assignments': {
+            'total': submission_totals['total'],
+            'submitted': submission_totals['submitted'],
+            'not_submitted': submission_totals['total'] - submission_totals['submitted'],
+            'submission_percentage': _percentage(submission_totals['submitted'], submission_totals['total'])
+        }
+    }
+
+def student_report_data(params):
+    """
+    Build the comprehensive report of one student
+    Filters: student_id, date_from, date_to
+    Sections: include=grades,attendance,assignments,notes,summary (default: all)
+    """
+    student, include, querysets = _student_report_scope(params)
     
-    # Prepare the response
     result = {
         'student': {
             'id': student.id,
             'name': student.name,
             'class_name': student.class_name.name,
             'section_name': student.section.name
-        },
-        'summary': {
-            'grades': {
-                'total': total_grades,
-                'average_percentage': round(average_percentage, 2)
-            },
-            'attendance': {
-                'total_days': total_attendance_days,
-                'present_days': present_days,
-                'absent_days': absent_days,
-                'attendance_percentage': round(attendance_percentage, 2)
-            },
-            'assignments': {
-                'total': total_assignments,
-                'submitted': submitted_assignments,
-                'not_submitted': not_submitted_assignments,
-                'submission_percentage': round(submission_percentage, 2)
-            }
-        },
-        'grades': grades,
-        'attendance': attendance,
-        'assignments': assignments,
-        'notes': notes
+        }
     }
+    if 'summary' in include:
+        # Keep the summary ahead of the detail sections; it is filled in below
+        result['summary'] = None
+    
+    # Each listed section is fetched once
+    rows = {}
+    for section, entry in STUDENT_REPORT_ENTRIES.items():
+        if section in include:
+            rows[section] = list(querysets[section])
+            result[section] = [entry(row) for row in rows[section]]
+    
+    if 'summary' in include:
+        result['summary'] = _student_report_summary(querysets, rows)
+    
+    return result
+
+def _student_report_sheets(params):
+    """Export sheets of a student report; detail sections are streamed in chunks"""
+    student, include, querysets = _student_report_scope(params)
+    
+    sheets = []
+    if 'summary' in include:
+        summary = _student_report_summary(querysets)
+        sheets.append(('summary', [('section', 'section'), ('metric', 'metric'), ('value', 'value')], [
+            {'section': section, 'metric': metric, 'value': value}
+            for section, metrics in summary.items()
+            for metric, value in metrics.items()
+        ]))
+    
+    for section, entry in STUDENT_REPORT_ENTRIES.items():
+        if section in include:
+            columns = [(key, key) for key in STUDENT_REPORT_COLUMNS[section]]
+            rows = map(entry, _iterate(querysets[section], EXPORT_CHUNK_SIZE))
+            sheets.append((section, columns, rows))
+    
+    return student, sheets
+
+@api_view(['GET'])
+@renderer_classes(EXPORT_RENDERER_CLASSES)
+def student_report(request):
+    """
+    Generate a comprehensive report for a specific student
+    Filters: student_id, date_from, date_to
+    Sections: include=grades,attendance,assignments,notes,summary (default: all)
+    Export: format=csv|xlsx
+    """
+    try:
+        if is_export_request(request):
+            student, sheets = _student_report_sheets(request.query_params)
+            return export_response(request, f'student_report_{student.id}', sheets)
+        
+        return _report_response(request, 'student', student_report_data, by_student=True)
+    except ReportError as e:
+        return Response({"error": str(e)}, status=e.status_code)
+
+TREND_BUCKETS = {
+    'week': TruncWeek,
+    'month': TruncMonth,
+}
+
+TREND_COLUMNS = ('bucket', 'score_pct', 'present_pct')
+
+def trend_report_data(params):
+    """
+    Grade and attendance percentages per week or month, aggregated from the daily summary table
+    Filters: student_id or class_id/section_id, subject_id, date_from, date_to, bucket=week|month
+    """
+    student_id = _id_param(params, 'student_id')
+    class_id = _id_param(params, 'class_id')
+    section_id = _id_param(params, 'section_id')
+    subject_id = _id_param(params, 'subject_id')
+    date_from = params.get('date_from')
+    date_to = params.get('date_to', timezone.now().date())
+    bucket = params.get('bucket', 'week')
     
-    return Response(result)
+    if bucket not in TREND_BUCKETS:
+        raise ReportError(f"bucket must be one of: {', '.join(TREND_BUCKETS)}")
+    
+    summaries = StudentDailySummary.objects.all()
+    
+    if student_id:
+        summaries = summaries.filter(student_id=student_id)
+    
+    if class_id:
+        summaries = summaries.filter(student__class_name_id=class_id)
+    
+    if section_id:
+        summaries = summaries.filter(student__section_id=section_id)
+    
+    if subject_id:
+        summaries = summaries.filter(subject_id=subject_id)
+    
+    if date_from:
+        summaries = summaries.filter(date__gte=date_from)
+    
+    summaries = summaries.filter(date__lte=date_to)
+    
+    rows = summaries.annotate(
+        period=TREND_BUCKETS[bucket]('date')
+    ).values('period').annotate(
+        score=Sum('score_sum'),
+        max_score=Sum('max_score_sum'),
+        present=Sum('present_count'),
+        absent=Sum('absent_count')
+    ).order_by('period')
+    
+    # Buckets without grades (or without attendance) report null rather than 0
+    series = [
+        [
+            row['period'].isoformat(),
+            _percentage(row['score'], row['max_score']) if row['max_score'] else None,
+            _percentage(row['present'], row['present'] + row['absent']) if row['present'] + row['absent'] else None
+        ]
+        for row in rows
+    ]
+    
+    return {
+        'bucket': bucket,
+        'columns': TREND_COLUMNS,
+        'series': series
+    }
+
+@api_view(['GET'])
+def trends_report(request):
+    """
+    Time-bucketed grade and attendance trend series
+    Filters: student_id or class_id/section_id, subject_id, date_from, date_to, bucket=week|month
+    Response: {"bucket": ..., "columns": ["bucket", "score_pct", "present_pct"], "series": [[...], ...]}
+    """
+    return _report_response(request, 'trends', trend_report_data, by_student=True)
+
+@api_view(['GET'])
+def report_cache_stats(request):
+    """
+    Report cache hit/miss counters (overall and per report)
+    """
+    return Response(cache_stats())
@@ -0,0 +1,135 @@
+"""
+صيانة جدول الملخص اليومي StudentDailySummary
+
+يُعاد حساب صفوف الملخص لكل زوج (طالب، تاريخ) متأثر من الجداول الأصلية بدل تعديلها
+بالفروق، لذلك تبقى صحيحة حتى عند نقل سجل من تاريخ أو مادة إلى أخرى.
+"""
+import threading
+from contextlib import contextmanager
+from functools import reduce
+from operator import or_
+
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import Coalesce
+
+from .models import Attendance, Grade, AssignmentSubmission, StudentDailySummary
+
+# عدد الأزواج (طالب، تاريخ) التي يُعاد حسابها في كل دفعة
+REFRESH_CHUNK_SIZE = 500
+
+_deferred = threading.local()
+
+
+def _aggregate_rows(student_ids, dates=None):
+    """
+    تجميع الحضور والدرجات والواجبات لكل (طالب، تاريخ، مادة) بثلاثة استعلامات مجمّعة
+    تاريخ الواجب هو تاريخ تسليمه ومادته مادة الواجب
+    """
+    attendances = Attendance.objects.filter(student_id__in=student_ids)
+    grades = Grade.objects.filter(student_id__in=student_ids)
+    submissions = AssignmentSubmission.objects.filter(student_id__in=student_ids)
+    if dates is not None:
+        attendances = attendances.filter(date__in=dates)
+        grades = grades.filter(date__in=dates)
+        submissions = submissions.filter(assignment__due_date__in=dates)
+
+    submitted = Q(status='submitted')
+    aggregates = (
+        attendances.values('student_id', 'date', subject_key=F('schedule__subject_id')).annotate(
+            present_count=Count('id', filter=Q(status='present')),
+            absent_count=Count('id', filter=~Q(status='present'))
+        ),
+        grades.values('student_id', 'date', subject_key=F('subject_id')).annotate(
+            grades_count=Count('id'),
+            score_sum=Sum('score'),
+            max_score_sum=Sum('max_score')
+        ),
+        submissions.values(
+            'student_id', date=F('assignment__due_date'), subject_key=F('assignment__subject_id')
+        ).annotate(
+            submissions_count=Count('id'),
+            submitted_count=Count('id', filter=submitted),
+            submission_score_sum=Coalesce(Sum('score', filter=submitted), 0),
+            submission_max_score_sum=Coalesce(Sum('assignment__score', filter=submitted), 0)
+        ),
+    )
+
+    summaries = {}
+    for rows in aggregates:
+        for row in rows.order_by():
+            key = (row.pop('student_id'), row.pop('date'), row.pop('subject_key'))
+            summaries.setdefault(key, {}).update(row)
+    return summaries
+
+
+def _write_summaries(pairs, summaries):
+    """استبدال صفوف الملخص للأزواج المعطاة بالقيم المحسوبة"""
+    pairs_filter = reduce(or_, (Q(student_id=student_id, date=day) for student_id, day in pairs))
+    StudentDailySummary.objects.filter(pairs_filter).delete()
+    StudentDailySummary.objects.bulk_create([
+        StudentDailySummary(student_id=student_id, date=day, subject_id=subject_id, **values)
+        for (student_id, day, subject_id), values in summaries.items()
+        if (student_id, day) in pairs
+    ], batch_size=REFRESH_CHUNK_SIZE)
+
+
+def refresh_daily_summaries(pairs):
+    """
+    إعادة حساب صفوف الملخص لأزواج (student_id, date)
+    تُستدعى من الإشارات ومن مسارات الكتابة المجمّعة (bulk_create/update) التي لا تُطلق الإشارات
+    """
+    pairs = {(student_id, day) for student_id, day in pairs if student_id and day}
+    if not pairs:
+        return
+
+    # داخل deferred_daily_summaries تُجمع الأزواج وتُحسب مرة واحدة عند الخروج
+    pending = getattr(_deferred, 'pairs', None)
+    if pending is not None:
+        pending.update(pairs)
+        return
+
+    pairs = sorted(pairs)
+    with transaction.atomic():
+        for start in range(0, len(pairs), REFRESH_CHUNK_SIZE):
+            chunk = set(pairs[start:start + REFRESH_CHUNK_SIZE])
+            student_ids = {student_id for student_id, _ in chunk}
+            dates = {day for _, day in chunk}
+            _write_summaries(chunk, _aggregate_rows(student_ids, dates))
+
+
+@contextmanager
+def deferred_daily_summaries():
+    """
+    تأجيل تحديث الملخص حتى نهاية الكتلة ثم تحديث كل الأزواج المتأثرة دفعة واحدة
+    يُستخدم حول عمليات الكتابة المجمّعة حتى لا يُعاد الحساب بعد كل صف
+    """
+    if getattr(_deferred, 'pairs', None) is not None:
+        # كتلة متداخلة: الكتلة الخارجية هي التي تُحدّث
+        yield
+        return
+
+    _deferred.pairs = set()
+    try:
+        yield
+    finally:
+        # يُحدَّث الملخص حتى عند الخطأ لأن بعض الصفوف قد تكون كُتبت قبله
+        pairs, _deferred.pairs = _deferred.pairs, None
+        refresh_daily_summaries(pairs)
+
+
+def rebuild_daily_summaries(student_ids, chunk_size=100):
+    """إعادة بناء الملخص بالكامل لمجموعة من الطلاب (تُستخدم من أمر الإدارة)"""
+    student_ids = list(student_ids)
+    total = 0
+    for start in range(0, len(student_ids), chunk_size):
+        chunk = student_ids[start:start + chunk_size]
+        summaries = _aggregate_rows(chunk)
+        with transaction.atomic():
+            StudentDailySummary.objects.filter(student_id__in=chunk).delete()
+            StudentDailySummary.objects.bulk_create([
+                StudentDailySummary(student_id=student_id, date=day, subject_id=subject_id, **values)
+                for (student_id, day, subject_id), values in summaries.items()
+            ], batch_size=REFRESH_CHUNK_SIZE)
+        total += len(summaries)
+    return total
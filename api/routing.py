@@ -6,4 +6,5 @@ websocket_urlpatterns = [
     re_path(r'ws/notifications/$', consumers.NotificationConsumer.as_asgi()),
     re_path(r'ws/grades/$', consumers.GradeConsumer.as_asgi()),
     re_path(r'ws/attendance/$', consumers.AttendanceConsumer.as_asgi()),
+    re_path(r'ws/dashboard/$', consumers.DashboardConsumer.as_asgi()),
 ]
@@ -1,8 +1,9 @@
+from django.utils import timezone
 from rest_framework import serializers
 from .models import (
-    Class, Section, Subject, Student, Schedule,
+    Class, Section, Subject, Student, Schedule, PeriodTime,
     Attendance, Assignment, AssignmentSubmission,
-    Grade, Note, WhiteboardDrawing, Notification
+    Grade, Note, WhiteboardDrawing, Notification, ReportJob
 )
 
 class ClassSerializer(serializers.ModelSerializer):
@@ -80,6 +81,21 @@ class ScheduleDetailSerializer(serializers.ModelSerializer):
         model = Schedule
         fields = '__all__'
 
+class PeriodTimeSerializer(serializers.ModelSerializer):
+    period_display = serializers.CharField(source='get_period_display', read_only=True)
+    duration = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model = PeriodTime
+        fields = '__all__'
+
+    def validate(self, data):
+        start_time = data.get('start_time', getattr(self.instance, 'start_time', None))
+        end_time = data.get('end_time', getattr(self.instance, 'end_time', None))
+        if start_time and end_time and end_time <= start_time:
+            raise serializers.ValidationError({"end_time": "end_time must be after start_time"})
+        return data
+
 class AttendanceSerializer(serializers.ModelSerializer):
     class Meta:
         model = Attendance
@@ -93,6 +109,18 @@ class AttendanceDetailSerializer(serializers.ModelSerializer):
         model = Attendance
         fields = '__all__'
 
+class AttendanceBatchRowSerializer(serializers.Serializer):
+    """
+    صف في دفعة حضور: تحقق من الحقول فقط دون أي استعلام
+    (المفاتيح الأجنبية تُحمَّل للدفعة كلها في api.bulk)
+    """
+    student = serializers.IntegerField()
+    schedule = serializers.IntegerField()
+    date = serializers.DateField()
+    status = serializers.ChoiceField(choices=Attendance.STATUS_CHOICES)
+    # بلا قيمة افتراضية حتى لا يُمسح المحفوظ عند تحديث صف لم يرسله
+    subject_info = serializers.CharField(max_length=100, required=False, allow_blank=True, allow_null=True)
+
 class AssignmentSerializer(serializers.ModelSerializer):
     class Meta:
         model = Assignment
@@ -136,6 +164,22 @@ class GradeDetailSerializer(serializers.ModelSerializer):
         model = Grade
         fields = '__all__'
 
+def _today():
+    return timezone.now().date()
+
+class GradeBatchRowSerializer(serializers.Serializer):
+    """
+    صف في دفعة درجات: تحقق من الحقول فقط دون أي استعلام
+    (المفاتيح الأجنبية تُحمَّل للدفعة كلها في api.bulk)
+    """
+    student = serializers.IntegerField()
+    subject = serializers.IntegerField()
+    type = serializers.ChoiceField(choices=Grade.TYPE_CHOICES)
+    score = serializers.IntegerField(min_value=0)
+    # بلا قيمة افتراضية: عند غيابه يبقى المحفوظ في التحديث، وتُستخدم قيمة النموذج عند الإنشاء
+    max_score = serializers.IntegerField(min_value=0, required=False)
+    date = serializers.DateField(default=_today)
+
 class NoteSerializer(serializers.ModelSerializer):
     class Meta:
         model = Note
@@ -169,3 +213,26 @@ class NotificationDetailSerializer(serializers.ModelSerializer):
     class Meta:
         model = Notification
         fields = '__all__'
+
+
+class ReportJobSerializer(serializers.ModelSerializer):
+    kind_display = serializers.CharField(source='get_kind_display', read_only=True)
+    status_display = serializers.CharField(source='get_status_display', read_only=True)
+
+    class Meta:
+        model = ReportJob
+        fields = '__all__'
+        read_only_fields = ('status', 'result', 'error', 'started_at', 'finished_at', 'created_at', 'updated_at')
+
+    def validate_params(self, value):
+        if not isinstance(value, dict):
+            raise serializers.ValidationError("params must be an object")
+        return value
+
+
+class ReportJobSummarySerializer(ReportJobSerializer):
+    """مهمة التقرير دون حمولة النتيجة"""
+
+    class Meta(ReportJobSerializer.Meta):
+        fields = None
+        exclude = ('result',)
@@ -0,0 +1,204 @@
+"""
+ذاكرة مؤقتة مشتركة بين العمليات مع حماية من التدافع (cache stampede)
+
+كل قيمة تُخزَّن مع وقت انتهاء صلاحيتها، وتبقى في الذاكرة مدة إضافية (STALE_TTL) بعده.
+عند انتهاء الصلاحية تُعيد عملية واحدة فقط الحساب بعد حجز قفل، وتحصل بقية العمليات على
+القيمة القديمة فوراً (stale-while-revalidate). وعند غياب القيمة تماماً تنتظر بقية العمليات
+حتى تُحسب بدل أن تذهب كلها إلى قاعدة البيانات في اللحظة نفسها.
+
+القفل يعتمد على cache.add مع Redis (ذري هناك)، وعلى fcntl.flock لملف في CACHE_LOCK_DIR مع ذاكرة
+الملفات لأن add فيها قراءة ثم كتابة. قفل الملف يُحرَّر تلقائياً إذا تعطلت العملية التي تحمله.
+"""
+import hashlib
+import os
+import tempfile
+import time
+from functools import wraps
+
+try:
+    import fcntl
+except ImportError:  # Windows: لا يوجد flock، فيُستخدم cache.add
+    fcntl = None
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.response import Response
+
+# مدة إضافية يُسمح فيها بإرجاع القيمة المنتهية أثناء إعادة حسابها
+STALE_TTL = getattr(settings, 'CACHE_STALE_TTL', 60 * 5)
+
+# أقصى مدة للقفل؛ بعدها يُعتبر صاحبه متعطلاً ويحق لغيره الحساب
+LOCK_TTL = getattr(settings, 'CACHE_LOCK_TTL', 30)
+
+# الفاصل بين محاولات الانتظار عند غياب القيمة
+LOCK_POLL_INTERVAL = 0.05
+
+# مجلد ملفات الأقفال عندما لا تكون الذاكرة المشتركة ذرية
+LOCK_DIR = getattr(settings, 'CACHE_LOCK_DIR', os.path.join(tempfile.gettempdir(), 'teachease-locks'))
+
+# ذاكرات add و incr فيها ذريان
+ATOMIC_BACKENDS = (
+    'django.core.cache.backends.redis.RedisCache',
+    'django.core.cache.backends.locmem.LocMemCache',
+)
+
+
+def _lock_key(key):
+    return f"{key}:lock"
+
+
+def _atomic_cache():
+    return fcntl is None or settings.CACHES['default']['BACKEND'] in ATOMIC_BACKENDS
+
+
+class _CacheLock:
+    """قفل بمفتاح في الذاكرة المشتركة تنتهي صلاحيته بعد LOCK_TTL"""
+
+    def __init__(self, key):
+        self.key = _lock_key(key)
+
+    def acquire(self):
+        return cache.add(self.key, 1, LOCK_TTL)
+
+    def release(self):
+        cache.delete(self.key)
+
+
+class _FileLock:
+    """قفل flock على ملف باسم بصمة المفتاح؛ يُحذف الملف عند التحرير حتى لا تتراكم الملفات"""
+
+    def __init__(self, key):
+        name = hashlib.md5(_lock_key(key).encode('utf-8')).hexdigest()
+        self.path = os.path.join(LOCK_DIR, f"{name}.lock")
+        self.fd = None
+
+    def acquire(self, blocking=False):
+        os.makedirs(LOCK_DIR, exist_ok=True)
+        while True:
+            fd = os.open(self.path, os.O_CREAT | os.O_RDWR, 0o600)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                os.close(fd)
+                return False
+            # قد يكون الحامل السابق حذف الملف بعد فتحه هنا؛ القفل على ملف محذوف لا يمنع أحداً
+            try:
+                if os.fstat(fd).st_ino == os.stat(self.path).st_ino:
+                    self.fd = fd
+                    return True
+            except FileNotFoundError:
+                pass
+            os.close(fd)
+
+    def release(self):
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+        os.close(self.fd)
+        self.fd = None
+
+
+def lock(key):
+    """قفل الحساب لمفتاح: acquire() بلا انتظار يرجع True عند الحجز، ثم release()"""
+    return _CacheLock(key) if _atomic_cache() else _FileLock(key)
+
+
+def incr(key, delta=1):
+    """زيادة عدّاد دائم في الذاكرة المشتركة دون أن تضيع الزيادات المتزامنة"""
+    if _atomic_cache():
+        if cache.add(key, delta, None):
+            return delta
+        return cache.incr(key, delta)
+
+    counter_lock = _FileLock(key)
+    counter_lock.acquire(blocking=True)
+    try:
+        value = cache.get(key, 0) + delta
+        cache.set(key, value, None)
+        return value
+    finally:
+        counter_lock.release()
+
+
+def store(key, value, timeout, stale_ttl=STALE_TTL):
+    """تخزين قيمة محسوبة خارج get_or_set بالصيغة نفسها (صالحة timeout ثانية، ثم قديمة stale_ttl)"""
+    cache.set(key, (time.time() + timeout, value), timeout + stale_ttl)
+
+
+def _compute_and_set(key, compute, timeout, stale_ttl, held):
+    try:
+        value = compute()
+        store(key, value, timeout, stale_ttl)
+        return value
+    finally:
+        if held is not None:
+            held.release()
+
+
+def get_or_set(key, compute, timeout, stale_ttl=STALE_TTL):
+    """
+    إرجاع القيمة المخزنة أو حسابها مرة واحدة فقط بين كل العمليات المتزامنة
+    compute: دالة بلا معاملات تحسب القيمة، timeout: مدة صلاحية القيمة بالثواني
+    """
+    entry = cache.get(key)
+    if entry is not None:
+        expires_at, value = entry
+        if expires_at > time.time():
+            return value
+        # قيمة منتهية: من يحجز القفل يعيد الحساب، والبقية تأخذ القيمة القديمة
+        held = lock(key)
+        if not held.acquire():
+            return value
+        return _compute_and_set(key, compute, timeout, stale_ttl, held)
+
+    # لا توجد قيمة: ننتظر من يحسبها حتى تنتهي مدة القفل
+    held = lock(key)
+    deadline = time.time() + LOCK_TTL
+    while not held.acquire():
+        time.sleep(LOCK_POLL_INTERVAL)
+        entry = cache.get(key)
+        if entry is not None:
+            return entry[1]
+        if time.time() > deadline:
+            # صاحب القفل عالق؛ نحسب دون قفل
+            return _compute_and_set(key, compute, timeout, stale_ttl, None)
+    # القفل قد يتحرر بعد أن خزّن صاحبه القيمة وبين آخر قراءتين لنا، فلا نعيد الحساب
+    entry = cache.get(key)
+    if entry is not None:
+        held.release()
+        return entry[1]
+    return _compute_and_set(key, compute, timeout, stale_ttl, held)
+
+
+class _Uncacheable(Exception):
+    """استجابة لا تُخزَّن (غير 200)؛ تُمرَّر كما هي إلى العميل"""
+
+    def __init__(self, response):
+        super().__init__()
+        self.response = response
+
+
+def cached_view(timeout):
+    """
+    بديل cache_page لدوال api_view
+    يخزن بيانات الاستجابة في الذاكرة المشتركة بحسب المسار الكامل مع حماية من التدافع
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapped(request, *args, **kwargs):
+            path_hash = hashlib.md5(request.get_full_path().encode('utf-8')).hexdigest()
+            key = f"view:{view.__module__}.{view.__name__}:{path_hash}"
+
+            def compute():
+                response = view(request, *args, **kwargs)
+                if response.status_code != 200:
+                    raise _Uncacheable(response)
+                return response.data
+
+            try:
+                return Response(get_or_set(key, compute, timeout))
+            except _Uncacheable as e:
+                return e.response
+        return wrapped
+    return decorator
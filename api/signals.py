@@ -0,0 +1,276 @@
+import threading
+from collections import Counter
+
+from django.db.models.signals import pre_save, post_save, pre_delete, post_delete
+from django.dispatch import receiver
+
+from .models import (
+    Class, Section, Subject, Student, Schedule, PeriodTime,
+    Attendance, Assignment, AssignmentSubmission, Grade, Note
+)
+from .counters import apply_change, bump_counters, contributions, date_value, recount_counters
+from .dashboard_live import publish_counter_deltas, publish_note, publish_note_deleted
+from .report_cache import invalidate_students, invalidate_structure
+from .rollups import refresh_daily_summaries
+from .timetable import invalidate_timetable
+
+
+# الحقول المحفوظة التي تحتاجها إشارات ما بعد الحفظ (الملخص اليومي، إبطال التقارير، العدّادات)
+STORED_FIELDS = {
+    Attendance: ('student_id', 'date', 'status'),
+    Grade: ('student_id', 'date'),
+    AssignmentSubmission: ('student_id', 'assignment_id', 'assignment__due_date'),
+    Note: ('student_id',),
+    Assignment: ('due_date',),
+}
+
+
+def _submission_pairs(submissions):
+    return submissions.values_list('student_id', 'assignment__due_date')
+
+
+@receiver(pre_save, sender=Attendance)
+@receiver(pre_save, sender=Grade)
+@receiver(pre_save, sender=AssignmentSubmission)
+@receiver(pre_save, sender=Note)
+@receiver(pre_save, sender=Assignment)
+def remember_stored_row(sender, instance, **kwargs):
+    # قراءة واحدة للسجل كما هو محفوظ قبل التعديل، تشترك فيها كل إشارات ما بعد الحفظ
+    instance._stored = (
+        sender._base_manager.filter(pk=instance.pk).order_by().values(*STORED_FIELDS[sender]).first()
+        if instance.pk else None
+    )
+
+
+def _stored(instance):
+    return getattr(instance, '_stored', None)
+
+
+def _stored_pairs(sender, stored):
+    """زوج (طالب، تاريخ) السجل المحفوظ في الملخص اليومي"""
+    if stored is None:
+        return set()
+    day = stored['assignment__due_date'] if sender is AssignmentSubmission else stored['date']
+    return {(stored['student_id'], day)}
+
+
+def _current_pair(sender, instance):
+    """زوج (طالب، تاريخ) السجل بعد الحفظ، دون استعلام ما لم يتغير واجب التسليم"""
+    if sender is AssignmentSubmission:
+        stored = _stored(instance)
+        if stored and stored['assignment_id'] == instance.assignment_id:
+            return (instance.student_id, stored['assignment__due_date'])
+        return (instance.student_id, instance.assignment.due_date)
+    return (instance.student_id, date_value(instance, 'date'))
+
+
+@receiver(post_save, sender=Attendance)
+@receiver(post_save, sender=Grade)
+@receiver(post_save, sender=AssignmentSubmission)
+def refresh_summary_on_save(sender, instance, **kwargs):
+    # عند التعديل قد ينتقل السجل إلى طالب أو تاريخ آخر، فيجب تحديث الزوج القديم أيضاً
+    refresh_daily_summaries(_stored_pairs(sender, _stored(instance)) | {_current_pair(sender, instance)})
+
+
+@receiver(pre_save, sender=Assignment)
+def remember_previous_assignment_pairs(sender, instance, **kwargs):
+    # تغيير تاريخ التسليم أو الدرجة أو المادة يغيّر ملخص كل من سلّم الواجب
+    instance._previous_summary_pairs = (
+        set(_submission_pairs(instance.submissions.all())) if instance.pk else set()
+    )
+
+
+@receiver(post_save, sender=Assignment)
+def refresh_summary_on_assignment_save(sender, instance, created, **kwargs):
+    if created:
+        return
+    # حفظ الواجب لا يغيّر تسليماته، فأزواجها الجديدة هي طلابها مع تاريخ التسليم الجديد
+    pairs = getattr(instance, '_previous_summary_pairs', set())
+    due_date = date_value(instance, 'due_date')
+    refresh_daily_summaries(pairs | {(student_id, due_date) for student_id, _ in pairs})
+
+
+@receiver(post_save, sender=Schedule)
+def refresh_summary_on_schedule_save(sender, instance, created, **kwargs):
+    # مادة الحضور مأخوذة من الحصة
+    if created:
+        return
+    refresh_daily_summaries(instance.attendances.values_list('student_id', 'date').distinct())
+
+
+def _student_scope(student_id, instance=None):
+    """(student_id, class_id, section_id) للطالب، من الكائن المحمّل إن وجد"""
+    if instance is not None and instance._meta.get_field('student').is_cached(instance):
+        student = instance.student
+        return (student.id, student.class_name_id, student.section_id)
+    return Student.objects.filter(pk=student_id).values_list('id', 'class_name_id', 'section_id').first()
+
+
+@receiver(post_save, sender=Attendance)
+@receiver(post_save, sender=Grade)
+@receiver(post_save, sender=AssignmentSubmission)
+@receiver(post_save, sender=Note)
+def invalidate_student_reports(sender, instance, **kwargs):
+    scopes = [_student_scope(instance.student_id, instance)]
+    stored = _stored(instance)
+    if stored and stored['student_id'] != instance.student_id:
+        scopes.append(_student_scope(stored['student_id']))
+    invalidate_students(scope for scope in scopes if scope)
+
+
+@receiver(post_save, sender=Class)
+@receiver(post_save, sender=Section)
+@receiver(post_save, sender=Subject)
+@receiver(post_save, sender=Student)
+@receiver(post_save, sender=Schedule)
+@receiver(post_save, sender=Assignment)
+def invalidate_all_reports(sender, instance, **kwargs):
+    # الأسماء والانتماءات والواجبات تظهر في كل التقارير
+    invalidate_structure()
+
+
+@receiver(post_save, sender=Student)
+@receiver(post_save, sender=Attendance)
+@receiver(post_save, sender=Assignment)
+def update_counters_on_save(sender, instance, created, **kwargs):
+    if created:
+        apply_change({}, contributions(instance))
+    elif sender is not Student:
+        stored = _stored(instance)
+        apply_change(contributions(sender(**stored)) if stored else {}, contributions(instance))
+
+
+@receiver(post_save, sender=Schedule)
+@receiver(post_save, sender=PeriodTime)
+@receiver(post_save, sender=Class)
+@receiver(post_save, sender=Section)
+@receiver(post_save, sender=Subject)
+def invalidate_timetable_index(sender, instance, **kwargs):
+    # أسماء الصفوف والفصول والمواد تظهر في فهرس الجدول أيضاً
+    invalidate_timetable()
+
+
+@receiver(post_save, sender=Note)
+def push_note_to_dashboard(sender, instance, **kwargs):
+    publish_note(instance)
+
+
+# الحذف: الحذف المتسلسل (مادة أو صف أو طالب...) يحذف آلاف السجلات، فلا يُنفَّذ أي عمل لكل سجل.
+# pre_delete يسجّل كل سجل سيُحذف، و post_delete يجمع أثره فقط، وبعد حذف آخر سجل في العملية
+# يُحدَّث الملخص اليومي وتُبطل التقارير وتُحدَّث العدّادات مرة واحدة للعملية كلها.
+
+DELETE_TRACKED = (
+    Class, Section, Subject, Student, Schedule, PeriodTime,
+    Attendance, Assignment, AssignmentSubmission, Grade, Note
+)
+
+# النماذج التي يظهر حذفها في كل التقارير (الأسماء والانتماءات والواجبات)
+STRUCTURE_MODELS = (Class, Section, Subject, Student, Schedule, Assignment)
+TIMETABLE_MODELS = (Class, Section, Subject, Schedule, PeriodTime)
+
+# فوق هذا العدد من مفاتيح العدّادات (حذف متسلسل) يُعاد العدّ بالكامل باستعلامات ثابتة بدل تحديث كل مفتاح
+COUNTER_RECOUNT_KEYS = 4
+
+_deletes = threading.local()
+
+
+class _DeleteBatch:
+    """أثر السجلات المحذوفة في عملية حذف واحدة (origin)، يُطبَّق دفعة واحدة"""
+
+    def __init__(self, origin):
+        self.origin = origin
+        self.pending = set()
+        self.pairs = set()
+        self.submissions = set()
+        self.due_dates = {}
+        self.students = {}
+        self.student_ids = set()
+        self.deltas = Counter()
+        self.note_ids = []
+        self.structure = False
+        self.timetable = False
+
+    def add(self, sender, instance):
+        if sender in (Attendance, Grade):
+            self.pairs.add((instance.student_id, date_value(instance, 'date')))
+        elif sender is AssignmentSubmission:
+            self.submissions.add((instance.student_id, instance.assignment_id))
+        elif sender is Assignment:
+            self.due_dates[instance.pk] = date_value(instance, 'due_date')
+        elif sender is Student:
+            self.students[instance.pk] = (instance.pk, instance.class_name_id, instance.section_id)
+        if sender in (Attendance, Grade, AssignmentSubmission, Note):
+            self.student_ids.add(instance.student_id)
+        if sender is Note:
+            self.note_ids.append(instance.pk)
+        self.deltas.update(contributions(instance))
+        self.structure = self.structure or sender in STRUCTURE_MODELS
+        self.timetable = self.timetable or sender in TIMETABLE_MODELS
+
+    def apply(self):
+        # تواريخ تسليم الواجبات الباقية باستعلام واحد؛ الواجبات المحذوفة معروفة من الحذف نفسه
+        missing = {assignment_id for _, assignment_id in self.submissions} - set(self.due_dates)
+        if missing:
+            self.due_dates.update(Assignment.objects.filter(pk__in=missing).values_list('pk', 'due_date'))
+        pairs = self.pairs | {
+            (student_id, self.due_dates.get(assignment_id)) for student_id, assignment_id in self.submissions
+        }
+        # صفوف ملخص الطلاب المحذوفين حُذفت معهم
+        refresh_daily_summaries((student_id, day) for student_id, day in pairs if student_id not in self.students)
+
+        if self.structure:
+            invalidate_structure()
+        else:
+            invalidate_students(
+                Student.objects.filter(pk__in=self.student_ids).values_list('id', 'class_name_id', 'section_id')
+            )
+
+        deltas = +self.deltas
+        if len(deltas) > COUNTER_RECOUNT_KEYS:
+            publish_counter_deltas({key: -value for key, value in deltas.items()})
+            recount_counters()
+        else:
+            bump_counters({key: -value for key, value in deltas.items()})
+
+        if self.timetable:
+            invalidate_timetable()
+        for note_id in self.note_ids:
+            publish_note_deleted(note_id)
+
+
+def _current_batch(origin):
+    batch = getattr(_deletes, 'batch', None)
+    return batch if batch is not None and batch.origin is origin else None
+
+
+def _delete_key(sender, instance):
+    return (sender, instance.pk)
+
+
+def remember_deleted(sender, instance, origin=None, **kwargs):
+    batch = _current_batch(origin)
+    if batch is None:
+        # عملية حذف جديدة؛ أي دفعة سابقة لم تكتمل أُلغيت معاملتها
+        batch = _deletes.batch = _DeleteBatch(origin)
+    batch.pending.add(_delete_key(sender, instance))
+
+
+def collect_deleted(sender, instance, origin=None, **kwargs):
+    batch = _current_batch(origin)
+    if batch is None:
+        # post_delete دون pre_delete المقابل (إرسال يدوي): يُطبَّق فوراً
+        batch = _DeleteBatch(origin)
+        batch.add(sender, instance)
+        batch.apply()
+        return
+    batch.add(sender, instance)
+    batch.pending.discard(_delete_key(sender, instance))
+    if not batch.pending:
+        _deletes.batch = None
+        batch.apply()
+
+
+# مع sender محدد فقط: مستقبِل حذف بلا sender يلغي الحذف السريع (fast delete) لكل النماذج
+for model in DELETE_TRACKED:
+    pre_delete.connect(remember_deleted, sender=model)
+    post_delete.connect(collect_deleted, sender=model)
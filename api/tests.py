@@ -1,3 +1,1144 @@
-from django.test import TestCase
+import json
+import threading
+import time
+from datetime import date, datetime, time as clock, timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.utils import timezone
+from django.utils.http import http_date
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from channels.db import database_sync_to_async
+from channels.testing import WebsocketCommunicator
+from rest_framework.test import APIClient
+
+from .models import (
+    Class, Section, Subject, Student, Schedule,
+    Grade, Attendance, Assignment, AssignmentSubmission, Note, ReportJob,
+    StudentDailySummary, DashboardCounter, PeriodTime, LeaderboardSnapshot, IdempotencyKey, Notification
+)
+from . import dashboard_live
+from .consumers import DashboardConsumer
+from .leaderboards import refresh_snapshots
+from .counters import dashboard_counts, recount_counters
+from .report_jobs import claim_report_job, run_report_job
+from .report_cache import invalidate_student_ids
+from .rollups import rebuild_daily_summaries
+from .shared_cache import get_or_set, incr, lock
+from .timetable import now_for
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class ReportTestCase(TestCase):
+    """بيانات مشتركة لاختبارات التقارير"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.class_obj = Class.objects.create(name="الصف الأول")
+        cls.section = Section.objects.create(name="أ")
+        cls.subjects = [
+            Subject.objects.create(name=f"مادة {i}") for i in range(3)
+        ]
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def create_students(self, count):
+        return [
+            Student.objects.create(
+                name=f"طالب {i:03d}", class_name=self.class_obj, section=self.section
+            )
+            for i in range(count)
+        ]
+
+
+class GradesReportTests(ReportTestCase):
+
+    def create_grades(self, students):
+        Grade.objects.bulk_create([
+            Grade(student=student, subject=subject, type=grade_type,
+                  score=score, max_score=max_score, date=date(2025, 1, 1))
+            for student in students
+            for subject in self.subjects
+            for grade_type, score, max_score in (('theory', 12, 15), ('practical', 4, 5))
+        ])
+
+    def test_totals_per_student_and_subject(self):
+        student = self.create_students(1)[0]
+        self.create_grades([student])
+
+        response = self.client.get(reverse('grades-report'))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data), 1)
+        entry = response.data[0]
+        self.assertEqual(entry['student_id'], student.id)
+        self.assertEqual(entry['class_name'], self.class_obj.name)
+        self.assertEqual(entry['total_score'], 48)
+        self.assertEqual(entry['total_max_score'], 60)
+        self.assertEqual(entry['average_percentage'], 80.0)
+        self.assertEqual(entry['grades_count'], 6)
+        self.assertEqual(entry['subject_scores'][self.subjects[0].name],
+                         {'score': 16, 'max_score': 20, 'percentage': 80.0})
+
+    def test_query_count_is_constant(self):
+        self.create_grades(self.create_students(2))
+        with self.assertNumQueries(1):
+            self.client.get(reverse('grades-report'))
+
+        students = self.create_students(20)
+        self.create_grades(students)
+        # bulk_create bypasses the model signals
+        invalidate_student_ids(student.id for student in students)
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('grades-report'))
+        self.assertEqual(len(response.data), 22)
+
+    def test_cached_until_a_grade_changes(self):
+        student = self.create_students(1)[0]
+        self.create_grades([student])
+        url = reverse('grades-report')
+
+        first = self.client.get(url, {'class_id': self.class_obj.id}).data
+        with self.assertNumQueries(0):
+            second = self.client.get(url, {'class_id': self.class_obj.id}).data
+        self.assertEqual(first, second)
+
+        Grade.objects.create(student=student, subject=self.subjects[0], type='final',
+                             score=20, max_score=20, date=date(2025, 1, 1))
+        response = self.client.get(url, {'class_id': self.class_obj.id})
+        self.assertEqual(response.data[0]['grades_count'], first[0]['grades_count'] + 1)
+
+        stats = self.client.get(reverse('report-cache-stats')).data
+        self.assertEqual(stats['reports']['grades'], {'hits': 1, 'misses': 2})
+
+    def test_csv_export_streams_one_row_per_student(self):
+        self.create_grades(self.create_students(3))
+
+        response = self.client.get(reverse('grades-report'), {'format': 'csv'})
+
+        self.assertTrue(response.streaming)
+        self.assertIn('grades_report.csv', response['Content-Disposition'])
+        lines = b''.join(response.streaming_content).decode('utf-8-sig').splitlines()
+        self.assertEqual(len(lines), 4)
+        self.assertTrue(lines[0].startswith('student_id,student_name'))
+
+    def test_xlsx_export(self):
+        self.create_grades(self.create_students(3))
+
+        response = self.client.get(reverse('grades-report'), {'format': 'xlsx'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('grades_report.xlsx', response['Content-Disposition'])
+        self.assertTrue(b''.join(response.streaming_content).startswith(b'PK'))
+
+
+class AttendanceReportTests(ReportTestCase):
+
+    def test_present_and_absent_counts_per_student(self):
+        students = self.create_students(3)
+        schedule = Schedule.objects.create(
+            day=0, period=1, class_name=self.class_obj,
+            section=self.section, subject=self.subjects[0]
+        )
+        Attendance.objects.bulk_create([
+            Attendance(student=student, schedule=schedule, date=date(2025, 1, day),
+                       status='absent' if day % 3 == 0 else 'present')
+            for student in students
+            for day in range(1, 7)
+        ])
+
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('attendance-report'))
+
+        self.assertEqual(len(response.data), 3)
+        self.assertEqual(response.data[0]['total_days'], 6)
+        self.assertEqual(response.data[0]['present_days'], 4)
+        self.assertEqual(response.data[0]['absent_days'], 2)
+        self.assertEqual(response.data[0]['attendance_percentage'], 66.67)
+
+
+class AssignmentsReportTests(ReportTestCase):
+
+    def create_submissions(self, students):
+        schedule = Schedule.objects.create(
+            day=1, period=2, class_name=self.class_obj,
+            section=self.section, subject=self.subjects[0]
+        )
+        assignments = [
+            Assignment.objects.create(title=f"واجب {i}", due_date=date(2025, 1, 1),
+                                      score=10, schedule=schedule, subject=self.subjects[0])
+            for i in range(4)
+        ]
+        AssignmentSubmission.objects.bulk_create([
+            AssignmentSubmission(student=student, assignment=assignment,
+                                 status='submitted' if i < 3 else 'not_submitted', score=8)
+            for student in students
+            for i, assignment in enumerate(assignments)
+        ])
+
+    def test_submission_totals_and_students_without_submissions(self):
+        students = self.create_students(2)
+        self.create_submissions(students[:1])
+
+        response = self.client.get(reverse('assignments-report'))
+
+        self.assertEqual(len(response.data), 2)
+        entry, empty = response.data
+        self.assertEqual(entry['assignments_count'], 4)
+        self.assertEqual(entry['submitted_count'], 3)
+        self.assertEqual(entry['not_submitted_count'], 1)
+        self.assertEqual(entry['total_score'], 24)
+        self.assertEqual(entry['total_max_score'], 30)
+        self.assertEqual(entry['average_percentage'], 80.0)
+        self.assertEqual(empty['student_id'], students[1].id)
+        self.assertEqual(empty['assignments_count'], 0)
+        self.assertEqual(empty['total_score'], 0)
+
+    def test_query_count_is_constant(self):
+        self.create_submissions(self.create_students(25))
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('assignments-report'))
+        self.assertEqual(len(response.data), 25)
+
+
+class StudentReportTests(ReportTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.student = Student.objects.create(
+            name="طالب", class_name=cls.class_obj, section=cls.section
+        )
+        schedules = [
+            Schedule.objects.create(day=day, period=1, class_name=cls.class_obj,
+                                    section=cls.section, subject=cls.subjects[day % 3])
+            for day in range(5)
+        ]
+        assignment = Assignment.objects.create(
+            title="واجب", due_date=date(2025, 1, 5), score=10,
+            schedule=schedules[0], subject=cls.subjects[0]
+        )
+        for day in range(1, 21):
+            schedule = schedules[day % 5]
+            Grade.objects.create(student=cls.student, subject=schedule.subject, type='theory',
+                                 score=day % 10, max_score=10, date=date(2025, 1, day))
+            Attendance.objects.create(student=cls.student, schedule=schedule, date=date(2025, 1, day),
+                                      status='absent' if day % 4 == 0 else 'present')
+            Note.objects.create(student=cls.student, schedule=schedule, content="ملاحظة",
+                                date=date(2025, 1, day))
+        AssignmentSubmission.objects.create(student=cls.student, assignment=assignment,
+                                            status='submitted', score=7)
+
+    def get_report(self, **params):
+        return self.client.get(reverse('student-report'), {'student_id': self.student.id, **params})
+
+    def test_full_report_query_count(self):
+        with self.assertNumQueries(5):
+            response = self.get_report()
+
+        self.assertEqual(len(response.data['grades']), 20)
+        self.assertEqual(len(response.data['attendance']), 20)
+        self.assertEqual(len(response.data['assignments']), 1)
+        self.assertEqual(len(response.data['notes']), 20)
+        self.assertEqual(response.data['summary']['attendance']['absent_days'], 5)
+        self.assertEqual(response.data['summary']['assignments']['submitted'], 1)
+
+    def test_summary_only_matches_full_report(self):
+        full = self.get_report().data['summary']
+        with self.assertNumQueries(4):
+            response = self.get_report(include='summary')
+
+        self.assertEqual(set(response.data), {'student', 'summary'})
+        self.assertEqual(response.data['summary'], full)
+
+    def test_unknown_section_is_rejected(self):
+        response = self.get_report(include='grades,marks')
+        self.assertEqual(response.status_code, 400)
+
+    def test_csv_export_lists_each_section(self):
+        response = self.get_report(format='csv', include='summary,grades')
+
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        lines = b''.join(response.streaming_content).decode('utf-8-sig').splitlines()
+        self.assertEqual(lines[0], 'summary')
+        self.assertIn('grades', lines)
+        self.assertEqual(lines[lines.index('grades') + 1], 'subject,type,score,percentage,date')
+        # title + header + 10 summary metrics, blank line, title + header + 20 grades
+        self.assertEqual(len(lines), 12 + 1 + 22)
+
+
+class ReportJobTests(ReportTestCase):
+
+    def submit(self, kind, params):
+        return self.client.post(reverse('report-jobs'), {'kind': kind, 'params': params}, format='json')
+
+    def test_job_runs_existing_report_logic(self):
+        student = self.create_students(1)[0]
+        Grade.objects.create(student=student, subject=self.subjects[0], type='theory',
+                             score=9, max_score=10, date=date(2025, 1, 1))
+
+        response = self.submit('grades', {'class_id': self.class_obj.id})
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.data['status'], 'pending')
+        job_id = response.data['id']
+
+        self.assertTrue(claim_report_job(job_id))
+        self.assertFalse(claim_report_job(job_id))
+        self.assertEqual(run_report_job(job_id), 'completed')
+
+        response = self.client.get(reverse('report-job-detail', args=[job_id]))
+        self.assertEqual(response.data['status'], 'completed')
+        self.assertEqual(response.data['result'][0]['average_percentage'], 90.0)
+
+    def test_invalid_report_parameters_fail_the_job(self):
+        job_id = self.submit('student', {}).data['id']
+
+        claim_report_job(job_id)
+        self.assertEqual(run_report_job(job_id), 'failed')
+        self.assertEqual(ReportJob.objects.get(id=job_id).error, "student_id is required")
+
+
+    def test_stale_running_job_is_claimed_again(self):
+        job_id = self.submit('student', {}).data['id']
+        self.assertTrue(claim_report_job(job_id))
+        self.assertFalse(claim_report_job(job_id))
+
+        ReportJob.objects.filter(id=job_id).update(started_at=timezone.now() - timedelta(hours=1))
+        self.assertTrue(claim_report_job(job_id))
+        self.assertFalse(claim_report_job(job_id))
+
+
+class StudentDailySummaryTests(ReportTestCase):
+
+    def summary_rows(self):
+        return list(StudentDailySummary.objects.order_by('date', 'subject_id').values(
+            'student_id', 'date', 'subject_id', 'present_count', 'absent_count',
+            'grades_count', 'score_sum', 'max_score_sum', 'submissions_count',
+            'submitted_count', 'submission_score_sum', 'submission_max_score_sum'
+        ))
+
+    def test_signals_keep_summary_in_step_with_raw_rows(self):
+        student = self.create_students(1)[0]
+        subject = self.subjects[0]
+        schedule = Schedule.objects.create(day=0, period=1, class_name=self.class_obj,
+                                           section=self.section, subject=subject)
+        grade = Grade.objects.create(student=student, subject=subject, type='theory',
+                                     score=8, max_score=10, date=date(2025, 1, 1))
+        Grade.objects.create(student=student, subject=subject, type='practical',
+                             score=3, max_score=5, date=date(2025, 1, 1))
+        Attendance.objects.create(student=student, schedule=schedule, date=date(2025, 1, 1), status='absent')
+        assignment = Assignment.objects.create(title="واجب", due_date=date(2025, 1, 1), score=10,
+                                               schedule=schedule, subject=subject)
+        AssignmentSubmission.objects.create(student=student, assignment=assignment,
+                                            status='submitted', score=6)
+
+        summary = StudentDailySummary.objects.get(student=student, date=date(2025, 1, 1), subject=subject)
+        self.assertEqual((summary.grades_count, summary.score_sum, summary.max_score_sum), (2, 11, 15))
+        self.assertEqual((summary.present_count, summary.absent_count), (0, 1))
+        self.assertEqual((summary.submitted_count, summary.submission_score_sum,
+                          summary.submission_max_score_sum), (1, 6, 10))
+
+        # moving a grade to another day updates both days
+        grade.date = date(2025, 1, 2)
+        grade.save()
+        self.assertEqual(StudentDailySummary.objects.get(date=date(2025, 1, 2)).score_sum, 8)
+        self.assertEqual(StudentDailySummary.objects.get(date=date(2025, 1, 1)).score_sum, 3)
+
+        grade.delete()
+        self.assertFalse(StudentDailySummary.objects.filter(date=date(2025, 1, 2)).exists())
+
+        incremental = self.summary_rows()
+        StudentDailySummary.objects.all().delete()
+        rebuild_daily_summaries([student.id])
+        self.assertEqual(self.summary_rows(), incremental)
+
+
+class TrendsReportTests(ReportTestCase):
+
+    def test_weekly_and_monthly_buckets(self):
+        student = self.create_students(1)[0]
+        subject = self.subjects[0]
+        schedule = Schedule.objects.create(day=2, period=1, class_name=self.class_obj,
+                                           section=self.section, subject=subject)
+        Grade.objects.create(student=student, subject=subject, type='theory',
+                             score=8, max_score=10, date=date(2025, 1, 1))
+        Grade.objects.create(student=student, subject=subject, type='practical',
+                             score=3, max_score=5, date=date(2025, 1, 7))
+        Attendance.objects.create(student=student, schedule=schedule, date=date(2025, 1, 7), status='present')
+        Attendance.objects.create(student=student, schedule=schedule, date=date(2025, 1, 8), status='absent')
+
+        response = self.client.get(reverse('trends-report'), {'student_id': student.id, 'bucket': 'week'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['series'], [
+            ['2024-12-30', 80.0, None],
+            ['2025-01-06', 60.0, 50.0],
+        ])
+
+        response = self.client.get(reverse('trends-report'), {'class_id': self.class_obj.id, 'bucket': 'month'})
+        self.assertEqual(response.data['series'], [['2025-01-01', 73.33, 50.0]])
+
+    def test_unknown_bucket_is_rejected(self):
+        response = self.client.get(reverse('trends-report'), {'bucket': 'year'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_non_integer_ids_are_rejected(self):
+        for name in ('student_id', 'class_id', 'section_id'):
+            response = self.client.get(reverse('trends-report'), {name: 'abc'})
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(response.data, {'error': f"{name} must be an integer"})
+
+
+class ConditionalGetTests(ReportTestCase):
+
+    def test_report_answers_304_for_matching_etag(self):
+        student = self.create_students(1)[0]
+        url = reverse('attendance-report')
+
+        etag = self.client.get(url)['ETag']
+        with self.assertNumQueries(0):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        schedule = Schedule.objects.create(day=0, period=1, class_name=self.class_obj,
+                                           section=self.section, subject=self.subjects[0])
+        Attendance.objects.create(student=student, schedule=schedule, date=date(2025, 1, 1))
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_report_scope_uses_parsed_ids(self):
+        student = self.create_students(1)[0]
+        url = reverse('grades-report')
+        params = {'class_id': f'0{self.class_obj.id}'}
+
+        etag = self.client.get(url, params)['ETag']
+        Grade.objects.create(student=student, subject=self.subjects[0], type='theory',
+                             score=5, date=date(2025, 1, 1))
+        response = self.client.get(url, params, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data), 1)
+        self.assertEqual(response['ETag'], self.client.get(url, {'class_id': self.class_obj.id})['ETag'])
+
+        response = self.client.get(url, {'class_id': 'abc'})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data, {'error': "class_id must be an integer"})
+
+    def test_list_answers_304_until_rows_change(self):
+        student = self.create_students(1)[0]
+        url = reverse('grade-list')
+        Grade.objects.create(student=student, subject=self.subjects[0], type='theory', score=5)
+        grade = Grade.objects.create(student=student, subject=self.subjects[0], type='final', score=5)
+
+        first = self.client.get(url)
+        # deleting a row does not move Max(updated_at), so only the ETag is a safe validator
+        self.assertNotIn('Last-Modified', first)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+        Grade.objects.filter(type='theory').delete()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row['id'] for row in response.data], [grade.id])
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=http_date(time.time() + 60))
+        self.assertEqual(response.status_code, 200)
+
+
+    def test_bulk_writes_change_the_list_etag(self):
+        Notification.objects.create(title="تنبيه", message="رسالة")
+        url = reverse('notification-list')
+        etag = self.client.get(url)['ETag']
+
+        self.client.post(reverse('notification-mark-all-as-read'))
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.data[0]['is_read'])
+
+        student = self.create_students(1)[0]
+        row = {'student': student.id, 'subject': self.subjects[0].id, 'type': 'theory', 'date': '2025-01-01'}
+        self.client.post(reverse('grade-batch-create'), {'grades': [dict(row, score=5)]}, format='json')
+        etag = self.client.get(reverse('grade-list'))['ETag']
+        self.client.post(reverse('grade-batch-create'), {'grades': [dict(row, score=6)]}, format='json')
+        response = self.client.get(reverse('grade-list'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+
+class TimetableTests(ReportTestCase):
+
+    def setUp(self):
+        super().setUp()
+        # Sunday 2025-01-05 in the project time zone
+        self.sunday = lambda hour, minute: timezone.make_aware(datetime(2025, 1, 5, hour, minute))
+        self.schedules = {
+            period: Schedule.objects.create(day=0, period=period, class_name=self.class_obj,
+                                            section=self.section, subject=self.subjects[0])
+            for period in (1, 3)
+        }
+
+    def test_current_and_next_period(self):
+        at = lambda hour, minute: now_for(self.class_obj.id, self.section.id, self.sunday(hour, minute))
+
+        before_school = at(7, 30)
+        self.assertIsNone(before_school['current'])
+        self.assertEqual(before_school['next']['id'], self.schedules[1].id)
+
+        first_period = at(8, 10)
+        self.assertEqual(first_period['current']['id'], self.schedules[1].id)
+        self.assertEqual(first_period['current']['time'], "08:00 - 08:45")
+        # the second period is free, so the next lesson is the third
+        self.assertEqual(first_period['next']['id'], self.schedules[3].id)
+
+        # period times and the day's schedules are loaded once per change
+        with self.assertNumQueries(0):
+            free_period = at(9, 0)
+        self.assertIsNone(free_period['current'])
+        self.assertIsNone(at(13, 0)['next'])
+
+    def test_index_is_rebuilt_when_period_times_change(self):
+        self.assertIsNone(now_for(self.class_obj.id, self.section.id, self.sunday(7, 30))['current'])
+
+        period_time = PeriodTime.objects.get(period=1)
+        period_time.start_time = clock(7, 0)
+        period_time.save()
+
+        current = now_for(self.class_obj.id, self.section.id, self.sunday(7, 30))['current']
+        self.assertEqual(current['id'], self.schedules[1].id)
+        self.assertEqual(current['duration'], 105)
+
+    def test_now_requires_class_and_section(self):
+        self.assertEqual(self.client.get(reverse('schedule-now')).status_code, 400)
+        response = self.client.get(reverse('schedule-now'),
+                                   {'class_id': self.class_obj.id, 'section_id': self.section.id})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(set(response.data), {'day', 'time', 'current', 'next'})
+
+
+class ChampionsTests(ReportTestCase):
+
+    def test_all_boards_from_a_fixed_number_of_queries(self):
+        first, second = self.create_students(2)
+        schedule = Schedule.objects.create(day=0, period=1, class_name=self.class_obj,
+                                           section=self.section, subject=self.subjects[0])
+        today = date.today()
+        for student, statuses in ((first, ('present', 'present')), (second, ('present', 'absent'))):
+            for offset, status in enumerate(statuses):
+                Attendance.objects.create(student=student, schedule=schedule,
+                                          date=today - timedelta(days=offset), status=status)
+        assignments = [
+            Assignment.objects.create(title=f"واجب {i}", due_date=today, schedule=schedule,
+                                      subject=self.subjects[0])
+            for i in range(2)
+        ]
+        AssignmentSubmission.objects.create(student=first, assignment=assignments[0], status='submitted')
+        Note.objects.create(student=second, schedule=schedule, content="ممتاز", type='positive')
+        Grade.objects.create(student=first, subject=self.subjects[0], type='quran', score=9, max_score=10)
+        Grade.objects.create(student=second, subject=self.subjects[0], type='theory', score=7, max_score=10)
+
+        with self.assertNumQueries(6 * 3 + 4):
+            # six grouped reads per window, then delete + insert inside a savepoint
+            refresh_snapshots()
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('champions-all'))
+
+        boards = response.data
+        self.assertEqual([row['id'] for row in boards['attendance']], [first.id, second.id])
+        self.assertEqual(boards['attendance'][1]['attendance_rate'], 50.0)
+        # assignments are matched to the class/section through their schedule
+        self.assertEqual(boards['assignments'][0]['submission_rate'], 50.0)
+        self.assertEqual(boards['assignments'][0]['total_assignments'], 2)
+        self.assertEqual(boards['positive_notes'][0]['id'], second.id)
+        self.assertEqual([row['id'] for row in boards['grades']], [first.id, second.id])
+        self.assertEqual([row['avg_quran_grade'] for row in boards['quran']], [9.0])
+
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('champions-top-assignments'))
+        self.assertEqual(response.data, boards['assignments'])
+
+    def test_dense_rank_per_section_in_one_query(self):
+        other_section = Section.objects.create(name="ب")
+        students = self.create_students(3) + [
+            Student.objects.create(name=f"طالب ب{i}", class_name=self.class_obj, section=other_section)
+            for i in range(2)
+        ]
+        for student, score in zip(students, (9, 9, 5, 7, 3)):
+            Grade.objects.create(student=student, subject=self.subjects[0], type='theory', score=score)
+        refresh_snapshots()
+
+        # the tie at 9 shares rank 1, so rank 2 still follows
+        response = self.client.get(reverse('champions-top-grades'), {'section_id': self.section.id, 'limit': 2})
+        self.assertEqual([(row['id'], row['rank']) for row in response.data],
+                         [(students[0].id, 1), (students[1].id, 1), (students[2].id, 2)])
+
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('champions-top-grades'), {'per_section': 1, 'limit': 1})
+        self.assertEqual([(group['section_id'], [row['id'] for row in group['students']])
+                          for group in response.data],
+                         [(self.section.id, [students[0].id, students[1].id]), (other_section.id, [students[3].id])])
+
+        self.assertEqual(self.client.get(reverse('champions-top-grades'), {'term': 'month'}).status_code, 200)
+        self.assertEqual(self.client.get(reverse('champions-top-grades'), {'window_days': 7}).status_code, 400)
+
+    def test_most_improved_raw_and_percentage(self):
+        small, large = self.create_students(2)
+        early_at = timezone.now() - timedelta(days=60)
+        for student, max_score, early, late in ((small, 5, 4, 5), (large, 100, 50, 60)):
+            grade = Grade.objects.create(student=student, subject=self.subjects[0], type='theory',
+                                         score=early, max_score=max_score, date=early_at.date())
+            Grade.objects.filter(pk=grade.pk).update(created_at=early_at)
+            Grade.objects.create(student=student, subject=self.subjects[0], type='theory',
+                                 score=late, max_score=max_score)
+        refresh_snapshots()
+
+        url = reverse('champions-most-improved')
+        response = self.client.get(url)
+        self.assertEqual([(row['id'], row['improvement']) for row in response.data],
+                         [(large.id, 10.0), (small.id, 1.0)])
+        # 4/5 -> 5/5 is a bigger step than 50/100 -> 60/100
+        response = self.client.get(url, {'mode': 'percentage'})
+        self.assertEqual([(row['id'], row['improvement']) for row in response.data],
+                         [(small.id, 20.0), (large.id, 10.0)])
+        self.assertEqual(self.client.get(url, {'mode': 'x'}).status_code, 400)
+
+    def test_fresh_recomputes_for_staff_only(self):
+        student = self.create_students(1)[0]
+        refresh_snapshots()
+        Note.objects.create(student=student, content="ممتاز", type='positive',
+                            schedule=Schedule.objects.create(day=0, period=1, class_name=self.class_obj,
+                                                             section=self.section, subject=self.subjects[0]))
+        url = reverse('champions-top-positive-notes')
+        # the snapshot is still fresh, so the new note is not counted yet
+        self.assertEqual(self.client.get(url).data, [])
+        self.assertEqual(self.client.get(url, {'fresh': 1}).status_code, 403)
+
+        self.client.force_authenticate(User.objects.create_user('admin', is_staff=True))
+        response = self.client.get(url, {'fresh': 1})
+        self.assertEqual([row['id'] for row in response.data], [student.id])
+        self.assertEqual(LeaderboardSnapshot.objects.filter(metric='positive_notes', window_days=90).count(), 1)
+
+
+    def test_missing_or_expired_snapshot_is_computed_on_read(self):
+        first, second = self.create_students(2)
+        schedule = Schedule.objects.create(day=0, period=1, class_name=self.class_obj,
+                                           section=self.section, subject=self.subjects[0])
+        url = reverse('champions-top-positive-notes')
+        Note.objects.create(student=first, schedule=schedule, content="ممتاز", type='positive')
+        self.assertEqual([row['id'] for row in self.client.get(url).data], [first.id])
+
+        Note.objects.create(student=second, schedule=schedule, content="ممتاز", type='positive')
+        with self.assertNumQueries(1):
+            self.assertEqual(len(self.client.get(url).data), 1)
+
+        # older than LEADERBOARD_REFRESH_INTERVAL
+        cache.set('leaderboards:computed_at', (time.time() - 1, None), 60)
+        self.assertEqual(len(self.client.get(url).data), 2)
+
+
+class GradeBatchCreateTests(ReportTestCase):
+
+    def grade_rows(self, students, score):
+        return [
+            {'student': student.id, 'subject': self.subjects[0].id, 'type': grade_type,
+             'date': '2025-01-01', 'score': score, 'max_score': 10}
+            for student in students
+            for grade_type in ('theory', 'practical', 'participation', 'quran', 'final')
+        ]
+
+    def test_upsert_in_a_fixed_number_of_queries(self):
+        students = self.create_students(40)
+        url = reverse('grade-batch-create')
+
+        # students + subjects + existing grades + 2 inserts (SQLite variable limit) + new ids,
+        # then the daily summary refresh and savepoints
+        with self.assertNumQueries(15):
+            response = self.client.post(url, {'grades': self.grade_rows(students, 7)}, format='json')
+        self.assertEqual(response.data['success_count'], 200)
+        self.assertEqual(response.data['results'][0]['student_name'], students[0].name)
+        self.assertEqual(Grade.objects.count(), 200)
+
+        # updates only: no new ids to read back
+        with self.assertNumQueries(14):
+            response = self.client.post(url, {'grades': self.grade_rows(students, 9)}, format='json')
+        self.assertEqual(Grade.objects.count(), 200)
+        self.assertEqual(set(Grade.objects.values_list('score', flat=True)), {9})
+        self.assertEqual(set(row['id'] for row in response.data['results']),
+                         set(Grade.objects.values_list('id', flat=True)))
+        summary = StudentDailySummary.objects.get(student=students[0], date=date(2025, 1, 1))
+        self.assertEqual((summary.grades_count, summary.score_sum), (5, 45))
+
+    def test_invalid_rows_are_reported(self):
+        student = self.create_students(1)[0]
+        rows = [
+            {'student': student.id, 'subject': self.subjects[0].id, 'type': 'theory', 'score': 5},
+            {'student': 999, 'subject': self.subjects[0].id, 'type': 'theory', 'score': 5},
+            {'student': student.id, 'subject': self.subjects[0].id, 'type': 'oral', 'score': 5},
+            # same key as the first row: the last one wins and the first is reported as superseded
+            {'student': student.id, 'subject': self.subjects[0].id, 'type': 'theory', 'score': 8},
+        ]
+        response = self.client.post(reverse('grade-batch-create'), {'grades': rows}, format='json')
+
+        self.assertEqual(response.data['success_count'], 1)
+        self.assertEqual([error['client_index'] for error in response.data['errors']], [0, 1, 2])
+        self.assertEqual(response.data['errors'][0]['error'],
+                         {'non_field_errors': ['Superseded by row 3 with the same key.']})
+        self.assertIn('student', response.data['errors'][1]['error'])
+        self.assertEqual(list(Grade.objects.values_list('score', flat=True)), [8])
+
+    def test_update_keeps_fields_the_row_leaves_out(self):
+        student = self.create_students(1)[0]
+        grade = Grade.objects.create(student=student, subject=self.subjects[0], type='theory',
+                                     score=10, max_score=15, date=date(2025, 1, 1))
+        url = reverse('grade-batch-create')
+        row = {'student': student.id, 'subject': self.subjects[0].id, 'type': 'theory', 'date': '2025-01-01'}
+
+        self.client.post(url, {'grades': [dict(row, score=12)]}, format='json')
+        grade.refresh_from_db()
+        self.assertEqual((grade.score, grade.max_score), (12, 15))
+
+        # the model default still applies to new rows
+        self.client.post(url, {'grades': [dict(row, type='final', score=50)]}, format='json')
+        self.assertEqual(Grade.objects.get(type='final').max_score, 100)
+
+    def test_compact_response_modes(self):
+        students = self.create_students(2)
+        url = reverse('grade-batch-create')
+        rows = self.grade_rows(students[:1], 7)[:2] + [{'student': 999, 'subject': self.subjects[0].id,
+                                                         'type': 'theory', 'score': 1}]
+        existing = self.client.post(url, {'grades': rows[:1]}, format='json').data['results'][0]['id']
+
+        response = self.client.post(url + '?response=ids', {'grades': rows}, format='json')
+        created = Grade.objects.exclude(id=existing).get().id
+        self.assertEqual(response.data['client_index'], [0, 1])
+        self.assertEqual(response.data['id'], [existing, created])
+        self.assertEqual(response.data['outcome'], ['updated', 'created'])
+        self.assertEqual([error['client_index'] for error in response.data['errors']], [2])
+        self.assertNotIn('results', response.data)
+
+        response = self.client.post(url + '?response=summary', {'grades': rows}, format='json')
+        self.assertEqual(response.data, {'success_count': 2, 'error_count': 1,
+                                         'created_count': 0, 'updated_count': 2})
+
+        # full serializes from the objects loaded for the upsert: no extra query per row
+        rows = self.grade_rows(students, 8)
+        self.client.post(url + '?response=summary', {'grades': rows}, format='json')
+        with self.assertNumQueries(13):
+            self.client.post(url + '?response=ids', {'grades': rows}, format='json')
+        with self.assertNumQueries(13):
+            response = self.client.post(url + '?response=full', {'grades': rows}, format='json')
+        self.assertEqual(response.data['results'][-1]['subject_name'], self.subjects[0].name)
+
+        self.assertEqual(self.client.post(url + '?response=xml', {'grades': rows}, format='json').status_code, 400)
+
+
+class AttendanceBatchCreateTests(ReportTestCase):
+
+    def test_several_periods_a_day_in_a_fixed_number_of_queries(self):
+        students = self.create_students(40)
+        schedules = [
+            Schedule.objects.create(day=0, period=period, class_name=self.class_obj,
+                                    section=self.section, subject=self.subjects[period - 1])
+            for period in (1, 2)
+        ]
+        today = date.today()
+        url = reverse('attendance-batch-create')
+
+        def rows(status):
+            return [{'student': student.id, 'schedule': schedule.id, 'date': today.isoformat(), 'status': status}
+                    for schedule in schedules for student in students]
+
+        # the counters are bumped once per (name, day), never per row
+        with self.assertNumQueries(31):
+            response = self.client.post(url, {'attendance': rows('present')}, format='json')
+        self.assertEqual(response.data['success_count'], 80)
+        self.assertEqual(response.data['results'][0]['student_name'], students[0].name)
+
+        # the second period is absent: it must not overwrite the first one
+        with self.assertNumQueries(17):
+            response = self.client.post(url, {'attendance': rows('absent')[40:]}, format='json')
+        self.assertEqual(response.data['success_count'], 40)
+        self.assertEqual(Attendance.objects.count(), 80)
+        self.assertEqual(Attendance.objects.filter(schedule=schedules[0], status='present').count(), 40)
+        self.assertEqual(Attendance.objects.filter(schedule=schedules[1], status='absent').count(), 40)
+
+        counts = dashboard_counts(today)
+        self.assertEqual((counts['attendance_total'], counts['attendance_present']), (80, 40))
+        summary = StudentDailySummary.objects.get(student=students[0], date=today, subject=self.subjects[1])
+        self.assertEqual((summary.present_count, summary.absent_count), (0, 1))
+
+
+    def test_update_keeps_subject_info_the_row_leaves_out(self):
+        student = self.create_students(1)[0]
+        schedule = Schedule.objects.create(day=0, period=1, class_name=self.class_obj,
+                                           section=self.section, subject=self.subjects[0])
+        url = reverse('attendance-batch-create')
+        row = {'student': student.id, 'schedule': schedule.id, 'date': '2025-01-01'}
+
+        self.client.post(url, {'attendance': [dict(row, status='present', subject_info='Math')]}, format='json')
+        self.client.post(url, {'attendance': [dict(row, status='absent')]}, format='json')
+
+        attendance = Attendance.objects.get()
+        self.assertEqual((attendance.status, attendance.subject_info), ('absent', 'Math'))
+
+
+class ImportTests(ReportTestCase):
+
+    def test_ndjson_grades_in_chunks_with_line_errors(self):
+        students = self.create_students(5)
+        lines = [
+            json.dumps({'student': student.id, 'subject': self.subjects[0].id, 'type': 'theory',
+                        'date': '2025-01-01', 'score': 7})
+            for student in students
+        ]
+        lines[2:2] = ['{not json', '', json.dumps({'student': 999, 'subject': self.subjects[0].id,
+                                                      'type': 'theory', 'score': 7})]
+        body = '\n'.join(lines) + '\n'
+
+        with mock.patch('api.imports.IMPORT_CHUNK_SIZE', 2):
+            response = self.client.post(reverse('import-grades') + '?errors=1', body,
+                                        content_type='application/x-ndjson')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual({key: response.data[key] for key in ('rows', 'created', 'updated', 'error_count')},
+                         {'rows': 7, 'created': 5, 'updated': 0, 'error_count': 2})
+        self.assertEqual([error['line'] for error in response.data['errors']], [3, 5])
+        self.assertEqual(Grade.objects.count(), 5)
+
+        response = self.client.post(reverse('import-grades'), body, content_type='application/x-ndjson')
+        self.assertEqual((response.data['updated'], response.data['error_count']), (5, 2))
+        self.assertNotIn('errors', response.data)
+
+    def test_csv_attendance(self):
+        students = self.create_students(2)
+        schedule = Schedule.objects.create(day=0, period=1, class_name=self.class_obj,
+                                           section=self.section, subject=self.subjects[0])
+        body = '\ufeffstudent,schedule,date,status,subject_info\r\n' + ''.join(
+            f'{student.id},{schedule.id},2025-01-01,absent,\r\n' for student in students
+        )
+
+        response = self.client.post(reverse('import-attendance'), body.encode('utf-8'), content_type='text/csv')
+
+        self.assertEqual((response.data['created'], response.data['error_count']), (2, 0))
+        self.assertEqual(Attendance.objects.filter(status='absent', subject_info=None).count(), 2)
+        self.assertEqual(dashboard_counts(date(2025, 1, 1))['attendance_total'], 2)
+
+    def test_empty_body_is_rejected(self):
+        response = self.client.post(reverse('import-grades'), '', content_type='application/x-ndjson')
+        self.assertEqual(response.status_code, 400)
+
+
+class IdempotencyTests(ReportTestCase):
+
+    def grade_rows(self):
+        student = self.create_students(1)[0]
+        return {'grades': [{'student': student.id, 'subject': self.subjects[0].id, 'type': 'theory', 'score': 7}]}
+
+    def test_retry_replays_the_first_response(self):
+        url = reverse('grade-batch-create')
+        rows = self.grade_rows()
+        first = self.client.post(url, rows, format='json', HTTP_IDEMPOTENCY_KEY='abc')
+        Grade.objects.all().delete()
+
+        retry = self.client.post(url, rows, format='json', HTTP_IDEMPOTENCY_KEY='abc')
+
+        self.assertEqual(retry.status_code, 200)
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.assertEqual(retry.data, first.data)
+        self.assertFalse(Grade.objects.exists())
+
+        # without the header every call executes
+        self.client.post(url, rows, format='json')
+        self.assertEqual(Grade.objects.count(), 1)
+
+    def test_key_reused_on_another_endpoint(self):
+        self.client.post(reverse('grade-batch-create'), self.grade_rows(), format='json', HTTP_IDEMPOTENCY_KEY='abc')
+        response = self.client.post(reverse('import-grades'), '{}', content_type='application/x-ndjson',
+                                    HTTP_IDEMPOTENCY_KEY='abc')
+        self.assertEqual(response.status_code, 422)
+
+    def test_key_reused_with_another_body(self):
+        url = reverse('grade-batch-create')
+        rows = self.grade_rows()
+        self.client.post(url, rows, format='json', HTTP_IDEMPOTENCY_KEY='abc')
+
+        rows['grades'][0]['score'] = 9
+        response = self.client.post(url, rows, format='json', HTTP_IDEMPOTENCY_KEY='abc')
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(list(Grade.objects.values_list('score', flat=True)), [7])
+
+    def test_import_body_is_still_read_after_hashing(self):
+        student = self.create_students(1)[0]
+        body = json.dumps({'student': student.id, 'subject': self.subjects[0].id, 'type': 'theory', 'score': 7})
+        for _ in range(2):
+            response = self.client.post(reverse('import-grades'), body, content_type='application/x-ndjson',
+                                        HTTP_IDEMPOTENCY_KEY='abc')
+            self.assertEqual((response.data['rows'], response.data['created']), (1, 1))
+        self.assertEqual(response['Idempotent-Replayed'], 'true')
+
+    def test_request_in_progress_is_not_executed_twice(self):
+        url = reverse('grade-batch-create')
+        IdempotencyKey.objects.create(key='abc', path=url)
+
+        with mock.patch('api.idempotency.WAIT', 0):
+            response = self.client.post(url, self.grade_rows(), format='json', HTTP_IDEMPOTENCY_KEY='abc')
+
+        self.assertEqual(response.status_code, 409)
+        self.assertFalse(Grade.objects.exists())
+
+
+class DashboardCounterTests(ReportTestCase):
+
+    def counter_values(self):
+        return dict(DashboardCounter.objects.exclude(value=0).values_list('key', 'value'))
+
+    def test_signals_match_full_recount(self):
+        today = date.today()
+        students = self.create_students(3)
+        schedule = Schedule.objects.create(day=0, period=1, class_name=self.class_obj,
+                                           section=self.section, subject=self.subjects[0])
+        attendance = Attendance.objects.create(student=students[0], schedule=schedule, date=today)
+        Attendance.objects.create(student=students[1], schedule=schedule, date=today, status='absent')
+        assignment = Assignment.objects.create(title="واجب", due_date=today, schedule=schedule,
+                                               subject=self.subjects[0])
+
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('dashboard-stats'))
+        self.assertEqual(response.data['totalStudents'], 3)
+        self.assertEqual(response.data['attendanceRate'], 50.0)
+        self.assertEqual(response.data['assignmentsCount'], 1)
+
+        attendance.status = 'absent'
+        attendance.save()
+        assignment.due_date = date(2020, 1, 1)
+        assignment.save()
+        students[2].delete()
+        students[1].delete()  # cascades to its attendance
+
+        counts = dashboard_counts(today)
+        self.assertEqual((counts['students'], counts['attendance_total'], counts['attendance_present'],
+                          counts['assignments_due']), (1, 1, 0, 0))
+
+        incremental = self.counter_values()
+        recount_counters()
+        self.assertEqual(self.counter_values(), incremental)
+
+
+    def test_update_reads_the_stored_row_once(self):
+        student = self.create_students(1)[0]
+        schedule = Schedule.objects.create(day=0, period=1, class_name=self.class_obj,
+                                           section=self.section, subject=self.subjects[0])
+        attendance = Attendance.objects.create(student=student, schedule=schedule, date=date.today())
+        attendance.status = 'absent'
+
+        with CaptureQueriesContext(connection) as queries:
+            attendance.save()
+        reads = [query['sql'] for query in queries.captured_queries
+                 if query['sql'].startswith('SELECT') and 'FROM "api_attendance" WHERE' in query['sql']]
+        self.assertEqual(len(reads), 1)
+        self.assertEqual(dashboard_counts()['attendance_present'], 0)
+
+    def test_cascade_delete_in_a_fixed_number_of_queries(self):
+        students = self.create_students(10)
+        schedules = [
+            Schedule.objects.create(day=0, period=period, class_name=self.class_obj,
+                                    section=self.section, subject=self.subjects[period])
+            for period in (0, 1)
+        ]
+        for schedule in schedules:
+            for offset in range(5):
+                day = date(2025, 1, 1) + timedelta(days=offset)
+                Attendance.objects.bulk_create([
+                    Attendance(student=student, schedule=schedule, date=day) for student in students
+                ])
+                Grade.objects.bulk_create([
+                    Grade(student=student, subject=schedule.subject, type='theory', score=5, date=day)
+                    for student in students
+                ])
+        rebuild_daily_summaries([student.id for student in students])
+        recount_counters()
+
+        # no work per deleted row: one refresh, one invalidation and one recount for the whole cascade
+        with self.assertNumQueries(27):
+            response = self.client.delete(reverse('subject-detail', args=[self.subjects[0].id]))
+        self.assertEqual(response.status_code, 204)
+
+        self.assertEqual(set(StudentDailySummary.objects.values_list('subject_id', flat=True)), {self.subjects[1].id})
+        self.assertEqual(StudentDailySummary.objects.count(), 50)
+        incremental = self.counter_values()
+        self.assertEqual(incremental['attendance_total:2025-01-01'], 10)
+        recount_counters()
+        self.assertEqual(self.counter_values(), incremental)
+
+    def test_string_dates_are_counted_as_dates(self):
+        today = date.today()
+        student = self.create_students(1)[0]
+        schedule = Schedule.objects.create(day=0, period=1, class_name=self.class_obj,
+                                           section=self.section, subject=self.subjects[0])
+        attendance = Attendance.objects.create(student=student, schedule=schedule, date=today.isoformat())
+        Assignment.objects.create(title="واجب", due_date=today.isoformat(), schedule=schedule,
+                                  subject=self.subjects[0])
+        attendance.date = (today - timedelta(days=8)).isoformat()
+        attendance.save()
+
+        counts = dashboard_counts(today)
+        self.assertEqual((counts['attendance_total'], counts['assignments_due']), (0, 1))
+        self.assertEqual(list(StudentDailySummary.objects.values_list('date', flat=True)),
+                         [today - timedelta(days=8)])
+        incremental = self.counter_values()
+        recount_counters()
+        self.assertEqual(self.counter_values(), incremental)
+
+
+class TopStudentsTests(ReportTestCase):
+
+    def test_ranked_by_percentage_in_one_query(self):
+        students = self.create_students(8)
+        other_section = Section.objects.create(name="ب")
+        outsider = Student.objects.create(name="طالب آخر", class_name=self.class_obj, section=other_section)
+        # raw scores favour the first students, percentages favour the last ones
+        Grade.objects.bulk_create([
+            Grade(student=student, subject=self.subjects[0], type='theory',
+                  score=10 - i, max_score=100 - i * 12)
+            for i, student in enumerate(students)
+        ] + [Grade(student=outsider, subject=self.subjects[0], type='theory', score=10, max_score=10)])
+
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('dashboard-top-students'),
+                                       {'section_id': self.section.id, 'limit': 3})
+
+        self.assertEqual([row['id'] for row in response.data], [s.id for s in students[::-1][:3]])
+        self.assertEqual(response.data[0]['avg_score'], 18.8)
+        self.assertEqual(response.data[0]['grades_count'], 1)
+
+    def test_invalid_limit_is_rejected(self):
+        response = self.client.get(reverse('dashboard-top-students'), {'limit': 'x'})
+        self.assertEqual(response.status_code, 400)
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class DashboardAllTests(TransactionTestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        class_obj = Class.objects.create(name="الصف الأول")
+        section = Section.objects.create(name="أ")
+        self.student = Student.objects.create(name="طالب", class_name=class_obj, section=section)
+        Grade.objects.create(student=self.student, subject=Subject.objects.create(name="مادة"),
+                             type='theory', score=9, max_score=10)
+
+    def test_widgets_match_individual_endpoints(self):
+        response = self.client.get(reverse('dashboard-all'))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['stats'], self.client.get(reverse('dashboard-stats')).data)
+        self.assertEqual(response.data['topStudents'][0]['id'], self.student.id)
+        self.assertEqual(set(response.data['meta']['widgets']),
+                         {'stats', 'todaySchedule', 'topStudents', 'weeklyAttendance', 'recentNotes'})
+        self.assertFalse(response.data['meta']['widgets']['topStudents']['cached'])
+
+        response = self.client.get(reverse('dashboard-all'), {'widgets': 'topStudents,stats'})
+        self.assertEqual(set(response.data), {'topStudents', 'stats', 'meta'})
+        self.assertTrue(response.data['meta']['widgets']['topStudents']['cached'])
+        # stats reads the maintained counters and is never cached
+        self.assertFalse(response.data['meta']['widgets']['stats']['cached'])
+
+    def test_invalid_widget_parameters_are_rejected(self):
+        self.assertEqual(self.client.get(reverse('dashboard-all'), {'widgets': 'nope'}).status_code, 400)
+        self.assertEqual(self.client.get(reverse('dashboard-all'), {'limit': 'x'}).status_code, 400)
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class DashboardConsumerTests(TransactionTestCase):
+
+    def setUp(self):
+        # drop changes queued by earlier tests
+        dashboard_live.flush()
+
+    async def test_snapshot_then_debounced_deltas(self):
+        communicator = WebsocketCommunicator(DashboardConsumer.as_asgi(), "/ws/dashboard/")
+        connected, _ = await communicator.connect()
+        self.assertTrue(connected)
+
+        snapshot = await communicator.receive_json_from()
+        self.assertEqual(snapshot['type'], 'snapshot')
+        self.assertEqual(snapshot['data']['totalStudents'], 0)
+
+        await database_sync_to_async(self.write_rows)()
+        await database_sync_to_async(dashboard_live.flush)()
+
+        delta = await communicator.receive_json_from()
+        self.assertEqual(delta['type'], 'delta')
+        self.assertEqual(delta['data']['totalStudents'], 2)
+        self.assertEqual(delta['data']['attendanceTotal'], 1)
+        self.assertEqual(delta['data']['attendancePresent'], 1)
+        self.assertEqual([note['content'] for note in delta['data']['notes']], ["ملاحظة"])
+        # nothing else is sent for the same changes
+        self.assertTrue(await communicator.receive_nothing())
+        await communicator.disconnect()
+
+    def write_rows(self):
+        class_obj = Class.objects.create(name="الصف الأول")
+        section = Section.objects.create(name="أ")
+        students = [Student.objects.create(name=f"طالب {i}", class_name=class_obj, section=section)
+                    for i in range(2)]
+        schedule = Schedule.objects.create(day=0, period=1, class_name=class_obj, section=section,
+                                           subject=Subject.objects.create(name="مادة"))
+        Attendance.objects.create(student=students[0], schedule=schedule, date=timezone.localdate())
+        Note.objects.create(student=students[0], schedule=schedule, content="ملاحظة")
+
+
+class SharedCacheTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    def unexpected_compute(self):
+        raise AssertionError("value should not be recomputed")
+
+    def test_expired_value_is_served_while_another_worker_recomputes(self):
+        cache.set('key', (time.time() - 1, 'old'), 60)
+        held = lock('key')
+        self.assertTrue(held.acquire())
+        self.assertFalse(lock('key').acquire())
+        self.assertEqual(get_or_set('key', self.unexpected_compute, 60), 'old')
+
+        held.release()
+        self.assertEqual(get_or_set('key', lambda: 'new', 60), 'new')
+        self.assertEqual(get_or_set('key', self.unexpected_compute, 60), 'new')
+
+    def test_concurrent_miss_waits_for_the_lock_holder(self):
+        held = lock('key')
+        self.assertTrue(held.acquire())
+        threading.Timer(0.1, lambda: cache.set('key', (time.time() + 60, 'computed'), 60)).start()
+        self.assertEqual(get_or_set('key', self.unexpected_compute, 60), 'computed')
+        held.release()
+
+    def test_miss_rechecks_the_cache_after_taking_the_lock(self):
+        held = lock('key')
+        acquire = held.acquire
+
+        def acquire_after_holder_finished():
+            # the previous holder stored the value and released the lock just before us
+            cache.set('key', (time.time() + 60, 'computed'), 60)
+            return acquire()
+
+        held.acquire = acquire_after_holder_finished
+        with mock.patch('api.shared_cache.lock', return_value=held):
+            self.assertEqual(get_or_set('key', self.unexpected_compute, 60), 'computed')
+        self.assertTrue(lock('key').acquire())
+
+    def test_concurrent_increments_are_not_lost(self):
+        def bump():
+            for _ in range(50):
+                incr('counter')
+
+        threads = [threading.Thread(target=bump) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(cache.get('counter'), 400)
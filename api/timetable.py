@@ -0,0 +1,154 @@
+"""
+فهرس الجدول الدراسي في ذاكرة كل عملية
+
+يُبنى لكل يوم مرة واحدة: حصص كل (صف، فصل) مرتبة بحسب رقم الحصة، مع جدول لكل دقيقة من اليوم
+يحدد الحصة الجارية والتالية، فتُعرف حصة الآن لأي صف بعمليات بحث في قواميس دون المرور على حصص اليوم.
+أي تعديل على الجدول أو توقيت الحصص يزيد رقم جيل في الذاكرة المشتركة، فتعيد كل عملية بناء فهرسها.
+"""
+import threading
+import time
+
+from django.core.cache import cache
+from django.utils import timezone
+
+from .models import PeriodTime, Schedule
+from .report_cache import bump_generations
+
+GENERATION_KEY = 'timetable-gen'
+
+MINUTES_PER_DAY = 24 * 60
+
+# المدة المفترضة لحصة ليس لها توقيت مسجل
+DEFAULT_PERIOD_DURATION = 45
+
+_lock = threading.Lock()
+_index = {'generation': None, 'slots': None, 'days': {}}
+
+
+def invalidate_timetable():
+    bump_generations({GENERATION_KEY})
+
+
+def _generation():
+    generation = cache.get(GENERATION_KEY)
+    if generation is None:
+        cache.add(GENERATION_KEY, time.time_ns(), None)
+        generation = cache.get(GENERATION_KEY)
+    return generation
+
+
+def _minute(value):
+    return value.hour * 60 + value.minute
+
+
+class _Slots:
+    """توقيت الحصص مرتباً، مع الحصة الجارية والتالية لكل دقيقة من اليوم"""
+
+    def __init__(self, period_times):
+        self.period_times = sorted(period_times, key=lambda period_time: period_time.start_time)
+        self.by_period = {period_time.period: period_time for period_time in self.period_times}
+
+        # by_minute[m] = (ترتيب الحصة الجارية أو None، ترتيب أول حصة تبدأ بعد m أو None)
+        self.by_minute = []
+        current_index = None
+        next_index = 0
+        for minute in range(MINUTES_PER_DAY):
+            while next_index < len(self.period_times) and _minute(self.period_times[next_index].start_time) <= minute:
+                next_index += 1
+            current_index = next_index - 1 if next_index else None
+            if current_index is not None and _minute(self.period_times[current_index].end_time) <= minute:
+                current_index = None
+            self.by_minute.append((current_index, next_index if next_index < len(self.period_times) else None))
+
+    def at(self, value):
+        return self.by_minute[_minute(value)]
+
+
+def _entry(schedule, slots):
+    period_time = slots.by_period.get(schedule.period)
+    return {
+        "id": schedule.id,
+        "period": schedule.period,
+        "time": (
+            f"{period_time.start_time:%H:%M} - {period_time.end_time:%H:%M}"
+            if period_time else f"Period {schedule.period}"
+        ),
+        "subject": schedule.subject.name,
+        "class": schedule.class_name.name,
+        "section": schedule.section.name,
+        "duration": period_time.duration if period_time else DEFAULT_PERIOD_DURATION,
+        "classId": schedule.class_name.id,
+        "sectionId": schedule.section.id,
+        "subjectId": schedule.subject.id
+    }
+
+
+def _build_day(day, slots):
+    schedules = Schedule.objects.filter(day=day).select_related(
+        'class_name', 'section', 'subject'
+    ).order_by('period', 'id')
+
+    entries = [_entry(schedule, slots) for schedule in schedules]
+    classes = {}
+    for entry in entries:
+        classes.setdefault((entry['classId'], entry['sectionId']), {})[entry['period']] = entry
+
+    # next_from[i]: أول حصة للصف في ترتيب التوقيت i أو بعده
+    next_from = {}
+    for key, by_period in classes.items():
+        following = [None] * (len(slots.period_times) + 1)
+        for index in range(len(slots.period_times) - 1, -1, -1):
+            following[index] = by_period.get(slots.period_times[index].period) or following[index + 1]
+        next_from[key] = following
+
+    return {'entries': entries, 'classes': classes, 'next_from': next_from}
+
+
+def _day_index(day):
+    generation = _generation()
+    with _lock:
+        if _index['generation'] != generation:
+            _index.update(generation=generation, slots=_Slots(PeriodTime.objects.all()), days={})
+        if day not in _index['days']:
+            _index['days'][day] = _build_day(day, _index['slots'])
+        return _index['slots'], _index['days'][day]
+
+
+def model_day(value):
+    """اليوم في النموذج (0=الأحد) من تاريخ أو وقت"""
+    return (value.weekday() + 1) % 7
+
+
+def day_entries(day):
+    """حصص اليوم مرتبة بحسب رقم الحصة"""
+    return _day_index(day)[1]['entries']
+
+
+def current_period(now=None):
+    """رقم الحصة الجارية الآن أو None بين الحصص وخارج الدوام"""
+    now = timezone.localtime(now)
+    slots, _ = _day_index(model_day(now))
+    current_index, _ = slots.at(now)
+    return slots.period_times[current_index].period if current_index is not None else None
+
+
+def now_for(class_id, section_id, now=None):
+    """الحصة الجارية والحصة التالية لصف وفصل"""
+    now = timezone.localtime(now)
+    slots, day = _day_index(model_day(now))
+    current_index, next_index = slots.at(now)
+    key = (int(class_id), int(section_id))
+
+    current = None
+    if current_index is not None:
+        current = day['classes'].get(key, {}).get(slots.period_times[current_index].period)
+
+    following = day['next_from'].get(key)
+    upcoming = following[next_index] if following and next_index is not None else None
+
+    return {
+        "day": model_day(now),
+        "time": f"{now:%H:%M}",
+        "current": current,
+        "next": upcoming,
+    }
@@ -2,10 +2,12 @@ from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from . import views
 from . import reports
+from . import report_jobs
 from . import random_picker
 from . import whiteboard
 from . import dashboard_views
 from . import champions_views
+from . import imports
 
 router = DefaultRouter()
 router.register(r'classes', views.ClassViewSet)
@@ -13,6 +15,7 @@ router.register(r'sections', views.SectionViewSet)
 router.register(r'subjects', views.SubjectViewSet)
 router.register(r'students', views.StudentViewSet)
 router.register(r'schedules', views.ScheduleViewSet)
+router.register(r'period-times', views.PeriodTimeViewSet)
 router.register(r'attendances', views.AttendanceViewSet)
 router.register(r'assignments', views.AssignmentViewSet)
 router.register(r'assignment-submissions', views.AssignmentSubmissionViewSet)
@@ -29,6 +32,14 @@ urlpatterns = [
     path('reports/attendance/', reports.attendance_report, name='attendance-report'),
     path('reports/assignments/', reports.assignments_report, name='assignments-report'),
     path('reports/student/', reports.student_report, name='student-report'),
+    path('reports/trends/', reports.trends_report, name='trends-report'),
+    path('reports/cache-stats/', reports.report_cache_stats, name='report-cache-stats'),
+    path('reports/jobs/', report_jobs.report_jobs, name='report-jobs'),
+    path('reports/jobs/<int:pk>/', report_jobs.report_job_detail, name='report-job-detail'),
+
+    # Bulk import endpoints (NDJSON or CSV)
+    path('import/grades/', imports.import_grades, name='import-grades'),
+    path('import/attendance/', imports.import_attendance, name='import-attendance'),
 
     # Random picker endpoints
     path('random/student/', random_picker.random_student, name='random-student'),
@@ -39,6 +50,7 @@ urlpatterns = [
     path('whiteboard/drawings/<int:pk>/', whiteboard.whiteboard_drawing_detail, name='whiteboard-drawing-detail'),
 
     # Dashboard endpoints
+    path('dashboard/all/', dashboard_views.get_dashboard_all, name='dashboard-all'),
     path('dashboard/stats/', dashboard_views.get_dashboard_stats, name='dashboard-stats'),
     path('dashboard/today-schedule/', dashboard_views.get_today_schedule, name='today-schedule'),
     path('dashboard/top-students/', dashboard_views.get_top_students, name='dashboard-top-students'),
@@ -46,6 +58,7 @@ urlpatterns = [
     path('dashboard/recent-notes/', dashboard_views.get_recent_notes, name='dashboard-recent-notes'),
 
     # Champions endpoints
+    path('champions/all/', champions_views.get_all_champions, name='champions-all'),
     path('champions/top-attendance/', champions_views.get_top_attendance_students, name='champions-top-attendance'),
     path('champions/top-assignments/', champions_views.get_top_assignment_students, name='champions-top-assignments'),
     path('champions/top-positive-notes/', champions_views.get_top_positive_notes_students, name='champions-top-positive-notes'),
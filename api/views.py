@@ -11,21 +11,60 @@ import logging
 logger = logging.getLogger(__name__)
 
 from .models import (
-    Class, Section, Subject, Student, Schedule,
+    Class, Section, Subject, Student, Schedule, PeriodTime,
     Attendance, Assignment, AssignmentSubmission,
     Grade, Note, Notification
 )
 from .serializers import (
     ClassSerializer, SectionSerializer, SubjectSerializer, SubjectDetailSerializer,
-    StudentSerializer, StudentDetailSerializer, ScheduleSerializer, ScheduleDetailSerializer,
+    StudentSerializer, StudentDetailSerializer, ScheduleSerializer, ScheduleDetailSerializer, PeriodTimeSerializer,
     AttendanceSerializer, AttendanceDetailSerializer, AssignmentSerializer, AssignmentDetailSerializer,
     AssignmentSubmissionSerializer, AssignmentSubmissionDetailSerializer,
     GradeSerializer, GradeDetailSerializer, NoteSerializer, NoteDetailSerializer,
     NotificationSerializer, NotificationDetailSerializer
 )
+from .bulk import upsert_attendance, upsert_grades
+from .idempotency import idempotent
+from .conditional import ConditionalListMixin
+from .timetable import current_period, model_day, now_for
+
+# أشكال استجابة الكتابة المجمّعة (?response=)
+BATCH_RESPONSE_MODES = ('full', 'ids', 'summary')
+
+def _batch_response_mode(request):
+    """قراءة ?response= (full افتراضياً)؛ ترفع ValueError عند قيمة غير معروفة"""
+    mode = request.query_params.get('response', 'full')
+    if mode not in BATCH_RESPONSE_MODES:
+        raise ValueError(f"response must be one of: {', '.join(BATCH_RESPONSE_MODES)}")
+    return mode
+
+def _batch_response(request, mode, written, errors, detail_serializer):
+    """
+    استجابة الكتابة المجمّعة:
+    full: تفاصيل كل سجل (المفاتيح الأجنبية محمّلة مسبقاً فلا استعلام لكل صف)
+    ids: (client_index, id, created|updated) في مصفوفات عمودية، summary: الأعداد فقط
+    """
+    created_count = sum(1 for _, _, previous in written if previous is None)
+    data = {
+        "success_count": len(written),
+        "error_count": len(errors),
+        "created_count": created_count,
+        "updated_count": len(written) - created_count,
+    }
+    if mode == 'full':
+        data["results"] = detail_serializer(
+            [instance for _, instance, _ in written], many=True, context={'request': request}
+        ).data
+        data["errors"] = [{"client_index": index, "data": row, "error": error} for index, row, error in errors]
+    elif mode == 'ids':
+        data["client_index"] = [index for index, _, _ in written]
+        data["id"] = [instance.pk for _, instance, _ in written]
+        data["outcome"] = ['created' if previous is None else 'updated' for _, _, previous in written]
+        data["errors"] = [{"client_index": index, "error": error} for index, _, error in errors]
+    return Response(data)
 
 # Create your views here.
-class ClassViewSet(viewsets.ModelViewSet):
+class ClassViewSet(ConditionalListMixin, viewsets.ModelViewSet):
     queryset = Class.objects.all()
     serializer_class = ClassSerializer
     filter_backends = [filters.SearchFilter, filters.OrderingFilter]
@@ -33,7 +72,7 @@ class ClassViewSet(viewsets.ModelViewSet):
     ordering_fields = ['name', 'created_at']
     ordering = ['name']
 
-class SectionViewSet(viewsets.ModelViewSet):
+class SectionViewSet(ConditionalListMixin, viewsets.ModelViewSet):
     queryset = Section.objects.all()
     serializer_class = SectionSerializer
     filter_backends = [filters.SearchFilter, filters.OrderingFilter]
@@ -41,7 +80,7 @@ class SectionViewSet(viewsets.ModelViewSet):
     ordering_fields = ['name', 'created_at']
     ordering = ['name']
 
-class SubjectViewSet(viewsets.ModelViewSet):
+class SubjectViewSet(ConditionalListMixin, viewsets.ModelViewSet):
     queryset = Subject.objects.all()
     serializer_class = SubjectSerializer
     filter_backends = [filters.SearchFilter, filters.OrderingFilter]
@@ -67,7 +106,7 @@ class SubjectViewSet(viewsets.ModelViewSet):
         serializer = self.get_serializer(sub_subjects, many=True)
         return Response(serializer.data)
 
-class StudentViewSet(viewsets.ModelViewSet):
+class StudentViewSet(ConditionalListMixin, viewsets.ModelViewSet):
     queryset = Student.objects.select_related('class_name', 'section').all()
     serializer_class = StudentSerializer
     parser_classes = (MultiPartParser, FormParser)
@@ -103,7 +142,7 @@ class StudentViewSet(viewsets.ModelViewSet):
             return Response(serializer.data)
         return Response({"error": "Both class_id and section_id are required"}, status=status.HTTP_400_BAD_REQUEST)
 
-class ScheduleViewSet(viewsets.ModelViewSet):
+class ScheduleViewSet(ConditionalListMixin, viewsets.ModelViewSet):
     queryset = Schedule.objects.select_related('class_name', 'section', 'subject').all()
     serializer_class = ScheduleSerializer
     filter_backends = [filters.SearchFilter, filters.OrderingFilter]
@@ -124,17 +163,31 @@ class ScheduleViewSet(viewsets.ModelViewSet):
 
     @action(detail=False, methods=['get'])
     def current(self, request):
-        # Get current day and period
-        today = timezone.now().weekday()
-        # Map Django's weekday (0=Monday) to our model (0=Sunday)
-        today = (today + 1) % 7
-
-        # TODO: Calculate current period based on time
-        # For now, just return all periods for today
-        schedules = Schedule.objects.select_related('class_name', 'section', 'subject').filter(day=today)
+        """حصص الحصة الجارية الآن في كل الصفوف (قائمة فارغة بين الحصص وخارج الدوام)"""
+        now = timezone.localtime()
+        period = current_period(now)
+        if period is None:
+            return Response([])
+
+        schedules = Schedule.objects.select_related('class_name', 'section', 'subject').filter(
+            day=model_day(now), period=period
+        )
         serializer = ScheduleDetailSerializer(schedules, many=True)
         return Response(serializer.data)
 
+    @action(detail=False, methods=['get'])
+    def now(self, request):
+        """الحصة الجارية والتالية لصف وفصل، من فهرس الجدول في الذاكرة"""
+        class_id = request.query_params.get('class_id')
+        section_id = request.query_params.get('section_id')
+
+        if not (class_id and section_id):
+            return Response({"error": "Both class_id and section_id are required"}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            return Response(now_for(class_id, section_id))
+        except ValueError:
+            return Response({"error": "class_id and section_id must be integers"}, status=status.HTTP_400_BAD_REQUEST)
+
     @action(detail=False, methods=['get'])
     def by_class_section(self, request):
         class_id = request.query_params.get('class_id')
@@ -146,7 +199,14 @@ class ScheduleViewSet(viewsets.ModelViewSet):
             return Response(serializer.data)
         return Response({"error": "Both class_id and section_id are required"}, status=status.HTTP_400_BAD_REQUEST)
 
-class AttendanceViewSet(viewsets.ModelViewSet):
+class PeriodTimeViewSet(ConditionalListMixin, viewsets.ModelViewSet):
+    queryset = PeriodTime.objects.all()
+    serializer_class = PeriodTimeSerializer
+    filter_backends = [filters.OrderingFilter]
+    ordering_fields = ['period', 'start_time']
+    ordering = ['start_time']
+
+class AttendanceViewSet(ConditionalListMixin, viewsets.ModelViewSet):
     queryset = Attendance.objects.all()
     serializer_class = AttendanceSerializer
     filter_backends = [filters.SearchFilter, filters.OrderingFilter]
@@ -181,88 +241,34 @@ class AttendanceViewSet(viewsets.ModelViewSet):
         return Response({"error": "student_id is required"}, status=status.HTTP_400_BAD_REQUEST)
 
     @action(detail=False, methods=['post'], url_path='batch-create')
+    @idempotent
     def batch_create(self, request):
         """
         إنشاء أو تحديث مجموعة من سجلات الحضور دفعة واحدة
         """
         try:
+            # شكل الاستجابة: full أو ids أو summary
+            try:
+                mode = _batch_response_mode(request)
+            except ValueError as e:
+                return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
             # الحصول على بيانات الحضور من الطلب
             attendance_data = request.data.get('attendance', [])
             if not attendance_data:
                 return Response({"error": "No attendance data provided"}, status=status.HTTP_400_BAD_REQUEST)
 
-            # قائمة لتخزين النتائج
-            results = []
-            errors = []
-
-            # استخدام معاملة قاعدة البيانات
-            from django.db import transaction
-
-            # جلب جميع سجلات الحضور الموجودة دفعة واحدة
-            student_ids = set()
-            dates = set()
-
-            for record in attendance_data:
-                if 'student' in record:
-                    student_ids.add(record['student'])
-                if 'date' in record:
-                    dates.add(record['date'])
-
-            # إنشاء قاموس للبحث السريع
-            existing_records = {}
-
-            if student_ids and dates:
-                # جلب سجلات الحضور الموجودة
-                query = Q(student__in=student_ids) & Q(date__in=dates)
-                existing_records_query = Attendance.objects.filter(query)
-
-                # تخزين سجلات الحضور الموجودة في قاموس للبحث السريع
-                for record in existing_records_query:
-                    key = f"{record.student_id}-{record.date}"
-                    existing_records[key] = record
-
-            with transaction.atomic():
-                for record_data in attendance_data:
-                    # التحقق من وجود الحقول المطلوبة
-                    if not all(key in record_data for key in ['student', 'date', 'status']):
-                        errors.append({"data": record_data, "error": "Missing required fields"})
-                        continue
-
-                    try:
-                        # البحث عن سجل حضور موجود
-                        key = f"{record_data['student']}-{record_data['date']}"
-                        existing_record = existing_records.get(key)
-
-                        if existing_record:
-                            # تحديث سجل حضور موجود
-                            serializer = self.get_serializer(existing_record, data=record_data, partial=True)
-                        else:
-                            # إنشاء سجل حضور جديد
-                            serializer = self.get_serializer(data=record_data)
-
-                        if serializer.is_valid():
-                            attendance = serializer.save()
-                            results.append(AttendanceDetailSerializer(attendance, context={'request': request}).data)
-                        else:
-                            errors.append({"data": record_data, "error": serializer.errors})
-
-                    except Exception as e:
-                        logger.error(f"Error processing attendance record: {e}")
-                        errors.append({"data": record_data, "error": str(e)})
-
-            # إرجاع النتائج والأخطاء
-            return Response({
-                "results": results,
-                "errors": errors,
-                "success_count": len(results),
-                "error_count": len(errors)
-            })
+            # تحقق وكتابة مجمّعان على (الطالب، الحصة، التاريخ) بعدد ثابت من الاستعلامات (انظر api.bulk)
+            written, errors = upsert_attendance(attendance_data)
+
+            # إرجاع النتائج والأخطاء بالشكل المطلوب
+            return _batch_response(request, mode, written, errors, AttendanceDetailSerializer)
 
         except Exception as e:
             logger.error(f"Error in batch create attendance: {e}")
             return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
-class AssignmentViewSet(viewsets.ModelViewSet):
+class AssignmentViewSet(ConditionalListMixin, viewsets.ModelViewSet):
     queryset = Assignment.objects.all()
     serializer_class = AssignmentSerializer
     filter_backends = [filters.SearchFilter, filters.OrderingFilter]
@@ -294,7 +300,7 @@ class AssignmentViewSet(viewsets.ModelViewSet):
             return Response(serializer.data)
         return Response({"error": "schedule_id is required"}, status=status.HTTP_400_BAD_REQUEST)
 
-class AssignmentSubmissionViewSet(viewsets.ModelViewSet):
+class AssignmentSubmissionViewSet(ConditionalListMixin, viewsets.ModelViewSet):
     queryset = AssignmentSubmission.objects.all()
     serializer_class = AssignmentSubmissionSerializer
     filter_backends = [filters.SearchFilter, filters.OrderingFilter]
@@ -327,7 +333,7 @@ class AssignmentSubmissionViewSet(viewsets.ModelViewSet):
             return Response(serializer.data)
         return Response({"error": "student_id is required"}, status=status.HTTP_400_BAD_REQUEST)
 
-class GradeViewSet(viewsets.ModelViewSet):
+class GradeViewSet(ConditionalListMixin, viewsets.ModelViewSet):
     """
     API لإدارة درجات الطلاب
 
@@ -423,6 +429,7 @@ class GradeViewSet(viewsets.ModelViewSet):
             return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
     @action(detail=False, methods=['post'], url_path='batch-create')
+    @idempotent
     def batch_create(self, request):
         """
         إنشاء أو تحديث مجموعة من الدرجات دفعة واحدة
@@ -463,98 +470,38 @@ class GradeViewSet(viewsets.ModelViewSet):
             // مصفوفة من الأخطاء إن وجدت
           ],
           "success_count": 5,
-          "error_count": 0
+          "error_count": 0,
+          "created_count": 3,
+          "updated_count": 2
         }
         ```
+
+        ?response=ids يستبدل results بمصفوفات عمودية: client_index (ترتيب الصف في الطلب) و id و outcome
+        (created أو updated)، و ?response=summary يعيد الأعداد فقط
         """
         try:
+            # شكل الاستجابة: full أو ids أو summary
+            try:
+                mode = _batch_response_mode(request)
+            except ValueError as e:
+                return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
             # الحصول على بيانات الدرجات من الطلب
             grades_data = request.data.get('grades', [])
             if not grades_data:
                 return Response({"error": "No grades data provided"}, status=status.HTTP_400_BAD_REQUEST)
 
-            # قائمة لتخزين النتائج
-            results = []
-            errors = []
-
-            # استخدام معاملة قاعدة البيانات
-            from django.db import transaction
-
-            # جلب جميع الدرجات الموجودة دفعة واحدة
-            student_ids = set()
-            subject_ids = set()
-            types = set()
-            dates = set()
-
-            for grade_data in grades_data:
-                if 'student' in grade_data:
-                    student_ids.add(grade_data['student'])
-                if 'subject' in grade_data:
-                    subject_ids.add(grade_data['subject'])
-                if 'type' in grade_data:
-                    types.add(grade_data['type'])
-                if 'date' in grade_data:
-                    dates.add(grade_data['date'])
-
-            # إنشاء قاموس للبحث السريع
-            existing_grades = {}
-
-            if student_ids and subject_ids and types:
-                # جلب الدرجات الموجودة
-                query = Q(student__in=student_ids) & Q(subject__in=subject_ids) & Q(type__in=types)
-                if dates:
-                    query &= Q(date__in=dates)
-
-                existing_grades_query = Grade.objects.filter(query)
-
-                # تخزين الدرجات الموجودة في قاموس للبحث السريع
-                for grade in existing_grades_query:
-                    key = f"{grade.student_id}-{grade.subject_id}-{grade.type}-{grade.date}"
-                    existing_grades[key] = grade
-
-            with transaction.atomic():
-                for grade_data in grades_data:
-                    # التحقق من وجود الحقول المطلوبة
-                    if not all(key in grade_data for key in ['student', 'subject', 'type', 'score']):
-                        errors.append({"data": grade_data, "error": "Missing required fields"})
-                        continue
-
-                    try:
-                        # البحث عن درجة موجودة
-                        date_str = grade_data.get('date', timezone.now().date().isoformat())
-                        key = f"{grade_data['student']}-{grade_data['subject']}-{grade_data['type']}-{date_str}"
-                        existing_grade = existing_grades.get(key)
-
-                        if existing_grade:
-                            # تحديث درجة موجودة
-                            serializer = self.get_serializer(existing_grade, data=grade_data, partial=True)
-                        else:
-                            # إنشاء درجة جديدة
-                            serializer = self.get_serializer(data=grade_data)
-
-                        if serializer.is_valid():
-                            grade = serializer.save()
-                            results.append(GradeDetailSerializer(grade, context={'request': request}).data)
-                        else:
-                            errors.append({"data": grade_data, "error": serializer.errors})
-
-                    except Exception as e:
-                        logger.error(f"Error processing grade: {e}")
-                        errors.append({"data": grade_data, "error": str(e)})
-
-            # إرجاع النتائج والأخطاء
-            return Response({
-                "results": results,
-                "errors": errors,
-                "success_count": len(results),
-                "error_count": len(errors)
-            })
+            # تحقق وكتابة مجمّعان بعدد ثابت من الاستعلامات (انظر api.bulk)
+            written, errors = upsert_grades(grades_data)
+
+            # إرجاع النتائج والأخطاء بالشكل المطلوب
+            return _batch_response(request, mode, written, errors, GradeDetailSerializer)
 
         except Exception as e:
             logger.error(f"Error in batch create grades: {e}")
             return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
-class NoteViewSet(viewsets.ModelViewSet):
+class NoteViewSet(ConditionalListMixin, viewsets.ModelViewSet):
     queryset = Note.objects.all()
     serializer_class = NoteSerializer
     filter_backends = [filters.SearchFilter, filters.OrderingFilter]
@@ -589,7 +536,7 @@ class NoteViewSet(viewsets.ModelViewSet):
         return Response({"error": "schedule_id is required"}, status=status.HTTP_400_BAD_REQUEST)
 
 
-class NotificationViewSet(viewsets.ModelViewSet):
+class NotificationViewSet(ConditionalListMixin, viewsets.ModelViewSet):
     queryset = Notification.objects.all()
     serializer_class = NotificationSerializer
     filter_backends = [filters.SearchFilter, filters.OrderingFilter]
@@ -618,5 +565,6 @@ class NotificationViewSet(viewsets.ModelViewSet):
 
     @action(detail=False, methods=['post'])
     def mark_all_as_read(self, request):
-        Notification.objects.filter(is_read=False).update(is_read=True)
+        # update() لا يضبط auto_now، وupdated_at يدخل في ETag قائمة الإشعارات
+        Notification.objects.filter(is_read=False).update(is_read=True, updated_at=timezone.now())
         return Response({"message": "All notifications marked as read"}, status=status.HTTP_200_OK)
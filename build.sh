@@ -14,5 +14,14 @@ python manage.py collectstatic --no-input
 # Apply database migrations
 python manage.py migrate
 
+# Reconcile the daily summary rollup with the raw attendance/grade/assignment rows
+python manage.py rebuild_daily_summaries
+
+# Recount the dashboard counters maintained by signals
+python manage.py reconcile_dashboard_counters
+
+# Fill the champions leaderboard snapshot
+python manage.py refresh_leaderboards
+
 # Make startup script executable
 chmod +x startup.sh
@@ -12,6 +12,7 @@ https://docs.djangoproject.com/en/4.2/ref/settings/
 
 from pathlib import Path
 import os
+import tempfile
 import dj_database_url
 from dotenv import load_dotenv
 
@@ -258,25 +259,93 @@ REST_FRAMEWORK = {
 }
 
 # Cache settings
-CACHES = {
-    'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-        'LOCATION': 'unique-snowflake',
+# The cache is shared by all gunicorn workers: Redis when REDIS_URL is set (needs the redis package),
+# otherwise files on the local disk, which works without any outside service
+if 'REDIS_URL' in os.environ:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ.get('REDIS_URL'),
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.environ.get('CACHE_DIR', os.path.join(tempfile.gettempdir(), 'teachease-cache')),
+            'OPTIONS': {
+                'MAX_ENTRIES': 10000,
+            },
+        }
     }
-}
 
 # Cache time to live is 15 minutes (in seconds)
 CACHE_TTL = 60 * 15
 
+# Report responses are invalidated on every write, so they can be kept longer
+REPORT_CACHE_TTL = 60 * 60
+
+# Expired entries are still served for this long while a single worker recomputes them
+CACHE_STALE_TTL = 60 * 5
+
+# A worker holding a recompute lock longer than this is considered dead
+CACHE_LOCK_TTL = 30
+
+# Lock files used instead of cache.add when the cache backend is not atomic (file cache)
+CACHE_LOCK_DIR = os.environ.get('CACHE_LOCK_DIR', os.path.join(tempfile.gettempdir(), 'teachease-locks'))
+
+# Threads used to compute the widgets of /api/dashboard/all/ concurrently
+DASHBOARD_WORKERS = 4
+
+# A report job still 'running' after this many seconds belongs to a dead worker and is claimed again
+REPORT_JOB_TIMEOUT = 60 * 30
+
+# Champions boards are read from LeaderboardSnapshot and recomputed on read once they are older than this
+# (refresh_leaderboards --loop can keep them fresh in the background instead)
+LEADERBOARD_REFRESH_INTERVAL = 60 * 15
+
+# Windows (in days) the champions boards are precomputed for; selected with ?term= or ?window_days=
+LEADERBOARD_WINDOWS = {
+    'month': 30,
+    'term': 90,
+    'year': 365,
+}
+
+# Rows written per transaction by the NDJSON/CSV import endpoints (/api/import/...)
+IMPORT_CHUNK_SIZE = 500
+
+# Responses of bulk write endpoints sent with an Idempotency-Key header are replayed for this long
+IDEMPOTENCY_KEY_TTL = 60 * 60 * 24
+
+# A retry waits this long for the first request with the same key before answering 409
+IDEMPOTENCY_WAIT = 30
+
+# A key still in progress after this long belongs to a dead worker and may be taken over
+IDEMPOTENCY_PENDING_TTL = 60 * 10
+
 # WebSockets settings
 ASGI_APPLICATION = 'config.asgi.application'
 
 # استخدام طبقة القنوات في الذاكرة
-CHANNEL_LAYERS = {
-    'default': {
-        'BACKEND': 'channels.layers.InMemoryChannelLayer',
-    },
-}
+# مع REDIS_URL تُستخدم طبقة Redis (حزمة channels-redis) حتى تصل رسائل لوحة التحكم من عمال HTTP إلى عملية WebSocket
+if 'REDIS_URL' in os.environ:
+    CHANNEL_LAYERS = {
+        'default': {
+            'BACKEND': 'channels_redis.core.RedisChannelLayer',
+            'CONFIG': {
+                'hosts': [os.environ.get('REDIS_URL')],
+            },
+        },
+    }
+else:
+    CHANNEL_LAYERS = {
+        'default': {
+            'BACKEND': 'channels.layers.InMemoryChannelLayer',
+        },
+    }
+
+# Dashboard changes are batched for this many seconds before being pushed over WebSocket
+DASHBOARD_PUSH_DEBOUNCE = 1.0
 
 # Swagger settings
 SWAGGER_SETTINGS = {
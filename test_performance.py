@@ -62,6 +62,10 @@ def test_api_performance():
         "/dashboard/stats/",
         "/dashboard/today-schedule/",
         "/dashboard/top-students/",
+        "/dashboard/all/",
+        "/reports/grades/",
+        "/reports/attendance/",
+        "/reports/assignments/",
     ]
     
     for endpoint in endpoints:
@@ -78,6 +82,48 @@ def test_api_performance():
             # اختبار نقطة نهاية الدرجات المجمعة
             measure_response_time(f"{BASE_URL}/grades/batch/?student_ids={student_ids}")
 
+def test_batch_throughput(rows_count=1000, iterations=3):
+    """
+    قياس معدل كتابة دفعة حضور صباحية (1000 صف افتراضياً) عبر attendances/batch-create
+    المحاولة الأولى تُنشئ السجلات والبقية تُحدّثها؛ يحتاج بيانات seed_benchmark_data
+    """
+    print(f"=== اختبار معدل الكتابة المجمعة ({rows_count} صف) ===")
+
+    students = requests.get(f"{BASE_URL}/students/").json()
+    schedules = requests.get(f"{BASE_URL}/schedules/").json()
+    if not students or not schedules:
+        print("No students or schedules; run seed_benchmark_data first")
+        return None
+
+    today = time.strftime("%Y-%m-%d")
+    rows = [
+        {"student": student["id"], "schedule": schedule["id"], "date": today,
+         "status": "present" if (student["id"] + schedule["id"]) % 10 else "absent"}
+        for schedule in schedules
+        for student in students
+    ][:rows_count]
+
+    rates = []
+    for i in range(iterations):
+        start_time = time.time()
+        response = requests.post(f"{BASE_URL}/attendances/batch-create/", json={"attendance": rows})
+        elapsed = time.time() - start_time
+
+        if response.status_code != 200:
+            print(f"Error: {response.status_code} - {response.text}")
+            continue
+        rates.append(len(rows) / elapsed)
+        print(f"  Run {i + 1} ({'create' if i == 0 else 'update'}): {elapsed:.4f} seconds, "
+              f"{rates[-1]:.0f} rows/second, errors: {response.json()['error_count']}")
+
+    if rates:
+        print(f"  Average throughput: {statistics.mean(rates):.0f} rows/second")
+        print()
+        return statistics.mean(rates)
+
+    return None
+
 if __name__ == "__main__":
     # تشغيل الخادم قبل تشغيل هذا الاختبار
     test_api_performance()
+    test_batch_throughput()